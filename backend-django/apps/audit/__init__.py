@@ -0,0 +1 @@
+# Audit app
@@ -0,0 +1,28 @@
+"""
+Audit admin
+"""
+from django.contrib import admin
+
+from utils.admin import DateDrilldownListFilter, LargeTableAdmin
+from .models import AuditLog
+
+
+@admin.register(AuditLog)
+class AuditLogAdmin(LargeTableAdmin):
+    """Audit log admin interface (read-only)"""
+    list_display = ['created_at', 'user_id', 'action', 'entity_type', 'entity_id', 'ip_address']
+    list_filter = ['action', 'entity_type', ('created_at', DateDrilldownListFilter)]
+    search_fields = ['entity_id__exact', 'user_id__exact']
+    ordering = ['-created_at']
+    
+    def has_add_permission(self, request):
+        """Audit records are only written by the API"""
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        """Audit records are immutable"""
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        """Audit records are kept for compliance"""
+        return False
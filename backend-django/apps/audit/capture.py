@@ -0,0 +1,80 @@
+"""
+Audit capture
+
+``AuditMixin`` makes the requesting user the actor of a viewset request.
+While an actor is set, saves and deletes of ``ChangeCaptureMixin`` models
+(see apps/changes/outbox.py) are audited: once their transaction commits,
+an ``AuditLog`` with the old and new values is handed to the batched writer.
+Changes made outside audited requests (commands, the admin, the relay) are
+not audited.
+"""
+from contextvars import ContextVar
+from functools import partial
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.permissions import SAFE_METHODS
+
+from .models import AuditLog
+from .writer import writer
+
+
+# (user id, IP address, user agent) of the current audited request
+_actor = ContextVar('audit_actor', default=None)
+
+
+def client_ip(request):
+    """Client address; nginx sets X-Real-IP to the connecting address"""
+    return request.META.get('HTTP_X_REAL_IP') or request.META.get('REMOTE_ADDR')
+
+
+def is_auditing():
+    return _actor.get() is not None
+
+
+def changed_values(old, new):
+    """``(old, new)`` restricted to the fields that differ"""
+    fields = [name for name, value in new.items() if old.get(name) != value]
+    return {name: old.get(name) for name in fields}, {name: new[name] for name in fields}
+
+
+def audit_change(instance, action, entity_id, old, new, using):
+    """Audit a change of ``instance`` once the transaction on ``using`` commits"""
+    user_id, ip_address, user_agent = _actor.get()
+    if action == 'update':
+        old, new = changed_values(old or {}, new)
+        if not new:
+            return
+    record = AuditLog(
+        user_id=user_id,
+        action=action,
+        entity_type=instance.change_entity,
+        entity_id=str(entity_id),
+        old_value=old,
+        new_value=new,
+        ip_address=ip_address,
+        user_agent=user_agent,
+        created_at=timezone.now(),
+    )
+    transaction.on_commit(partial(writer.submit, record), using=using)
+
+
+class AuditMixin:
+    """Audit model changes made by this viewset's unsafe requests"""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method not in SAFE_METHODS:
+            user = request.user
+            self._audit_token = _actor.set((
+                str(user.pk) if user.is_authenticated else None,
+                client_ip(request),
+                request.META.get('HTTP_USER_AGENT', ''),
+            ))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_audit_token', None)
+        if token is not None:
+            _actor.reset(token)
+            self._audit_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
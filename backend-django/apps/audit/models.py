@@ -0,0 +1,53 @@
+"""
+Audit log models
+"""
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class AuditLog(models.Model):
+    """
+    Audit trail of mutations made through the API
+
+    Same table as ``audit_logs`` in backend/database/init.sql. For updates
+    only the changed fields are stored.
+    """
+    ACTION_CHOICES = [
+        ('create', 'Create'),
+        ('update', 'Update'),
+        ('delete', 'Delete'),
+    ]
+    
+    user_id = models.CharField(max_length=50, null=True, blank=True)
+    
+    action = models.CharField(max_length=100, choices=ACTION_CHOICES)
+    
+    entity_type = models.CharField(max_length=50)
+    
+    entity_id = models.CharField(max_length=50, null=True, blank=True)
+    
+    old_value = models.JSONField(encoder=DjangoJSONEncoder, null=True, blank=True)
+    
+    new_value = models.JSONField(encoder=DjangoJSONEncoder, null=True, blank=True)
+    
+    ip_address = models.CharField(max_length=45, null=True, blank=True)
+    
+    user_agent = models.TextField(null=True, blank=True)
+    
+    # Set when the change happened, not when the writer flushed it
+    created_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'audit_logs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user_id']),
+            models.Index(fields=['entity_type', 'entity_id']),
+            models.Index(fields=['action']),
+            models.Index(fields=['-created_at']),
+        ]
+        verbose_name = 'Audit Log'
+        verbose_name_plural = 'Audit Logs'
+    
+    def __str__(self):
+        return f"{self.entity_type} {self.entity_id} {self.action} by {self.user_id}"
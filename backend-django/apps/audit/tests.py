@@ -0,0 +1,110 @@
+"""
+Audit tests
+"""
+import os
+import queue
+import threading
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.members.models import Member
+from .models import AuditLog
+from .writer import AuditWriter
+
+User = get_user_model()
+
+
+def audit_record(entity_id):
+    return AuditLog(
+        user_id='1', action='create', entity_type='member', entity_id=entity_id,
+        new_value={'id': entity_id}, created_at=timezone.now(),
+    )
+
+
+class AuditCaptureTests(TestCase):
+    """Audit records of viewset mutations"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='staff', email='staff@example.com', password='staff-pass-123', full_name='Staff'
+        )
+        self.client = APIClient(HTTP_USER_AGENT='audit-test', REMOTE_ADDR='10.0.0.7')
+        self.client.force_authenticate(self.user)
+
+    def test_mutations_are_audited_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/members/', {
+                'name': 'John Doe', 'email': 'john@example.com', 'phone': '08123456789',
+                'join_date': date.today(),
+            }, format='json')
+        member_id = str(response.data['data']['id'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/members/{member_id}/', {'name': 'John Smith'}, format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/members/{member_id}/')
+
+        records = list(AuditLog.objects.order_by('id'))
+        created, updated, deleted = records
+        self.assertEqual(
+            [(record.action, record.entity_type, record.entity_id) for record in records],
+            [('create', 'member', member_id), ('update', 'member', member_id), ('delete', 'member', member_id)],
+        )
+        self.assertEqual(created.user_id, str(self.user.pk))
+        self.assertEqual((created.ip_address, created.user_agent), ('10.0.0.7', 'audit-test'))
+        self.assertIsNone(created.old_value)
+        # Updates keep only the fields that changed
+        self.assertEqual(updated.old_value['name'], 'John Doe')
+        self.assertEqual(updated.new_value['name'], 'John Smith')
+        self.assertNotIn('email', updated.new_value)
+        self.assertEqual(deleted.old_value['name'], 'John Smith')
+        self.assertIsNone(deleted.new_value)
+
+    def test_reads_and_changes_outside_requests_are_not_audited(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Member.objects.create(name='Jane', email='jane@example.com', phone='0812', join_date=date.today())
+            self.client.get('/api/members/')
+        self.assertFalse(AuditLog.objects.exists())
+
+    def test_rolled_back_changes_are_not_audited(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/members/', {'name': 'No Email'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(AuditLog.objects.exists())
+
+
+class AuditWriterTests(TestCase):
+    """Batched writes and backpressure"""
+
+    def test_write_inserts_batch(self):
+        AuditWriter().write([audit_record(str(i)) for i in range(3)])
+        self.assertEqual(sorted(AuditLog.objects.values_list('entity_id', flat=True)), ['0', '1', '2'])
+
+    @override_settings(AUDIT_ENQUEUE_TIMEOUT=0)
+    def test_full_queue_writes_inline(self):
+        audit_writer = AuditWriter()
+        # A running writer that has fallen behind
+        audit_writer.queue = queue.Queue(maxsize=1)
+        audit_writer.queue.put(audit_record('queued'))
+        audit_writer.thread = threading.current_thread()
+        audit_writer.pid = os.getpid()
+
+        audit_writer.submit(audit_record('inline'))
+        self.assertEqual(list(AuditLog.objects.values_list('entity_id', flat=True)), ['inline'])
+
+
+@override_settings(AUDIT_FLUSH_INTERVAL_MS=10)
+class AuditWriterThreadTests(TransactionTestCase):
+    """Background writer thread"""
+
+    def test_stop_flushes_queue(self):
+        audit_writer = AuditWriter()
+        for i in range(5):
+            audit_writer.submit(audit_record(str(i)))
+        audit_writer.stop()
+
+        self.assertFalse(audit_writer.thread.is_alive())
+        self.assertEqual(AuditLog.objects.count(), 5)
@@ -0,0 +1,131 @@
+"""
+Batched audit log writer
+
+Requests hand audit records to a per-process ``AuditWriter`` and return
+without waiting for them to be written. A daemon thread drains the queue and
+writes whatever has arrived with one multi-row ``INSERT`` every
+``AUDIT_FLUSH_INTERVAL_MS`` milliseconds, or as soon as ``AUDIT_BATCH_SIZE``
+records are waiting.
+
+The queue is bounded by ``AUDIT_QUEUE_SIZE``. When the database falls behind
+and the queue fills, a request waits up to ``AUDIT_ENQUEUE_TIMEOUT`` seconds
+for room and then writes its record itself, so audit records are never
+dropped, at the cost of slowing the requests that produce them. Records
+still queued are written when the process exits (``atexit`` and gunicorn's
+``worker_exit`` hook).
+
+Records submitted inside a transaction, as when tests run ``on_commit``
+callbacks eagerly, are written in that transaction instead.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connections
+
+from utils.metrics import AUDIT_RECORDS
+from .models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class AuditWriter:
+    """Queue of pending audit records and the thread that writes them"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.queue = None
+        self.thread = None
+        self.pid = None
+
+    def start(self):
+        with self.lock:
+            # Forked workers inherit the queue but not the thread
+            if self.pid == os.getpid() and self.thread.is_alive():
+                return
+            self.queue = queue.Queue(maxsize=settings.AUDIT_QUEUE_SIZE)
+            self.thread = threading.Thread(target=self.run, name='audit-writer', daemon=True)
+            self.pid = os.getpid()
+            self.thread.start()
+
+    def submit(self, record):
+        """Queue an unsaved ``AuditLog`` for writing"""
+        if connections['default'].in_atomic_block:
+            self.write([record])
+            return
+        if self.pid != os.getpid() or not self.thread.is_alive():
+            self.start()
+        try:
+            self.queue.put(record, timeout=settings.AUDIT_ENQUEUE_TIMEOUT)
+        except queue.Full:
+            AUDIT_RECORDS.labels('inline').inc()
+            self.write([record])
+        else:
+            AUDIT_RECORDS.labels('queued').inc()
+
+    def run(self):
+        interval = settings.AUDIT_FLUSH_INTERVAL_MS / 1000
+        stopping = False
+        while not stopping:
+            batch = []
+            item = self.queue.get()
+            deadline = time.monotonic() + interval
+            while item is not _STOP:
+                batch.append(item)
+                remaining = deadline - time.monotonic()
+                if len(batch) >= settings.AUDIT_BATCH_SIZE:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            stopping = item is _STOP
+            if batch:
+                self.write(batch)
+            # The thread's connection would otherwise outlive CONN_MAX_AGE
+            close_old_connections()
+        connections.close_all()
+
+    def write(self, records):
+        """Insert ``records`` in one statement, retrying once on a new connection"""
+        for attempt in range(2):
+            try:
+                AuditLog.objects.bulk_create(records, batch_size=settings.AUDIT_BATCH_SIZE)
+            except DatabaseError as exc:
+                connections['default'].close()
+                if attempt:
+                    AUDIT_RECORDS.labels('failed').inc(len(records))
+                    # Kept in the error log so the records can be replayed
+                    logger.error(
+                        'Audit records not written: %s', exc,
+                        extra={'audit_records': [record_data(record) for record in records]},
+                    )
+            else:
+                AUDIT_RECORDS.labels('written').inc(len(records))
+                return
+
+    def stop(self, timeout=10):
+        """Write everything queued and stop the thread"""
+        with self.lock:
+            if self.pid != os.getpid() or not self.thread.is_alive():
+                return
+            try:
+                self.queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                logger.error('Audit writer did not stop: queue still full')
+                return
+            self.thread.join(timeout)
+
+
+def record_data(record):
+    return {field.attname: getattr(record, field.attname) for field in AuditLog._meta.concrete_fields}
+
+
+writer = AuditWriter()
+atexit.register(writer.stop)
@@ -0,0 +1,27 @@
+"""
+Authentication classes
+"""
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+
+
+class StreamJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    JWT authentication for long-lived streams
+
+    Takes the token from the ``Authorization`` header or else the ``token``
+    query parameter, for clients that cannot set headers (the browser's
+    EventSource). Stateless: the user comes from the token claims, so
+    holding a stream open keeps no database connection. A deactivated user
+    keeps access until the token expires.
+    """
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None:
+            return result
+
+        raw_token = request.query_params.get('token')
+        if not raw_token:
+            return None
+        validated_token = self.get_validated_token(raw_token.encode())
+        return self.get_user(validated_token), validated_token
@@ -0,0 +1 @@
+# Changes app (transactional outbox and change feed)
@@ -0,0 +1,24 @@
+"""
+Changes admin
+"""
+from django.contrib import admin
+
+from utils.admin import LargeTableAdmin
+from .models import ChangeEvent
+
+
+@admin.register(ChangeEvent)
+class ChangeEventAdmin(LargeTableAdmin):
+    """Change event admin interface (read-only)"""
+    list_display = ['id', 'entity', 'entity_id', 'operation', 'created_at', 'published_at']
+    list_filter = ['entity', 'operation']
+    search_fields = ['entity_id__exact']
+    ordering = ['-id']
+    
+    def has_add_permission(self, request):
+        """Events are only written by the outbox"""
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        """Events are immutable once written"""
+        return False
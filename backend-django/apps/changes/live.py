@@ -0,0 +1,192 @@
+"""
+Live dashboard updates
+
+Each change that dashboards show is published once to the ``LIVE_CHANNEL``
+Redis pub/sub channel, by the relay (``relay``) once it has given the event
+its ``sequence``. Every ASGI worker holds a single subscription
+(``Broadcaster``) and fans messages out from memory to its Server-Sent
+Events clients, so a subscriber costs neither queries nor a Redis
+connection of its own.
+
+Frames carry the event's ``sequence`` as their SSE id, the change feed's
+cursor: a client that reconnects, or is told to ``resync`` because it fell
+behind, catches up through ``/api/changes/?since=<last id>``.
+"""
+import asyncio
+import json
+import logging
+import weakref
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+# Point statistics total each transaction type adds to
+POINT_TOTALS = {
+    'earn': 'total_earned',
+    'redeem': 'total_redeemed',
+    'expire': 'total_expired',
+    'adjustment': 'total_adjusted',
+}
+
+RESYNC = b'event: resync\ndata: {}\n\n'
+HEARTBEAT = b': ping\n\n'
+
+
+def live_message(event):
+    """
+    ``(type, data, statistics delta)`` shown to dashboards for a change
+    event, or None. Deltas are only known for creations; other changes
+    leave statistics to be refetched.
+    """
+    payload = event.payload
+    created = event.operation == 'created'
+
+    if event.entity == 'point_transaction' and created:
+        points = payload['points']
+        total = POINT_TOTALS[payload['transaction_type']]
+        return 'points', {
+            field: payload[field] for field in ('id', 'member_id', 'transaction_type', 'points', 'transaction_date')
+        }, {'points': {
+            'total_transactions': 1,
+            'net_points': points,
+            total: points if total == 'total_adjusted' else abs(points),
+        }}
+
+    if event.entity == 'redeem_transaction' and event.operation != 'deleted':
+        status = payload['status']
+        delta = {'redeem': {
+            'total_redeems': 1,
+            f'{status.lower()}_redeems': 1,
+            'total_points_redeemed': 0 if status == 'Cancelled' else payload['points_cost'],
+        }} if created else None
+        return 'redemption', {
+            field: payload[field] for field in ('id', 'member_id', 'voucher_id', 'status', 'points_cost', 'redeem_date')
+        }, delta
+
+    if event.entity == 'voucher' and event.operation != 'deleted':
+        delta = {'vouchers': {'total_vouchers': 1, 'total_stock': payload['stock']}} if created else None
+        return 'voucher', {field: payload[field] for field in ('id', 'code', 'stock', 'status')}, delta
+
+    if event.entity == 'member' and created:
+        return 'statistics', {}, {'members': {
+            'total_members': 1,
+            'active_members' if payload['status'] == 'Active' else 'inactive_members': 1,
+            'by_tier': {payload['tier_level']: 1},
+        }}
+
+    return None
+
+
+def frame(sequence, kind, data, delta):
+    """Server-Sent Events frame for a dashboard message"""
+    body = json.dumps({'data': data, 'delta': delta}, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return f'id: {sequence}\nevent: {kind}\ndata: {body}\n\n'.encode()
+
+
+def publish_live(events):
+    """Publish the relayed ``events`` that dashboards show; best effort"""
+    frames = []
+    for event in events:
+        message = live_message(event)
+        if message is not None:
+            frames.append(frame(event.sequence, *message))
+    if not frames:
+        return
+    try:
+        from django_redis import get_redis_connection
+
+        # Published pre-framed, so workers forward them without decoding
+        pipeline = get_redis_connection('default').pipeline(transaction=False)
+        for data in frames:
+            pipeline.publish(settings.LIVE_CHANNEL, data)
+        pipeline.execute()
+    except Exception as exc:
+        # The events are in the feed; dashboards catch up on resync
+        logger.warning('%d live updates not published: %s', len(frames), exc)
+
+
+class Broadcaster:
+    """
+    Fans one Redis subscription out to this event loop's SSE clients
+
+    Each client has a bounded queue. A client too slow to drain it (its
+    socket is not accepting data) loses its backlog and is sent ``resync``
+    instead of holding memory or slowing everyone else down.
+    """
+
+    def __init__(self):
+        self.subscribers = set()
+        self.task = None
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=settings.LIVE_QUEUE_SIZE)
+        self.subscribers.add(queue)
+        if self.task is None or self.task.done():
+            # Kept running for the loop's lifetime once started
+            self.task = asyncio.create_task(self.listen())
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+    def dispatch(self, data):
+        for queue in self.subscribers:
+            try:
+                queue.put_nowait(data)
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC)
+
+    async def listen(self):
+        missed = False
+        while True:
+            client = aioredis.Redis.from_url(settings.REDIS_URL, socket_connect_timeout=5)
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(settings.LIVE_CHANNEL)
+                if missed:
+                    # Messages published while disconnected are gone
+                    self.dispatch(RESYNC)
+                    missed = False
+                while True:
+                    message = await pubsub.get_message(timeout=settings.LIVE_HEARTBEAT_SECONDS)
+                    if message is not None:
+                        self.dispatch(message['data'])
+            except (OSError, RedisError) as exc:
+                if not missed:
+                    logger.warning('Live subscription lost: %s', exc)
+                missed = True
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+                await client.aclose()
+
+    async def stream(self):
+        """SSE byte stream for one client; heartbeats keep idle connections open"""
+        queue = self.subscribe()
+        try:
+            yield f'retry: {settings.LIVE_RETRY_MS}\n\n'.encode()
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), settings.LIVE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield HEARTBEAT
+        finally:
+            self.unsubscribe(queue)
+
+
+_broadcasters = weakref.WeakKeyDictionary()
+
+
+def get_broadcaster():
+    """Broadcaster for the running event loop"""
+    loop = asyncio.get_running_loop()
+    broadcaster = _broadcasters.get(loop)
+    if broadcaster is None:
+        broadcaster = _broadcasters[loop] = Broadcaster()
+    return broadcaster
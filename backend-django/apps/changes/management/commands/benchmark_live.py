@@ -0,0 +1,142 @@
+"""
+Management command to load test the live dashboard feed
+"""
+import asyncio
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django_redis import get_redis_connection
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.changes.live import frame
+from apps.members.management.commands.benchmark_server import start_server
+
+
+class Command(BaseCommand):
+    help = 'Hold many SSE subscribers on an ASGI server and measure Redis-to-client fan-out latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, default=5000)
+        parser.add_argument('--messages', type=int, default=100)
+        parser.add_argument('--rate', type=float, default=10.0, help='Messages published per second')
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--port', type=int, default=8766)
+        parser.add_argument('--username', help='User to authenticate as (default: first user)')
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.order_by('pk')
+        user = users.filter(username=options['username']).first() if options['username'] else users.first()
+        if user is None:
+            raise CommandError('No user to authenticate as; run seed_data or pass --username')
+
+        server = start_server('asgi', options['workers'], options['port'])
+        try:
+            result = asyncio.run(LiveLoad(
+                port=options['port'], token=str(AccessToken.for_user(user)),
+            ).run(options['subscribers'], options['messages'], options['rate']))
+        finally:
+            server.terminate()
+            server.wait()
+
+        expected = result['connected'] * options['messages']
+        self.stdout.write(
+            f'{result["connected"]}/{options["subscribers"]} subscribers connected in {result["connect_s"]:.1f}s '
+            f'({options["workers"]} workers)'
+        )
+        self.stdout.write(
+            f'{options["messages"]} messages at {options["rate"]:.0f}/s: '
+            f'{result["delivered"]}/{expected} deliveries, {result["resyncs"]} resyncs, {result["errors"]} errors'
+        )
+        self.stdout.write(
+            f'fan-out latency ms: p50 {result["p50"]:.1f}  p99 {result["p99"]:.1f}  max {result["max"]:.1f}'
+        )
+
+
+class LiveLoad:
+    """SSE subscribers over raw sockets, fed by publishing straight to the live channel"""
+
+    def __init__(self, port, token):
+        self.port = port
+        self.request = (
+            f'GET /api/live/ HTTP/1.1\r\nHost: 127.0.0.1\r\nAccept: text/event-stream\r\n'
+            f'Authorization: Bearer {token}\r\n\r\n'
+        ).encode()
+        self.latencies = []
+        self.resyncs = 0
+        self.errors = 0
+        self.connected = 0
+
+    async def run(self, subscribers, messages, rate):
+        # Bounded so the accept backlog is not overrun
+        connecting = asyncio.Semaphore(200)
+        start = time.perf_counter()
+        clients = [asyncio.create_task(self.subscriber(connecting)) for _ in range(subscribers)]
+
+        while self.connected + self.errors < subscribers and time.perf_counter() - start < 120:
+            await asyncio.sleep(0.1)
+        connect_s = time.perf_counter() - start
+
+        redis = get_redis_connection('default')
+        for index in range(messages):
+            redis.publish(settings.LIVE_CHANNEL, frame(index, 'benchmark', {'sent': time.time()}, None))
+            await asyncio.sleep(1 / rate)
+
+        # Let stragglers drain
+        deadline = time.perf_counter() + 10
+        while len(self.latencies) < self.connected * messages and time.perf_counter() < deadline:
+            await asyncio.sleep(0.1)
+        for client in clients:
+            client.cancel()
+        await asyncio.gather(*clients, return_exceptions=True)
+
+        latencies = sorted(self.latencies) or [0.0]
+        return {
+            'connected': self.connected,
+            'connect_s': connect_s,
+            'delivered': len(self.latencies),
+            'resyncs': self.resyncs,
+            'errors': self.errors,
+            'p50': latencies[len(latencies) // 2] * 1000,
+            'p99': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+            'max': latencies[-1] * 1000,
+        }
+
+    async def subscriber(self, connecting):
+        writer = None
+        try:
+            async with connecting:
+                reader, writer = await asyncio.open_connection('127.0.0.1', self.port)
+                writer.write(self.request)
+                head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), 30)
+                if b' 200 ' not in head.split(b'\r\n', 1)[0]:
+                    raise ValueError(head.split(b'\r\n', 1)[0].decode())
+                # The stream opens with the client retry interval
+                await self.read_event(reader)
+            self.connected += 1
+
+            while True:
+                event = await self.read_event(reader)
+                received = time.time()
+                if event.startswith(b'event: resync'):
+                    self.resyncs += 1
+                elif b'event: benchmark' in event:
+                    sent = float(event.rsplit(b'"sent":', 1)[1].split(b'}', 1)[0])
+                    self.latencies.append(received - sent)
+        except asyncio.CancelledError:
+            pass
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+            self.errors += 1
+        finally:
+            if writer is not None:
+                writer.close()
+
+    @staticmethod
+    async def read_event(reader):
+        """Next non-heartbeat SSE event from the chunked response body"""
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).strip(), 16)
+            chunk = await reader.readexactly(size + 2)
+            if not chunk.startswith(b':'):
+                return chunk[:-2]
@@ -0,0 +1,38 @@
+"""
+Management command to relay outbox change events to the configured sink
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.changes.relay import purge_published, relay_batch
+from apps.changes.sinks import get_sink
+
+
+class Command(BaseCommand):
+    help = 'Publish pending change events to CHANGES_SINK in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to sleep when nothing is pending')
+        parser.add_argument('--once', action='store_true', help='Publish what is pending, then exit')
+
+    def handle(self, *args, **options):
+        sink = get_sink()
+        next_purge = 0.0
+
+        while True:
+            published = relay_batch(sink, options['batch_size'])
+            if published:
+                self.stdout.write(f'Published {published} events')
+                continue
+            if options['once']:
+                return
+
+            if time.monotonic() >= next_purge:
+                purged = purge_published(settings.CHANGES_RETENTION_DAYS)
+                if purged:
+                    self.stdout.write(f'Purged {purged} published events')
+                next_purge = time.monotonic() + 3600
+            time.sleep(options['interval'])
@@ -0,0 +1,66 @@
+"""
+Change event models
+"""
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.db.models import Q
+
+
+class ChangeEvent(models.Model):
+    """
+    Outbox row describing one change to a tracked model
+
+    Written in the same transaction as the change (see ``outbox``), so an
+    event exists if and only if the change committed. ``sequence``, not
+    ``id``, is the feed cursor: ids are taken at insert but become visible
+    at commit, so a lower id can commit after a higher one has been read.
+    """
+    OPERATION_CHOICES = [
+        ('created', 'Created'),
+        ('updated', 'Updated'),
+        ('deleted', 'Deleted'),
+    ]
+    
+    id = models.BigAutoField(primary_key=True)
+    
+    entity = models.CharField(max_length=50, help_text='Kind of record changed, e.g. member')
+    
+    entity_id = models.CharField(max_length=50, help_text='Primary key of the record changed')
+    
+    operation = models.CharField(max_length=10, choices=OPERATION_CHOICES)
+    
+    payload = models.JSONField(
+        encoder=DjangoJSONEncoder,
+        default=dict,
+        help_text='Field values after the change (before it, for deletions)'
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    published_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='When the relay handed the event to the sink'
+    )
+    
+    sequence = models.BigIntegerField(
+        null=True,
+        blank=True,
+        unique=True,
+        help_text='Publication order, assigned by the relay after the change committed'
+    )
+    
+    class Meta:
+        db_table = 'change_events'
+        ordering = ['id']
+        indexes = [
+            # The relay's work queue stays small however long the table gets
+            models.Index(fields=['id'], condition=Q(published_at__isnull=True), name='change_events_unpublished'),
+            models.Index(fields=['entity', 'sequence']),
+            models.Index(fields=['created_at']),
+        ]
+        verbose_name = 'Change Event'
+        verbose_name_plural = 'Change Events'
+    
+    def __str__(self):
+        return f"{self.id} - {self.entity} {self.entity_id} {self.operation}"
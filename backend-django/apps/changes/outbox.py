@@ -0,0 +1,100 @@
+"""
+Transactional outbox
+
+Models inheriting ``ChangeCaptureMixin`` record a ``ChangeEvent`` in the
+same transaction as each save and delete, so an event is recorded for every
+committed change and for nothing that was rolled back. The relay
+(``relay``) numbers events in the order it publishes them; the change feed
+reads in that order.
+
+Inside requests audited by ``apps.audit.capture.AuditMixin`` the same saves
+and deletes are also audited, with values as loaded for the old side.
+
+Only per-instance saves and deletes are captured: rows removed by a cascade
+are implied by their parent's ``deleted`` event, and ``QuerySet.update()``
+bypasses capture (``record_changes`` records such changes after the fact).
+"""
+from django.db import router, transaction
+
+from apps.audit.capture import audit_change, is_auditing
+from .models import ChangeEvent
+
+
+def snapshot(instance):
+    """Concrete field values of ``instance``, keyed by column attribute"""
+    return {field.attname: getattr(instance, field.attname) for field in instance._meta.concrete_fields}
+
+
+AUDIT_ACTIONS = {'created': 'create', 'updated': 'update', 'deleted': 'delete'}
+
+
+def change_event(instance, operation, payload):
+    return ChangeEvent(
+        entity=instance.change_entity,
+        entity_id=str(payload[instance._meta.pk.attname]),
+        operation=operation,
+        payload=payload,
+    )
+
+
+def record_change(instance, operation, using, payload=None):
+    payload = snapshot(instance) if payload is None else payload
+    event = change_event(instance, operation, payload)
+    event.save(force_insert=True, using=using)
+    recorded(instance, event, using)
+
+
+def record_changes(instances, operation, using):
+    """``record_change`` for many instances, with one insert; for changes made with ``QuerySet.update()``"""
+    events = ChangeEvent.objects.using(using).bulk_create([
+        change_event(instance, operation, snapshot(instance)) for instance in instances
+    ])
+    for instance, event in zip(instances, events):
+        recorded(instance, event, using)
+
+
+def recorded(instance, event, using):
+    """Audit ``event``, just written for ``instance``"""
+    operation, payload = event.operation, event.payload
+    if is_auditing():
+        old = getattr(instance, '_audit_snapshot', None)
+        new = None if operation == 'deleted' else payload
+        audit_change(instance, AUDIT_ACTIONS[operation], event.entity_id, old, new, using)
+        # A later save in the same request is compared with this one
+        instance._audit_snapshot = new
+
+
+class ChangeCaptureMixin:
+    """Write a change event with every save and delete; set ``change_entity``"""
+
+    change_entity = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if is_auditing():
+            instance._audit_snapshot = snapshot(instance)
+        return instance
+
+    def save_base(self, raw=False, force_insert=False, force_update=False, using=None, update_fields=None):
+        using = using or router.db_for_write(self.__class__, instance=self)
+        operation = 'created' if self._state.adding else 'updated'
+        # savepoint=False: nested saves (a transaction updating its member)
+        # join the caller's transaction without an extra round trip
+        with transaction.atomic(using=using, savepoint=False):
+            super().save_base(raw=raw, force_insert=force_insert, force_update=force_update,
+                              using=using, update_fields=update_fields)
+            # Fixture loads replay data rather than change it
+            if not raw:
+                record_change(self, operation, using)
+
+    def delete(self, using=None, keep_parents=False):
+        using = using or router.db_for_write(self.__class__, instance=self)
+        # Taken first: deleting clears the primary key
+        payload = snapshot(self)
+        if is_auditing():
+            self._audit_snapshot = payload
+        with transaction.atomic(using=using, savepoint=False):
+            result = super().delete(using=using, keep_parents=keep_parents)
+            record_change(self, 'deleted', using, payload=payload)
+        return result
@@ -0,0 +1,73 @@
+"""
+Outbox relay
+
+Moves unpublished change events to the configured sink in id order.
+Delivery is at least once: if the sink accepts a batch but marking it
+published fails, the batch is sent again, so consumers deduplicate on ``id``.
+
+Each published event gets the next ``sequence`` number, the change feed's
+cursor. The relay only sees committed events and relays take turns (an
+advisory lock on PostgreSQL; SQLite serializes writers anyway), so
+sequence numbers become visible in increasing order: a feed reader past
+``n`` never misses an event numbered ``n`` or lower. Once a batch commits,
+the events dashboards show go out on the live channel with their numbers
+(``live.publish_live``).
+"""
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .live import publish_live
+from .models import ChangeEvent
+from .serializers import ChangeEventSerializer
+
+# pg_advisory_xact_lock key held while a relay numbers and publishes a batch
+SEQUENCE_LOCK = 0x63726d01
+
+
+def lock_sequence(using):
+    """Wait for other relays' batches; released when the transaction ends"""
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [SEQUENCE_LOCK])
+
+
+def last_sequence(using='default'):
+    return ChangeEvent.objects.using(using).aggregate(last=Max('sequence'))['last'] or 0
+
+
+def relay_batch(sink, batch_size, using='default'):
+    """Publish up to ``batch_size`` pending events; returns how many were published"""
+    with transaction.atomic(using=using):
+        lock_sequence(using)
+        events = list(
+            ChangeEvent.objects.using(using)
+            .filter(published_at__isnull=True)
+            .select_for_update(skip_locked=True)
+            .order_by('id')[:batch_size]
+        )
+        if not events:
+            return 0
+        start, now = last_sequence(using), timezone.now()
+        for offset, event in enumerate(events, 1):
+            event.sequence, event.published_at = start + offset, now
+        sink.publish(ChangeEventSerializer(events, many=True).data)
+        ChangeEvent.objects.using(using).bulk_update(events, ['sequence', 'published_at'])
+        if settings.LIVE_UPDATES:
+            transaction.on_commit(partial(publish_live, events), using=using)
+    return len(events)
+
+
+def purge_published(days, using='default'):
+    """Delete events published more than ``days`` days ago; returns how many"""
+    cutoff = timezone.now() - timedelta(days=days)
+    # The latest event is kept to carry the sequence on after a quiet spell
+    deleted, _ = ChangeEvent.objects.using(using).filter(
+        created_at__lt=cutoff, published_at__isnull=False
+    ).exclude(sequence=last_sequence(using)).delete()
+    return deleted
@@ -0,0 +1,13 @@
+"""
+Changes serializers
+"""
+from rest_framework import serializers
+from .models import ChangeEvent
+
+
+class ChangeEventSerializer(serializers.ModelSerializer):
+    """Change event as published to sinks and served by the feed"""
+    
+    class Meta:
+        model = ChangeEvent
+        fields = ['id', 'entity', 'entity_id', 'operation', 'payload', 'created_at', 'sequence']
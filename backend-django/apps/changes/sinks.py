@@ -0,0 +1,50 @@
+"""
+Change event sinks
+
+A sink takes a batch of serialized events (dicts, in sequence order) and must
+raise if it cannot accept all of them; the relay then retries the batch.
+``CHANGES_SINK`` selects the sink class.
+"""
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+
+class RedisStreamSink:
+    """Appends events to a Redis Stream, trimmed to about ``maxlen`` entries"""
+
+    def __init__(self, stream=None, maxlen=None):
+        from django_redis import get_redis_connection
+
+        self.redis = get_redis_connection('default')
+        self.stream = stream or settings.CHANGES_REDIS_STREAM
+        self.maxlen = maxlen or settings.CHANGES_REDIS_STREAM_MAXLEN
+
+    def publish(self, events):
+        pipeline = self.redis.pipeline(transaction=False)
+        for event in events:
+            pipeline.xadd(
+                self.stream,
+                {'id': event['id'], 'entity': event['entity'], 'event': json.dumps(event, cls=DjangoJSONEncoder)},
+                maxlen=self.maxlen,
+                approximate=True,
+            )
+        pipeline.execute()
+
+
+class FileSink:
+    """Appends events to ``path`` as JSON lines"""
+
+    def __init__(self, path=None):
+        self.path = path or settings.CHANGES_FILE_SINK_PATH
+
+    def publish(self, events):
+        with open(self.path, 'a', encoding='utf-8') as stream:
+            for event in events:
+                stream.write(json.dumps(event, cls=DjangoJSONEncoder) + '\n')
+
+
+def get_sink():
+    return import_string(settings.CHANGES_SINK)()
@@ -0,0 +1,211 @@
+"""
+Changes tests
+"""
+import asyncio
+import json
+import os
+import tempfile
+from datetime import date, timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.members.models import Member
+from apps.points.models import PointTransaction
+from .live import HEARTBEAT, RESYNC, Broadcaster, live_message
+from .models import ChangeEvent
+from .relay import purge_published, relay_batch
+from .sinks import FileSink
+
+User = get_user_model()
+
+
+class OutboxTests(TestCase):
+    """Change events written with model changes"""
+
+    def setUp(self):
+        self.member = Member.objects.create(
+            name='John Doe', email='john@example.com', phone='08123456789', join_date=date.today()
+        )
+
+    def test_save_and_delete_record_events(self):
+        member_id = self.member.id
+        PointTransaction.objects.create(member=self.member, transaction_type='earn', points=100)
+        self.member.delete()
+
+        events = list(ChangeEvent.objects.values_list('entity', 'entity_id', 'operation'))
+        self.assertEqual(events[0], ('member', member_id, 'created'))
+        self.assertEqual(events[1][::2], ('point_transaction', 'created'))
+        # The posting updates the member's balance
+        self.assertEqual(events[2], ('member', member_id, 'updated'))
+        self.assertEqual(events[3], ('member', member_id, 'deleted'))
+        self.assertEqual(ChangeEvent.objects.get(operation='deleted').payload['total_points'], 100)
+
+    def test_rolled_back_changes_leave_no_event(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            PointTransaction.objects.create(member=self.member, transaction_type='earn', points=100)
+            raise RuntimeError
+        self.assertEqual(ChangeEvent.objects.filter(entity='point_transaction').count(), 0)
+
+
+class RelayTests(TestCase):
+    """Outbox relay"""
+
+    def test_pending_events_are_published_once(self):
+        Member.objects.create(name='Jane', email='jane@example.com', phone='0812', join_date=date.today())
+        with tempfile.TemporaryDirectory() as directory:
+            sink = FileSink(os.path.join(directory, 'changes.jsonl'))
+            self.assertEqual(relay_batch(sink, batch_size=10), 1)
+            self.assertEqual(relay_batch(sink, batch_size=10), 0)
+            with open(sink.path) as stream:
+                published = [json.loads(line) for line in stream]
+
+        self.assertEqual([event['entity'] for event in published], ['member'])
+        self.assertFalse(ChangeEvent.objects.filter(published_at__isnull=True).exists())
+
+
+class ListSink:
+    """Sink collecting published events in memory"""
+
+    def __init__(self):
+        self.events = []
+
+    def publish(self, events):
+        self.events.extend(events)
+
+
+class ChangeFeedTests(TestCase):
+    """Cursor-based change feed"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(
+            username='staff', email='staff@example.com', password='staff-pass-123', full_name='Staff'
+        ))
+        for i in range(3):
+            Member.objects.create(name=f'Member {i}', email=f'member{i}@example.com', phone='0811', join_date=date.today())
+
+    def feed(self, **params):
+        return self.client.get('/api/changes/', params).json()
+
+    def test_resume_from_cursor(self):
+        relay_batch(ListSink(), batch_size=10)
+        first = self.feed(limit=2)
+        self.assertEqual(len(first['data']), 2)
+        self.assertTrue(first['has_more'])
+
+        rest = self.feed(since=first['next_since'])
+        self.assertEqual([event['entity_id'] for event in rest['data']], ['MEM-003'])
+        self.assertFalse(rest['has_more'])
+
+        again = self.feed(since=rest['next_since'])
+        self.assertEqual((again['data'], again['next_since']), ([], rest['next_since']))
+
+    @override_settings(LIVE_UPDATES=True)
+    def test_resume_from_live_event_id(self):
+        # Outbox ids 2, 3 and 4 become sequences 1, 2 and 3
+        late = ChangeEvent.objects.get(entity_id='MEM-001')
+        late.delete()
+        late.save()
+        with mock.patch('django_redis.get_redis_connection') as redis, self.captureOnCommitCallbacks(execute=True):
+            relay_batch(ListSink(), batch_size=2)
+        frames = [call.args[1] for call in redis.return_value.pipeline.return_value.publish.call_args_list]
+        self.assertEqual([data.split(b'\n')[:2] for data in frames], [
+            [b'id: 1', b'event: statistics'], [b'id: 2', b'event: statistics'],
+        ])
+
+        # A client reconnecting after the last frame it saw
+        relay_batch(ListSink(), batch_size=10)
+        last_id = frames[-1].split(b'\n')[0].removeprefix(b'id: ').decode()
+        rest = self.feed(since=last_id)
+        self.assertEqual([event['entity_id'] for event in rest['data']], ['MEM-001'])
+
+    def test_unpublished_events_are_held_back(self):
+        self.assertEqual(self.feed()['data'], [])
+        relay_batch(ListSink(), batch_size=1)
+        self.assertEqual([event['entity_id'] for event in self.feed()['data']], ['MEM-001'])
+
+    def test_late_commit_is_not_skipped(self):
+        # MEM-001's event takes the lowest id but commits after the others are read
+        late = ChangeEvent.objects.get(entity_id='MEM-001')
+        late.delete()
+        relay_batch(ListSink(), batch_size=10)
+        first = self.feed()
+        self.assertEqual([event['entity_id'] for event in first['data']], ['MEM-002', 'MEM-003'])
+
+        late.save()
+        relay_batch(ListSink(), batch_size=10)
+        rest = self.feed(since=first['next_since'])
+        self.assertEqual([(event['id'], event['entity_id']) for event in rest['data']], [(late.id, 'MEM-001')])
+
+    def test_purge_keeps_the_last_sequence(self):
+        relay_batch(ListSink(), batch_size=10)
+        ChangeEvent.objects.update(created_at=timezone.now() - timedelta(days=30))
+        self.assertEqual(purge_published(days=7), 2)
+        Member.objects.create(name='Member 3', email='member3@example.com', phone='0811', join_date=date.today())
+        relay_batch(ListSink(), batch_size=10)
+        self.assertEqual(ChangeEvent.objects.get(entity_id='MEM-004').sequence, 4)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/api/changes/', {'since': 'x'}).status_code, 400)
+
+
+class IdleBroadcaster(Broadcaster):
+    """Broadcaster fed by the test instead of Redis"""
+
+    async def listen(self):
+        await asyncio.Event().wait()
+
+
+class LiveFeedTests(TestCase):
+    """Live dashboard messages and fan-out"""
+
+    def test_point_posting_message(self):
+        member = Member.objects.create(name='Jane', email='jane@example.com', phone='0812', join_date=date.today())
+        PointTransaction.objects.create(member=member, transaction_type='redeem', points=-40)
+        kind, data, delta = live_message(ChangeEvent.objects.get(entity='point_transaction'))
+
+        self.assertEqual((kind, data['member_id'], data['points']), ('points', member.id, -40))
+        self.assertEqual(delta, {'points': {'total_transactions': 1, 'net_points': -40, 'total_redeemed': 40}})
+        # Balance updates are implied by the posting
+        self.assertIsNone(live_message(ChangeEvent.objects.filter(entity='member', operation='updated').last()))
+
+    @override_settings(LIVE_QUEUE_SIZE=2)
+    async def test_slow_subscriber_is_told_to_resync(self):
+        broadcaster = IdleBroadcaster()
+        queue = broadcaster.subscribe()
+        for data in (b'one', b'two', b'three'):
+            broadcaster.dispatch(data)
+
+        self.assertEqual(queue.get_nowait(), RESYNC)
+        self.assertTrue(queue.empty())
+        broadcaster.task.cancel()
+
+    @override_settings(LIVE_HEARTBEAT_SECONDS=0.01)
+    async def test_stream_sends_messages_and_heartbeats(self):
+        broadcaster = IdleBroadcaster()
+        stream = broadcaster.stream()
+        self.assertTrue((await anext(stream)).startswith(b'retry: '))
+
+        broadcaster.dispatch(b'event: points\ndata: {}\n\n')
+        self.assertEqual(await anext(stream), b'event: points\ndata: {}\n\n')
+        self.assertEqual(await anext(stream), HEARTBEAT)
+
+        await stream.aclose()
+        self.assertEqual(broadcaster.subscribers, set())
+        broadcaster.task.cancel()
+
+    def test_token_query_parameter_outside_asgi_mode(self):
+        user = User.objects.create_user(
+            username='staff', email='staff@example.com', password='staff-pass-123', full_name='Staff'
+        )
+        self.assertEqual(self.client.get('/api/live/').status_code, 401)
+        # Authenticated from the token alone, then refused: streams need ASGI workers
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/live/', {'token': str(AccessToken.for_user(user))})
+        self.assertEqual(response.status_code, 501)
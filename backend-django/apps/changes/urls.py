@@ -0,0 +1,9 @@
+"""
+Changes URLs
+"""
+from django.urls import path
+from .views import ChangeFeedView
+
+urlpatterns = [
+    path('', ChangeFeedView.as_view(), name='changes'),
+]
@@ -0,0 +1,106 @@
+"""
+Changes views
+"""
+import json
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.authentication.authentication import StreamJWTAuthentication
+from utils.asyncviews import AsyncAPIView
+from utils.db.router import ReplicaReadMixin
+from .live import get_broadcaster
+from .models import ChangeEvent
+from .serializers import ChangeEventSerializer
+
+MAX_LIMIT = 1000
+
+
+class ChangeFeedView(ReplicaReadMixin, APIView):
+    """
+    Change feed for downstream consumers
+
+    Returns up to ``limit`` (max 1000) events after the ``since`` cursor in
+    ``sequence`` order, optionally only for a comma-separated list of
+    ``entity`` names. Pass the response's ``next_since`` as ``since`` to
+    resume. Events appear once ``relay_changes`` has published them, in an
+    order that never puts a new event behind a cursor already handed out.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = ChangeEventSerializer
+    replica_actions = ('get',)
+    
+    def get(self, request):
+        """List change events after a cursor"""
+        try:
+            since = int(request.query_params.get('since', 0))
+            limit = min(int(request.query_params.get('limit', 100)), MAX_LIMIT)
+        except ValueError:
+            raise ValidationError('since and limit must be integers')
+        if since < 0 or limit < 1:
+            raise ValidationError('since must be >= 0 and limit >= 1')
+        
+        events = ChangeEvent.objects.filter(sequence__gt=since)
+        
+        entities = request.query_params.get('entity')
+        if entities:
+            events = events.filter(entity__in=entities.split(','))
+        
+        # One extra row tells whether another page follows
+        events = list(events.order_by('sequence')[:limit + 1])
+        has_more = len(events) > limit
+        events = events[:limit]
+        
+        return Response({
+            'success': True,
+            'data': ChangeEventSerializer(events, many=True).data,
+            'next_since': events[-1].sequence if events else since,
+            'has_more': has_more,
+        })
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Renders error responses for EventSource clients as an ``error`` event"""
+    media_type = 'text/event-stream'
+    format = 'sse'
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return f'event: error\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'.encode()
+
+
+class LiveFeedView(AsyncAPIView):
+    """
+    Live dashboard feed (Server-Sent Events, ASGI mode only)
+
+    Streams ``points``, ``redemption``, ``voucher`` and ``statistics``
+    events as the relay publishes changes, each with its statistics
+    ``delta`` where known, plus ``resync`` when the client fell behind.
+    Event ids are change feed cursors: resume with ``/api/changes/?since=``.
+    EventSource cannot send headers, so the JWT may be passed as ``?token=``.
+    """
+    authentication_classes = [StreamJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+    # A stream never ends (see crm_project/batch.py)
+    batchable = False
+    
+    async def get(self, request):
+        """Stream live updates"""
+        if not settings.ASGI:
+            # A WSGI worker would be held for as long as the client stays connected
+            return Response({
+                'success': False,
+                'message': 'Live updates are served in ASGI mode (SERVER_MODE=asgi)',
+            }, status=status.HTTP_501_NOT_IMPLEMENTED)
+        
+        response = StreamingHttpResponse(get_broadcaster().stream(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Stop nginx from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
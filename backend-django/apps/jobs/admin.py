@@ -0,0 +1,22 @@
+"""
+Jobs admin
+"""
+from django.contrib import admin
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """Job admin interface (read-only)"""
+    list_display = ['id', 'kind', 'status', 'processed', 'total', 'created_by', 'created_at', 'finished_at']
+    list_filter = ['kind', 'status']
+    list_select_related = ['created_by']
+    ordering = ['-created_at']
+    
+    def has_add_permission(self, request):
+        """Jobs are started through the API"""
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        """Job state is written by the workers"""
+        return False
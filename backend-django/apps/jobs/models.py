@@ -0,0 +1,103 @@
+"""
+Background job models
+"""
+import uuid
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class Job(models.Model):
+    """
+    Background job started through the API, tracked while Celery runs it
+
+    ``processed``/``total`` count items (e.g. members); jobs fanned out in
+    chunks also count finished chunks (see ``JobChunk``), and the job
+    succeeds once the last chunk does.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    
+    kind = models.CharField(max_length=50, help_text='Job kind, see apps.jobs.runner.JOB_KINDS')
+    
+    params = models.JSONField(encoder=DjangoJSONEncoder, default=dict, blank=True)
+    
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    
+    total = models.PositiveIntegerField(default=0, help_text='Items to process, once known')
+    
+    processed = models.PositiveIntegerField(default=0)
+    
+    chunks_total = models.PositiveIntegerField(default=0)
+    
+    chunks_done = models.PositiveIntegerField(default=0)
+    
+    result = models.JSONField(encoder=DjangoJSONEncoder, null=True, blank=True)
+    
+    error = models.TextField(blank=True, default='')
+    
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='jobs'
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['kind', '-created_at']),
+            models.Index(fields=['status']),
+        ]
+        verbose_name = 'Job'
+        verbose_name_plural = 'Jobs'
+    
+    def __str__(self):
+        return f"{self.kind} {self.id} ({self.status})"
+    
+    @property
+    def progress(self):
+        """Fraction of items processed, 0 to 1"""
+        if self.status == 'succeeded':
+            return 1.0
+        if not self.total:
+            return 0.0
+        return min(1.0, self.processed / self.total)
+
+
+class JobChunk(models.Model):
+    """
+    One chunk of a fanned-out job, named by the first key of its range
+
+    ``finished_at`` is set once, in the transaction that counts the chunk
+    towards its job, so a chunk redelivered after it finished counts once.
+    """
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='chunks')
+    
+    first_key = models.CharField(max_length=64)
+    
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'job_chunks'
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'first_key'], name='job_chunks_job_first_key_uniq'),
+        ]
+        verbose_name = 'Job chunk'
+        verbose_name_plural = 'Job chunks'
+    
+    def __str__(self):
+        return f"{self.job_id} from {self.first_key}"
@@ -0,0 +1,156 @@
+"""
+Running jobs on Celery
+
+A job is a ``Job`` row plus the Celery task that does the work. The task
+for a kind receives the job id, marks the job running with ``run_job`` and
+either finishes it or splits the work with ``fan_out``: each chunk task
+calls ``run_chunk``, and the job succeeds when its last chunk does.
+Chunks cover keyset ranges of primary keys (``key_ranges``), so a chunk
+task carries two ids rather than a list of them however large the set.
+Tasks are acknowledged late, so a chunk may run again after it finished;
+its work must be idempotent, and it is counted towards the job once.
+
+Tasks are dispatched after the surrounding transaction commits, so a worker
+never picks up a job or chunk whose row it cannot see yet.
+"""
+import traceback
+from contextlib import contextmanager
+
+from celery import group
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job, JobChunk
+
+
+# kind -> (Celery task, params serializer)
+JOB_KINDS = {
+    'award_points': ('apps.points.tasks.award_points', 'apps.points.tasks.AwardPointsParamsSerializer'),
+    'tier_report': ('apps.members.tasks.tier_report', 'apps.members.tasks.TierReportParamsSerializer'),
+    'retier_members': ('apps.members.tasks.retier_members', 'apps.members.tasks.RetierMembersParamsSerializer'),
+}
+
+
+def start_job(kind, params, user=None):
+    """Create a pending job of ``kind`` and queue its task"""
+    task = import_string(JOB_KINDS[kind][0])
+    job = Job.objects.create(kind=kind, params=params, created_by=user)
+    transaction.on_commit(lambda: task.delay(str(job.id)))
+    return job
+
+
+def fail_job(job_id, exc):
+    Job.objects.filter(pk=job_id).exclude(status='failed').update(
+        status='failed',
+        error=''.join(traceback.format_exception_only(type(exc), exc)).strip(),
+        finished_at=timezone.now(),
+    )
+
+
+@contextmanager
+def run_job(job_id, total=None):
+    """
+    Mark the job running for the duration of the block; yields the job
+
+    The job fails if the block raises. Otherwise it succeeds on exit, unless
+    the block fanned out chunks, which then finish it.
+    """
+    job = Job.objects.get(pk=job_id)
+    job.status = 'running'
+    job.started_at = timezone.now()
+    if total is not None:
+        job.total = total
+    job.save(update_fields=['status', 'started_at', 'total'])
+    try:
+        yield job
+    except Exception as exc:
+        fail_job(job_id, exc)
+        raise
+    if not job.chunks_total:
+        job.status = 'succeeded'
+        job.processed = job.total
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'processed', 'result', 'finished_at'])
+
+
+def key_ranges(queryset, chunk_size=None):
+    """
+    ``(first, last)`` primary keys of consecutive chunks of ``queryset``
+
+    One query per chunk, each an index range scan from the previous
+    boundary.
+    """
+    chunk_size = chunk_size or settings.JOBS_CHUNK_SIZE
+    keys = queryset.order_by('pk').values_list('pk', flat=True)
+    ranges = []
+    first = keys.first()
+    while first is not None:
+        last = keys.filter(pk__gte=first)[chunk_size - 1:chunk_size].first()
+        if last is None:
+            ranges.append((first, keys.last()))
+            break
+        ranges.append((first, last))
+        first = keys.filter(pk__gt=last).first()
+    return ranges
+
+
+def fan_out(job, task, ranges, *args):
+    """Queue ``task(job id, first, last, *args)`` for each range"""
+    job.chunks_total = len(ranges)
+    job.save(update_fields=['total', 'chunks_total'])
+    if not ranges:
+        return
+    JobChunk.objects.bulk_create(JobChunk(job=job, first_key=str(first)) for first, _ in ranges)
+    chunks = group(task.s(str(job.id), first, last, *args) for first, last in ranges)
+    transaction.on_commit(chunks.delay)
+
+
+class ChunkProgress:
+    """Items processed by one chunk"""
+
+    def __init__(self):
+        self.processed = 0
+
+    def advance(self, count):
+        self.processed += count
+
+
+@contextmanager
+def run_chunk(job_id, first):
+    """
+    Run the chunk of a fanned-out job starting at key ``first``; the block
+    reports items processed to the yielded ``ChunkProgress``. Finishing the
+    last chunk finishes the job.
+
+    The block and the count commit together, so a chunk redelivered before
+    it committed starts over, and one redelivered after is not counted again.
+    """
+    progress = ChunkProgress()
+    try:
+        with transaction.atomic():
+            yield progress
+            finish_chunk(job_id, first, progress.processed)
+    except Exception as exc:
+        fail_job(job_id, exc)
+        raise
+
+
+def finish_chunk(job_id, first, processed):
+    # Locked, so exactly one chunk sees the last one finish
+    job = Job.objects.select_for_update().get(pk=job_id)
+    finished = JobChunk.objects.filter(job_id=job_id, first_key=str(first), finished_at__isnull=True).update(
+        finished_at=timezone.now()
+    )
+    if not finished:
+        return
+    job.chunks_done = F('chunks_done') + 1
+    job.processed = F('processed') + processed
+    job.save(update_fields=['chunks_done', 'processed'])
+    job.refresh_from_db(fields=['chunks_done', 'chunks_total', 'status'])
+    if job.chunks_done >= job.chunks_total and job.status == 'running':
+        job.status = 'succeeded'
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'finished_at'])
@@ -0,0 +1,39 @@
+"""
+Jobs serializers
+"""
+from django.utils.module_loading import import_string
+from rest_framework import serializers
+
+from .models import Job
+from .runner import JOB_KINDS
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Job status and progress"""
+    
+    progress = serializers.FloatField(read_only=True)
+    
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'kind', 'params', 'status', 'progress', 'total', 'processed',
+            'chunks_total', 'chunks_done', 'result', 'error',
+            'created_at', 'started_at', 'finished_at',
+        ]
+        read_only_fields = fields
+
+
+class JobCreateSerializer(serializers.Serializer):
+    """Job to start; ``params`` are validated by the kind's own serializer"""
+    
+    kind = serializers.ChoiceField(choices=sorted(JOB_KINDS))
+    params = serializers.DictField(required=False, default=dict)
+    
+    def validate(self, attrs):
+        _, params_serializer = JOB_KINDS[attrs['kind']]
+        serializer = import_string(params_serializer)(data=attrs['params'])
+        if not serializer.is_valid():
+            raise serializers.ValidationError({'params': serializer.errors})
+        # Stored as JSON; dates and decimals come back as strings
+        attrs['params'] = serializer.data
+        return attrs
@@ -0,0 +1,101 @@
+"""
+Jobs tests
+"""
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from apps.members.models import Member
+from apps.points.models import PointTransaction
+from apps.members.tasks import retier_member_chunk
+from apps.points.tasks import award_points_chunk
+from .models import Job
+from .runner import fan_out, key_ranges
+
+User = get_user_model()
+
+
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True, JOBS_CHUNK_SIZE=2)
+class JobPipelineTests(TestCase):
+    """Jobs run end to end with Celery in eager mode, without a broker"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(
+            username='staff', email='staff@example.com', password='staff-pass-123', full_name='Staff'
+        ))
+        for i, points in enumerate([100, 600, 1200, 3000, 50]):
+            Member.objects.create(
+                name=f'Member {i}', email=f'member{i}@example.com', phone='0811',
+                join_date=date.today(), total_points=points,
+            )
+
+    def start(self, kind, params=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/jobs/', {'kind': kind, 'params': params or {}}, format='json')
+        self.assertEqual(response.status_code, 202, response.content)
+        return self.client.get(f"/api/jobs/{response.data['data']['id']}/").data['data']
+
+    def test_retier_fans_out_in_chunks(self):
+        job = self.start('retier_members')
+
+        self.assertEqual(job['status'], 'succeeded')
+        self.assertEqual((job['total'], job['processed'], job['progress']), (5, 5, 1.0))
+        self.assertEqual((job['chunks_total'], job['chunks_done']), (3, 3))
+        self.assertEqual(
+            sorted(Member.objects.values_list('total_points', 'tier_level')),
+            [(50, 'Bronze'), (100, 'Bronze'), (600, 'Silver'), (1200, 'Gold'), (3000, 'Platinum')],
+        )
+
+    def test_award_points_to_segment(self):
+        Member.objects.filter(total_points=50).update(status='Inactive')
+        job = self.start('award_points', {'points': 10, 'description': 'Anniversary bonus'})
+
+        self.assertEqual((job['status'], job['total'], job['processed']), ('succeeded', 4, 4))
+        self.assertEqual(PointTransaction.objects.filter(description='Anniversary bonus').count(), 4)
+        self.assertEqual(Member.objects.get(total_points__gt=3000).total_points, 3010)
+
+        # A redelivered chunk does not award anyone twice, nor count twice
+        first, last = key_ranges(Member.objects.all())[0]
+        award_points_chunk(job['id'], first, last)
+        self.assertEqual(PointTransaction.objects.filter(description='Anniversary bonus').count(), 4)
+        job = Job.objects.get(pk=job['id'])
+        self.assertEqual((job.processed, job.chunks_done), (4, 2))
+
+    def test_redelivered_chunks_count_once(self):
+        job = Job.objects.create(kind='retier_members', status='running', total=5)
+        ranges = key_ranges(Member.objects.all())
+        fan_out(job, retier_member_chunk, ranges)
+        for first, last in ranges[:2] + ranges[:1]:
+            retier_member_chunk(str(job.id), first, last)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed, job.chunks_done), ('running', 4, 2))
+
+        retier_member_chunk(str(job.id), *ranges[2])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed, job.chunks_done), ('succeeded', 5, 3))
+
+    def test_tier_report(self):
+        Member.objects.update(tier_level='Bronze')
+        job = self.start('tier_report')
+
+        self.assertEqual(job['status'], 'succeeded')
+        self.assertEqual(job['result']['tiers']['Bronze']['members'], 5)
+        self.assertEqual(job['result']['tiers']['Bronze']['total_points'], 4950)
+
+    def test_invalid_jobs_are_rejected(self):
+        response = self.client.post('/api/jobs/', {'kind': 'award_points', 'params': {'points': 0}}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/jobs/', {'kind': 'unknown'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Job.objects.exists())
+
+    def test_failed_chunk_fails_the_job(self):
+        job = Job.objects.create(kind='award_points', params={'points': 10}, status='running', chunks_total=1)
+        with self.assertRaises(KeyError):
+            award_points_chunk(str(job.id), 'MEM-001', 'MEM-005')
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('KeyError', job.error)
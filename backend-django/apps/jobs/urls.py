@@ -0,0 +1,10 @@
+"""
+Jobs URLs
+"""
+from django.urls import path
+from .views import JobCreateView, JobDetailView
+
+urlpatterns = [
+    path('', JobCreateView.as_view(), name='jobs'),
+    path('<uuid:pk>/', JobDetailView.as_view(), name='job-detail'),
+]
@@ -0,0 +1,49 @@
+"""
+Jobs views
+"""
+from rest_framework import status
+from rest_framework.generics import get_object_or_404
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .models import Job
+from .runner import start_job
+from .serializers import JobCreateSerializer, JobSerializer
+
+
+class JobCreateView(APIView):
+    """
+    Start a background job; poll its ``/api/jobs/<id>/`` for progress
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = JobCreateSerializer
+    
+    def post(self, request):
+        serializer = JobCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = start_job(serializer.validated_data['kind'], serializer.validated_data['params'], user=request.user)
+        
+        return Response({
+            'success': True,
+            'message': 'Job queued',
+            'data': JobSerializer(job).data
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class JobDetailView(APIView):
+    """
+    Job status and progress
+
+    Always read from the primary: progress is polled while workers write it.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = JobSerializer
+    
+    def get(self, request, pk):
+        job = get_object_or_404(Job, pk=pk)
+        
+        return Response({
+            'success': True,
+            'data': JobSerializer(job).data
+        })
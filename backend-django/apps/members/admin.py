@@ -2,15 +2,18 @@
 Members admin
 """
 from django.contrib import admin
+
+from utils.admin import DateDrilldownListFilter, LargeTableAdmin
 from .models import Member
 
 
 @admin.register(Member)
-class MemberAdmin(admin.ModelAdmin):
+class MemberAdmin(LargeTableAdmin):
     """Member admin interface"""
     list_display = ['id', 'name', 'email', 'phone', 'tier_level', 'total_points', 'status', 'join_date']
-    list_filter = ['tier_level', 'status', 'join_date']
-    search_fields = ['id', 'name', 'email', 'phone']
+    list_filter = ['tier_level', 'status', ('join_date', DateDrilldownListFilter)]
+    # Exact matches on indexed columns; names by prefix
+    search_fields = ['id__exact', 'email__exact', 'phone__exact', 'name__istartswith']
     readonly_fields = ['id', 'created_at', 'updated_at', 'total_points']
     ordering = ['-created_at']
     
@@ -0,0 +1,467 @@
+"""
+Synthetic CRM datasets for load tests and benchmarks
+
+``DatasetGenerator`` builds members, vouchers and their point and redeem
+transactions from a seed. Members are generated in fixed chunks of
+``CHUNK_MEMBERS``, each from its own random streams, so a chunk comes out
+the same whichever process builds it and in whatever order; the same
+arguments always give the same dataset.
+
+Distributions aim at what makes production slow rather than at realism for
+its own sake:
+
+- activity is power-law (Zipf-like): a few members have thousands of
+  transactions, a fifth never come back after their welcome bonus;
+- sign-ups grow over time, and transactions follow a seasonal calendar
+  (year-end and 11.11 peaks, paydays, weekends, evenings);
+- voucher popularity is Zipfian, and members only redeem vouchers that are
+  valid on the day and that they can afford.
+
+Balances are replayed per member, so ``total_points`` equals the member's
+point transactions minus their uncancelled redemptions, no balance ever
+goes negative and ``tier_level`` matches the balance.
+
+Rows are loaded with ``COPY`` (PostgreSQL only) and bypass model saves: no
+change events, audit records or cache versions are written.
+"""
+import bisect
+import datetime
+import math
+import random
+from zoneinfo import ZoneInfo
+
+import django
+from django.db import connections, transaction
+
+
+# Members per chunk; part of the dataset's definition, so not configurable
+CHUNK_MEMBERS = 2000
+
+# Share of members who never transact after their welcome bonus
+DORMANT_SHARE = 0.2
+
+# Pareto shape of member activity, and its cap in multiples of the scale
+ACTIVITY_SHAPE = 1.5
+ACTIVITY_CAP = 150
+
+# Voucher popularity: weight of the voucher ranked r is 1 / r ** VOUCHER_SKEW
+VOUCHER_SKEW = 1.1
+
+WELCOME_BONUS = 100
+
+MONTH_WEIGHTS = [0.9, 0.85, 0.95, 1.0, 1.0, 1.1, 1.05, 1.0, 0.95, 1.0, 1.3, 1.5]
+WEEKDAY_WEIGHTS = [0.9, 0.9, 0.9, 0.95, 1.1, 1.35, 1.3]
+PAYDAY_WEIGHT = 1.2
+HOUR_WEIGHTS = [
+    0.2, 0.1, 0.05, 0.05, 0.05, 0.1, 0.3, 0.6, 0.9, 1.1, 1.3, 1.5,
+    1.7, 1.5, 1.3, 1.3, 1.4, 1.6, 1.9, 2.1, 2.0, 1.6, 1.0, 0.5,
+]
+
+FIRST_NAMES = [
+    'Adi', 'Agus', 'Alice', 'Andi', 'Bayu', 'Bob', 'Budi', 'Charlie', 'Citra', 'Dewi', 'Dian', 'Eka',
+    'Fajar', 'Fitri', 'Gita', 'Hendra', 'Indah', 'Intan', 'Jane', 'John', 'Joko', 'Kartika', 'Lestari',
+    'Maya', 'Nur', 'Putri', 'Rani', 'Rizky', 'Sari', 'Siti', 'Taufik', 'Tika', 'Wahyu', 'Wulan', 'Yogi',
+]
+LAST_NAMES = [
+    'Brown', 'Doe', 'Gunawan', 'Halim', 'Hidayat', 'Johnson', 'Kurniawan', 'Kusuma', 'Lubis', 'Nasution',
+    'Pratama', 'Purnomo', 'Putra', 'Rahman', 'Saputra', 'Setiawan', 'Siregar', 'Smith', 'Susanto',
+    'Tanjung', 'Wibowo', 'Wijaya', 'Wilson', 'Yulianto',
+]
+EMAIL_DOMAINS = ['gmail.com', 'yahoo.co.id', 'email.com', 'outlook.com', 'icloud.com']
+PHONE_PREFIXES = ['0811', '0812', '0813', '0821', '0822', '0852', '0857', '0878', '0896']
+STREETS = [
+    'Sudirman', 'Thamrin', 'Gatot Subroto', 'Asia Afrika', 'Tunjungan', 'Diponegoro', 'Malioboro',
+    'Ahmad Yani', 'Pemuda', 'Merdeka', 'Veteran', 'Pahlawan',
+]
+# City, weight: most members live in a few large cities
+CITIES = [
+    ('Jakarta Selatan', 18), ('Jakarta Pusat', 10), ('Jakarta Barat', 9), ('Surabaya', 12), ('Bandung', 10),
+    ('Medan', 7), ('Semarang', 5), ('Yogyakarta', 5), ('Makassar', 4), ('Denpasar', 4), ('Malang', 3),
+    ('Palembang', 3), ('Bekasi', 6), ('Tangerang', 6), ('Depok', 4),
+]
+STORES = ['Grand Indonesia', 'Pakuwon Mall', 'Paris Van Java', 'Plaza Senayan', 'Online Store', 'Tunjungan Plaza']
+STAFF = ['admin', 'staff1']
+
+VOUCHER_COSTS = [(100, 8), (150, 8), (200, 10), (250, 10), (300, 9), (500, 8), (750, 5), (1000, 4),
+                 (1500, 2), (2000, 1), (2500, 1)]
+VOUCHER_DURATIONS = [30, 60, 90, 180, 365]
+
+MEMBER_COLUMNS = [
+    'id', 'name', 'email', 'phone', 'email_canonical', 'phone_e164', 'address', 'join_date', 'total_points',
+    'tier_level', 'status', 'created_at', 'updated_at',
+]
+VOUCHER_COLUMNS = [
+    'id', 'code', 'name', 'description', 'type', 'discount_value', 'points_cost', 'stock', 'start_date',
+    'end_date', 'status', 'created_at', 'updated_at',
+]
+POINT_COLUMNS = [
+    'id', 'member_id', 'transaction_type', 'points', 'description', 'transaction_date', 'created_by', 'created_at',
+]
+REDEEM_COLUMNS = [
+    'id', 'member_id', 'voucher_id', 'points_cost', 'status', 'redeem_date', 'used_date', 'created_at',
+    'updated_at',
+]
+
+
+def cumulative(weights):
+    total = 0
+    result = []
+    for weight in weights:
+        total += weight
+        result.append(total)
+    return result
+
+
+def pick(rng, cum_weights, low=0.0):
+    """Index drawn from ``cum_weights``, restricted to those above ``low``"""
+    index = bisect.bisect_right(cum_weights, low + rng.random() * (cum_weights[-1] - low))
+    return min(index, len(cum_weights) - 1)
+
+
+class DatasetGenerator:
+    """
+    Rows of a synthetic dataset
+
+    ``members`` members joining over ``years`` years before ``end_date``,
+    averaging ``txn_per_member`` transactions (point and redeem together),
+    and ``vouchers`` vouchers. Timestamps are in ``time_zone``.
+    """
+
+    def __init__(self, seed, members, txn_per_member, vouchers, end_date, years=3, time_zone='UTC'):
+        self.seed = seed
+        self.members = members
+        self.txn_per_member = txn_per_member
+        self.voucher_count = vouchers
+        self.end_date = end_date
+        self.start_date = end_date - datetime.timedelta(days=365 * years)
+        self.time_zone = time_zone
+        self.id_width = max(3, len(str(members)))
+        self._calendar = None
+        self._vouchers = None
+
+    @property
+    def chunks(self):
+        return math.ceil(self.members / CHUNK_MEMBERS)
+
+    def random(self, stream, chunk=0):
+        # String seeds are hashed with SHA-512: stable across processes and runs
+        return random.Random(f'{self.seed}:{stream}:{chunk}')
+
+    # Calendar
+
+    @property
+    def calendar(self):
+        """``(midnights, cumulative day weights, cumulative hour weights)`` of the timeline"""
+        if self._calendar is None:
+            zone = ZoneInfo(self.time_zone)
+            days = [self.start_date + datetime.timedelta(days=i) for i in range((self.end_date - self.start_date).days)]
+            midnights = [datetime.datetime.combine(day, datetime.time(), tzinfo=zone) for day in days]
+            weights = [
+                MONTH_WEIGHTS[day.month - 1] * WEEKDAY_WEIGHTS[day.weekday()]
+                * (PAYDAY_WEIGHT if day.day >= 25 or day.day == 1 else 1.0)
+                for day in days
+            ]
+            self._calendar = (midnights, cumulative(weights), cumulative(HOUR_WEIGHTS))
+        return self._calendar
+
+    def timestamp(self, rng, first_day=0):
+        """Seasonally weighted time on or after day ``first_day`` of the timeline; ``(day, datetime)``"""
+        midnights, day_weights, _ = self.calendar
+        day = pick(rng, day_weights, day_weights[first_day - 1] if first_day else 0.0)
+        return day, midnights[day] + self.time_of_day(rng)
+
+    def time_of_day(self, rng):
+        seconds = pick(rng, self.calendar[2]) * 3600 + int(rng.random() * 3600)
+        return datetime.timedelta(seconds=seconds)
+
+    # Vouchers
+
+    @property
+    def vouchers(self):
+        """
+        ``(rows, {month: (voucher indexes, cumulative popularity)})``; the
+        index is of the vouchers valid at some point in each month
+        """
+        if self._vouchers is None:
+            rng = self.random('vouchers')
+            midnights = self.calendar[0]
+            rows = []
+            ranks = list(range(1, self.voucher_count + 1))
+            rng.shuffle(ranks)
+            cost_weights = cumulative(weight for _, weight in VOUCHER_COSTS)
+            by_month = {}
+
+            for index in range(self.voucher_count):
+                voucher_id = index + 1
+                kind = rng.choices(['discount', 'cashback', 'freebie'], weights=[6, 3, 1])[0]
+                points_cost = VOUCHER_COSTS[pick(rng, cost_weights)][0]
+                start = self.start_date + datetime.timedelta(
+                    days=rng.randrange(-30, (self.end_date - self.start_date).days + 30)
+                )
+                end = start + datetime.timedelta(days=rng.choice(VOUCHER_DURATIONS))
+                if kind == 'discount':
+                    percent = rng.choice([5, 10, 15, 20, 25, 30, 50])
+                    code, name, value = f'DISC{voucher_id:05d}', f'Diskon {percent}%', percent
+                    description = f'Diskon {percent}% untuk semua produk'
+                elif kind == 'cashback':
+                    amount = rng.choice([10, 25, 50, 100, 200]) * 1000
+                    label = f'{amount:,}'.replace(',', '.')
+                    code, name, value = f'CASH{voucher_id:05d}', f'Cashback Rp {label}', amount
+                    description = f'Cashback Rp {label} untuk pembelian minimum Rp {label}0'
+                else:
+                    code, name, value = f'GIFT{voucher_id:05d}', 'Free Gift Special', 0
+                    description = 'Gratis 1 produk pilihan untuk member setia'
+                if end < self.end_date:
+                    status = 'Expired'
+                elif start > self.end_date:
+                    status = 'Inactive'
+                else:
+                    status = 'Active'
+                created_at = datetime.datetime.combine(
+                    start - datetime.timedelta(days=7), datetime.time(9), tzinfo=midnights[0].tzinfo
+                )
+                rows.append((
+                    voucher_id, code, name, description, kind, value, points_cost, rng.randrange(0, 500),
+                    start, end, status, created_at, created_at,
+                ))
+
+                month = datetime.date(start.year, start.month, 1)
+                while month <= end:
+                    by_month.setdefault(month, []).append(index)
+                    month = (month + datetime.timedelta(days=32)).replace(day=1)
+
+            popularity = [1 / rank ** VOUCHER_SKEW for rank in ranks]
+            index = {
+                month: (indexes, cumulative(popularity[i] for i in indexes)) for month, indexes in by_month.items()
+            }
+            self._vouchers = (rows, index)
+        return self._vouchers
+
+    def pick_voucher(self, rng, day, balance):
+        """A popular voucher valid on ``day`` costing at most ``balance``, or None"""
+        rows, by_month = self.vouchers
+        candidates = by_month.get(datetime.date(day.year, day.month, 1))
+        if not candidates:
+            return None
+        indexes, popularity = candidates
+        for _ in range(3):
+            row = rows[indexes[pick(rng, popularity)]]
+            if row[8] <= day <= row[9] and row[6] <= balance:
+                return row
+        return None
+
+    # Members
+
+    def event_counts(self, chunk):
+        """Transactions of each member of ``chunk``, welcome bonus included"""
+        rng = self.random('activity', chunk)
+        first = chunk * CHUNK_MEMBERS
+        size = min(CHUNK_MEMBERS, self.members - first)
+        # Pareto capped at ACTIVITY_CAP has mean 1 + (1 - cap^(1 - a)) / (a - 1)
+        capped_mean = 1 + (1 - ACTIVITY_CAP ** (1 - ACTIVITY_SHAPE)) / (ACTIVITY_SHAPE - 1)
+        scale = max(self.txn_per_member - 1, 0) / (1 - DORMANT_SHARE) / capped_mean
+        counts = []
+        for _ in range(size):
+            activity = 0
+            if rng.random() >= DORMANT_SHARE:
+                activity = int(scale * min(rng.paretovariate(ACTIVITY_SHAPE), ACTIVITY_CAP) + rng.random())
+            counts.append(1 + activity)
+        return counts
+
+    def chunk_rows(self, chunk, first_id):
+        """
+        ``(member rows, point transaction rows, redeem transaction rows)`` of
+        ``chunk``; its transactions take ids from ``first_id`` on, one per
+        transaction of either kind
+        """
+        from .models import Member
+        from .normalization import canonical_email, phone_e164
+
+        rng = self.random('members', chunk)
+        midnights = self.calendar[0]
+        last_day = len(midnights) - 1
+        end = midnights[-1] + datetime.timedelta(days=1)
+        city_weights = cumulative(weight for _, weight in CITIES)
+        members, points, redeems = [], [], []
+        next_id = first_id
+
+        for offset, count in enumerate(self.event_counts(chunk)):
+            number = chunk * CHUNK_MEMBERS + offset + 1
+            member_id = f'MEM-{number:0{self.id_width}d}'
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+
+            # Sign-ups grow over time: the density of join days rises linearly
+            join_day = min(int(math.sqrt(rng.random()) * len(midnights)), last_day)
+            joined = midnights[join_day] + self.time_of_day(rng)
+            events = sorted(self.timestamp(rng, join_day) for _ in range(count - 1))
+
+            balance = WELCOME_BONUS
+            points.append((next_id, member_id, 'earn', WELCOME_BONUS, 'Welcome bonus', joined, 'system', joined))
+            next_id += 1
+            updated = joined
+            for day, occurred in events:
+                occurred = max(occurred, joined)
+                updated = occurred
+                roll = rng.random()
+                voucher = self.pick_voucher(rng, midnights[day].date(), balance) if roll < 0.07 else None
+                if voucher:
+                    used_at = None
+                    if end - occurred < datetime.timedelta(days=3) and rng.random() < 0.5:
+                        status = 'Pending'
+                    else:
+                        status = rng.choices(['Used', 'Completed', 'Cancelled'], weights=[65, 25, 10])[0]
+                    if status == 'Used':
+                        used_at = min(occurred + datetime.timedelta(hours=rng.uniform(0.5, 14 * 24)), end)
+                        updated = used_at
+                    if status != 'Cancelled':
+                        balance -= voucher[6]
+                    redeems.append((
+                        next_id, member_id, voucher[0], voucher[6], status, occurred, used_at, occurred,
+                        used_at or occurred,
+                    ))
+                elif 0.07 <= roll < 0.085 and balance > 0:
+                    expired = max(1, int(balance * rng.uniform(0.1, 0.5)))
+                    balance -= expired
+                    points.append((next_id, member_id, 'expire', -expired, 'Points expired', occurred, 'system',
+                                   occurred))
+                elif 0.085 <= roll < 0.095:
+                    amount = rng.choice([10, 25, 50, 100])
+                    if balance >= amount and rng.random() < 0.4:
+                        amount = -amount
+                    balance += amount
+                    points.append((next_id, member_id, 'adjustment', amount, 'Manual adjustment', occurred,
+                                   rng.choice(STAFF), occurred))
+                else:
+                    earned = max(5, int(rng.lognormvariate(3.9, 0.8)) // 5 * 5)
+                    balance += earned
+                    points.append((next_id, member_id, 'earn', earned, f'Purchase at {rng.choice(STORES)}', occurred,
+                                   'pos', occurred))
+                next_id += 1
+
+            inactive = (end - updated).days > 365 and rng.random() < 0.6
+            email = f'{first}.{last}{number}@{rng.choice(EMAIL_DOMAINS)}'.lower()
+            phone = f'{rng.choice(PHONE_PREFIXES)}{rng.randrange(10 ** 6, 10 ** 8)}'
+            members.append((
+                member_id,
+                f'{first} {last}',
+                email,
+                phone,
+                canonical_email(email),
+                phone_e164(phone),
+                f'Jl. {rng.choice(STREETS)} No. {rng.randrange(1, 300)}, {CITIES[pick(rng, city_weights)][0]}',
+                midnights[join_day].date(),
+                balance,
+                Member.tier_for_points(balance),
+                'Inactive' if inactive else 'Active',
+                joined,
+                updated,
+            ))
+        return members, points, redeems
+
+
+def copy_rows(cursor, table, columns, rows):
+    """``COPY`` ``rows`` into ``columns`` of ``table``"""
+    with cursor.copy(f'COPY "{table}" ({", ".join(columns)}) FROM STDIN') as copy:
+        for row in rows:
+            copy.write_row(row)
+
+
+def load_vouchers(generator, using='default'):
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        copy_rows(cursor, 'vouchers', VOUCHER_COLUMNS, generator.vouchers[0])
+    return generator.voucher_count
+
+
+def load_chunk(generator, chunk, first_id, using='default'):
+    """Generate and ``COPY`` one chunk in its own transaction; returns row counts"""
+    members, points, redeems = generator.chunk_rows(chunk, first_id)
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        # Losing the last chunks in a crash is fine for generated data
+        cursor.execute('SET LOCAL synchronous_commit = off')
+        copy_rows(cursor, 'members', MEMBER_COLUMNS, members)
+        copy_rows(cursor, 'point_transactions', POINT_COLUMNS, points)
+        copy_rows(cursor, 'redeem_transactions', REDEEM_COLUMNS, redeems)
+    return len(members), len(points), len(redeems)
+
+
+def create_dataset(generator, using='default'):
+    """
+    Save a small dataset through the ORM, on any database (smoke runs on
+    SQLite, tests); large ones are for ``generate_dataset``
+    """
+    from django.core.management.color import no_style
+
+    from apps.points.models import PointTransaction
+    from apps.redeem.models import RedeemTransaction
+    from apps.vouchers.models import Voucher
+    from .models import Member
+
+    models = [
+        (Voucher, VOUCHER_COLUMNS), (Member, MEMBER_COLUMNS),
+        (PointTransaction, POINT_COLUMNS), (RedeemTransaction, REDEEM_COLUMNS),
+    ]
+    rows = [[] for _ in models]
+    rows[0] = generator.vouchers[0]
+    first_id = 1
+    for chunk in range(generator.chunks):
+        members, points, redeems = generator.chunk_rows(chunk, first_id)
+        first_id += len(points) + len(redeems)
+        rows[1] += members
+        rows[2] += points
+        rows[3] += redeems
+
+    connection = connections[using]
+    with transaction.atomic(using=using):
+        for (model, columns), model_rows in zip(models, rows):
+            objects = [model(**dict(zip(columns, row))) for row in model_rows]
+            model.objects.using(using).bulk_create(objects, batch_size=1000)
+            # bulk_create stamps auto_now(_add) columns with the current time
+            stamped = [
+                field.attname for field in model._meta.concrete_fields
+                if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+            ]
+            for obj, row in zip(objects, model_rows):
+                for column in stamped:
+                    setattr(obj, column, row[columns.index(column)])
+            model.objects.using(using).bulk_update(objects, stamped, batch_size=1000)
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [model for model, _ in models]):
+                cursor.execute(sql)
+
+
+# Generator and database alias of a worker process, set by init_worker
+worker_state = {}
+
+
+def init_worker(generator, using, name):
+    """
+    Set up Django in a spawned worker process, on the database named
+    ``name`` (under tests, the test database)
+
+    This module is imported before Django is set up in workers, hence no
+    model imports at module level.
+    """
+    django.setup()
+    connections[using].settings_dict['NAME'] = name
+    worker_state.update(generator=generator, using=using)
+
+
+def worker_count(chunk):
+    return sum(worker_state['generator'].event_counts(chunk))
+
+
+def worker_load(chunk, first_id):
+    return load_chunk(worker_state['generator'], chunk, first_id, worker_state['using'])
+
+
+def secondary_indexes(cursor, table):
+    """``(name, definition)`` of the indexes of ``table`` that back no constraint"""
+    cursor.execute(
+        """
+        SELECT index_class.relname, pg_get_indexdef(index_class.oid)
+        FROM pg_index JOIN pg_class index_class ON index_class.oid = pg_index.indexrelid
+        WHERE pg_index.indrelid = to_regclass(%s) AND NOT pg_index.indisunique AND NOT pg_index.indisprimary
+        """,
+        [table],
+    )
+    return cursor.fetchall()
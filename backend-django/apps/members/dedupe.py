@@ -0,0 +1,250 @@
+"""
+Duplicate member detection and merging
+
+Comparing every pair of members is out of the question at millions of
+rows, so members are first grouped into blocks by keys that duplicates
+are likely to share:
+
+- ``phone``: the last 8 digits of ``phone_e164``
+- ``email``: the canonical email without dots or a ``+tag`` in its local
+  part (``Budi.Santoso+promo@gmail.com`` and ``budisantoso@gmail.com``)
+- ``name``: Soundex codes of the first and last name, in either order
+
+Only pairs within a block are scored, each block at once with numpy: the
+weights of matching email keys and E.164 numbers, plus the name weight
+times the Jaccard similarity of the names' character trigrams. Pairs
+scoring ``DEDUPE_MIN_SCORE`` or more are reported, best first. Blocks
+larger than ``DEDUPE_MAX_BLOCK`` are skipped: a key that common does not
+tell members apart. With ``shards``, blocks are built and scored a
+hash-slice of keys at a time, in as many passes over the table, to bound
+memory.
+
+``merge_members`` folds a duplicate into the member kept.
+"""
+import csv
+import unicodedata
+import zlib
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+from django.db import router, transaction
+from django.utils import timezone
+
+from apps.changes.outbox import record_changes
+from utils.cache import bump_version
+from .models import Member
+
+
+EMAIL_WEIGHT = 0.35
+PHONE_WEIGHT = 0.35
+NAME_WEIGHT = 0.3
+
+PHONE_SUFFIX_DIGITS = 8
+
+SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'),
+    **dict.fromkeys('cgjkqsxz', '2'),
+    **dict.fromkeys('dt', '3'),
+    'l': '4',
+    **dict.fromkeys('mn', '5'),
+    'r': '6',
+}
+
+REPORT_COLUMNS = [
+    'rank', 'score', 'matched', 'member_a', 'member_b', 'name_a', 'name_b', 'email_a', 'email_b',
+    'phone_a', 'phone_b',
+]
+
+
+def ascii_letters(text):
+    """``text`` lowercased, accents stripped, anything but letters and spaces dropped"""
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode().lower()
+    return ''.join(char if 'a' <= char <= 'z' else ' ' for char in text)
+
+
+def soundex(word):
+    """American Soundex code of ``word`` (``Santoso`` -> ``S532``)"""
+    word = word.lower()
+    if not word:
+        return ''
+    code = word[0].upper()
+    previous = SOUNDEX_CODES.get(word[0], '')
+    for char in word[1:]:
+        digit = SOUNDEX_CODES.get(char, '')
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        # Letters coded alike are one code unless a vowel separates them
+        if char not in 'hw':
+            previous = digit
+    return code.ljust(4, '0')
+
+
+def name_key(name):
+    words = ascii_letters(name).split()
+    if not words:
+        return ''
+    return ' '.join(sorted({soundex(words[0]), soundex(words[-1])}))
+
+
+def email_key(email):
+    local, _, domain = (email or '').rpartition('@')
+    local = local.split('+', 1)[0].replace('.', '')
+    if not local or not domain:
+        return ''
+    return f'{local}@{"gmail.com" if domain == "googlemail.com" else domain}'
+
+
+def phone_suffix(phone):
+    digits = (phone or '').lstrip('+')
+    return digits[-PHONE_SUFFIX_DIGITS:] if len(digits) >= PHONE_SUFFIX_DIGITS else ''
+
+
+def trigrams(name):
+    text = f'  {" ".join(ascii_letters(name).split())} '
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def blocking_keys(name, email, phone):
+    """Blocking keys of one member; see the module docstring"""
+    keys = [f'phone:{phone_suffix(phone)}', f'email:{email_key(email)}', f'name:{name_key(name)}']
+    return [key for key in keys if not key.endswith(':')]
+
+
+def codes(values):
+    """Integer code per value, equal values sharing one; ``-1`` for blanks"""
+    _, inverse = np.unique(np.array(values, dtype=object).astype(str), return_inverse=True)
+    return np.where(np.array([bool(value) for value in values]), inverse, -1)
+
+
+def score_block(names, emails, phones):
+    """
+    ``(i, j, score, email match, phone match, name similarity)`` arrays over
+    every pair ``i < j`` of one block's members
+    """
+    count = len(names)
+    grams = [trigrams(name) for name in names]
+    vocabulary = {gram: column for column, gram in enumerate(set().union(*grams))}
+    incidence = np.zeros((count, len(vocabulary)), dtype=np.float32)
+    for row, member_grams in enumerate(grams):
+        incidence[row, [vocabulary[gram] for gram in member_grams]] = 1
+    shared = incidence @ incidence.T
+    sizes = incidence.sum(axis=1)
+    union = sizes[:, None] + sizes[None, :] - shared
+    name_similarity = np.divide(shared, union, out=np.zeros_like(shared), where=union > 0)
+
+    email_codes, phone_codes = codes(emails), codes(phones)
+    email_match = (email_codes[:, None] == email_codes[None, :]) & (email_codes[:, None] >= 0)
+    phone_match = (phone_codes[:, None] == phone_codes[None, :]) & (phone_codes[:, None] >= 0)
+
+    scores = EMAIL_WEIGHT * email_match + PHONE_WEIGHT * phone_match + NAME_WEIGHT * name_similarity
+    i, j = np.triu_indices(count, k=1)
+    return i, j, scores[i, j], email_match[i, j], phone_match[i, j], name_similarity[i, j]
+
+
+def build_blocks(rows, shards=1, shard=0):
+    """
+    ``(members, blocks)``: ``(id, name, email, phone)`` of the members with a
+    key in ``shard``, and their positions in ``members`` by blocking key
+    """
+    members = []
+    blocks = defaultdict(list)
+    for member_id, name, email, phone in rows:
+        keys = [key for key in blocking_keys(name, email, phone) if zlib.crc32(key.encode()) % shards == shard]
+        if keys:
+            for key in keys:
+                blocks[key].append(len(members))
+            members.append((member_id, name, email_key(email), phone))
+    return members, blocks
+
+
+def find_duplicates(queryset=None, min_score=None, max_block=None, shards=1):
+    """Candidate duplicate pairs scoring ``min_score`` or more, best first"""
+    queryset = Member.objects.all() if queryset is None else queryset
+    min_score = settings.DEDUPE_MIN_SCORE if min_score is None else min_score
+    max_block = max_block or settings.DEDUPE_MAX_BLOCK
+    pairs = {}
+    for shard in range(shards):
+        rows = queryset.order_by().values_list('id', 'name', 'email_canonical', 'phone_e164').iterator(
+            chunk_size=10000
+        )
+        members, blocks = build_blocks(rows, shards, shard)
+        for positions in blocks.values():
+            if not 2 <= len(positions) <= max_block:
+                continue
+            block = [members[position] for position in positions]
+            columns = list(zip(*block))
+            for i, j, score, email, phone, name in zip(*score_block(columns[1], columns[2], columns[3])):
+                if score < min_score:
+                    continue
+                a, b = sorted((block[i], block[j]))
+                if (a[0], b[0]) not in pairs or pairs[a[0], b[0]]['score'] < score:
+                    matched = [field for field, match in (('email', email), ('phone', phone)) if match]
+                    pairs[a[0], b[0]] = {
+                        'score': round(float(score), 3),
+                        'matched': matched + [f'name {name:.2f}'],
+                        'members': (a, b),
+                    }
+    return sorted(pairs.values(), key=lambda pair: (-pair['score'], pair['members'][0][0], pair['members'][1][0]))
+
+
+def write_report(pairs, stream):
+    """Ranked CSV report of ``find_duplicates`` pairs"""
+    writer = csv.writer(stream)
+    writer.writerow(REPORT_COLUMNS)
+    for rank, pair in enumerate(pairs, 1):
+        (id_a, name_a, email_a, phone_a), (id_b, name_b, email_b, phone_b) = pair['members']
+        writer.writerow([
+            rank, pair['score'], '; '.join(pair['matched']), id_a, id_b, name_a, name_b, email_a, email_b,
+            phone_a, phone_b,
+        ])
+
+
+def merge_members(survivor_id, duplicate_id):
+    """
+    Fold member ``duplicate_id`` into ``survivor_id`` and delete it
+
+    The duplicate's point and redeem transactions move to the survivor,
+    balances add up, the tier follows the new balance and the earlier join
+    date is kept. Returns the survivor.
+    """
+    from apps.points.models import PointTransaction
+    from apps.redeem.models import RedeemTransaction
+
+    if survivor_id == duplicate_id:
+        raise ValueError('A member cannot be merged into itself')
+    using = router.db_for_write(Member)
+    with transaction.atomic(using=using):
+        # Locked in primary key order, so concurrent merges cannot deadlock
+        locked = {
+            member.pk: member
+            for member in Member.objects.using(using).select_for_update().filter(
+                pk__in=[survivor_id, duplicate_id]
+            ).order_by('pk')
+        }
+        if len(locked) < 2:
+            raise Member.DoesNotExist(f'No member {duplicate_id if survivor_id in locked else survivor_id}')
+        survivor, duplicate = locked[survivor_id], locked[duplicate_id]
+
+        for model, changes in (
+            (PointTransaction, {'member_id': survivor.pk}),
+            (RedeemTransaction, {'member_id': survivor.pk, 'updated_at': timezone.now()}),
+        ):
+            moved = list(model.objects.using(using).filter(member_id=duplicate.pk))
+            model.objects.using(using).filter(pk__in=[instance.pk for instance in moved]).update(**changes)
+            for instance in moved:
+                for name, value in changes.items():
+                    setattr(instance, name, value)
+            # update() bypasses change capture
+            record_changes(moved, 'updated', using)
+
+        survivor.total_points += duplicate.total_points
+        survivor.tier_level = Member.tier_for_points(survivor.total_points)
+        survivor.join_date = min(survivor.join_date, duplicate.join_date)
+        survivor.address = survivor.address or duplicate.address
+        duplicate.delete(using=using)
+        survivor.save(using=using)
+        bump_version('member', duplicate_id)
+    return survivor
@@ -0,0 +1,220 @@
+"""
+Member activity history
+
+Point and redeem transactions merged into one timeline, newest first. Pages
+are fetched with keyset pagination over the ``(member, date DESC, id DESC)``
+indexes of both tables, and each entry carries the running point balance
+computed with a window function.
+"""
+from datetime import timezone as dt_timezone
+
+from django.db import connection, connections, router
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from apps.points.models import PointTransaction
+from apps.redeem.models import RedeemTransaction
+from apps.vouchers.models import Voucher
+from utils.pagination import encode_cursor, decode_cursor
+
+
+# Timeline order is (occurred_at, kind, id); kinds compare as strings
+POINT = 'point'
+REDEEM = 'redeem'
+
+# Points a redemption removed from the balance (cancelled ones are refunded)
+REDEEM_DELTA_SQL = "CASE WHEN r.status = 'Cancelled' THEN 0 ELSE -r.points_cost END"
+
+PAGE_SQL = f"""
+SELECT kind, id, occurred_at, entry_type, points, description, voucher_code,
+       SUM(points) OVER (
+           ORDER BY occurred_at, kind, id
+           ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+       ) AS page_balance
+FROM (
+    SELECT * FROM (
+        SELECT '{POINT}' AS kind, p.id, p.transaction_date AS occurred_at,
+               p.transaction_type AS entry_type, p.points, p.description,
+               NULL AS voucher_code
+        FROM {{points}} p
+        WHERE {{point_filters}}
+        ORDER BY p.transaction_date DESC, p.id DESC
+        LIMIT %s
+    ) AS point_page
+    UNION ALL
+    SELECT * FROM (
+        SELECT '{REDEEM}' AS kind, r.id, r.redeem_date AS occurred_at,
+               r.status AS entry_type, {REDEEM_DELTA_SQL} AS points,
+               v.name AS description, v.code AS voucher_code
+        FROM {{redeem}} r
+        JOIN {{vouchers}} v ON v.id = r.voucher_id
+        WHERE {{redeem_filters}}
+        ORDER BY r.redeem_date DESC, r.id DESC
+        LIMIT %s
+    ) AS redeem_page
+    ORDER BY occurred_at DESC, kind DESC, id DESC
+    LIMIT %s
+) AS timeline
+ORDER BY occurred_at DESC, kind DESC, id DESC
+"""
+
+OPENING_BALANCE_SQL = f"""
+SELECT
+    (SELECT COALESCE(SUM(p.points), 0) FROM {{points}} p WHERE {{point_filters}})
+  + (SELECT COALESCE(SUM({REDEEM_DELTA_SQL}), 0) FROM {{redeem}} r WHERE {{redeem_filters}})
+"""
+
+
+def _adapt(value):
+    return connection.ops.adapt_datetimefield_value(value)
+
+
+def _to_datetime(value):
+    """Database value to an aware datetime (SQLite returns strings)"""
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value, dt_timezone.utc)
+    return value
+
+
+def _before(alias, date_column, kind, position):
+    """Condition selecting rows of ``kind`` that sort strictly before ``position``"""
+    occurred_at, position_kind, position_id = position
+    occurred_at = _adapt(occurred_at)
+    column = f'{alias}.{date_column}'
+
+    if kind < position_kind:
+        return f'{column} <= %s', [occurred_at]
+    if kind > position_kind:
+        return f'{column} < %s', [occurred_at]
+    return (
+        f'({column} < %s OR ({column} = %s AND {alias}.id < %s))',
+        [occurred_at, occurred_at, position_id],
+    )
+
+
+class _Filters:
+    """WHERE clause fragments for one side of the timeline"""
+
+    def __init__(self, alias, date_column, kind, member_id):
+        self.alias = alias
+        self.date_column = date_column
+        self.kind = kind
+        self.clauses = [f'{alias}.member_id = %s']
+        self.params = [member_id]
+
+    def add(self, clause, params):
+        self.clauses.append(clause)
+        self.params.extend(params)
+
+    def before(self, position):
+        self.add(*_before(self.alias, self.date_column, self.kind, position))
+
+    def date_range(self, date_from, date_to):
+        column = f'{self.alias}.{self.date_column}'
+        if date_from:
+            self.add(f'{column} >= %s', [_adapt(date_from)])
+        if date_to:
+            self.add(f'{column} <= %s', [_adapt(date_to)])
+
+    @property
+    def sql(self):
+        return ' AND '.join(self.clauses)
+
+
+def encode_position(position):
+    """Cursor for a ``(occurred_at, kind, id)`` timeline position"""
+    occurred_at, kind, entry_id = position
+    return encode_cursor([occurred_at.isoformat(), kind, entry_id])
+
+
+def decode_position(cursor):
+    """Timeline position from a cursor produced by ``encode_position``"""
+    try:
+        occurred_at, kind, entry_id = decode_cursor(cursor)
+        occurred_at = parse_datetime(occurred_at)
+    except (TypeError, ValueError):
+        occurred_at = None
+
+    if occurred_at is None or kind not in (POINT, REDEEM) or not isinstance(entry_id, int):
+        raise ValidationError({'cursor': 'Invalid cursor'})
+    return occurred_at, kind, entry_id
+
+
+def _cursor():
+    """Cursor on the database reads are routed to (a replica for routed requests)"""
+    return connections[router.db_for_read(PointTransaction)].cursor()
+
+
+def _tables():
+    return {
+        'points': connection.ops.quote_name(PointTransaction._meta.db_table),
+        'redeem': connection.ops.quote_name(RedeemTransaction._meta.db_table),
+        'vouchers': connection.ops.quote_name(Voucher._meta.db_table),
+    }
+
+
+def opening_balance(member_id, position):
+    """Sum of all point movements that sort strictly before ``position``"""
+    points = _Filters('p', 'transaction_date', POINT, member_id)
+    redeem = _Filters('r', 'redeem_date', REDEEM, member_id)
+    points.before(position)
+    redeem.before(position)
+
+    sql = OPENING_BALANCE_SQL.format(point_filters=points.sql, redeem_filters=redeem.sql, **_tables())
+    with _cursor() as cursor:
+        cursor.execute(sql, points.params + redeem.params)
+        return cursor.fetchone()[0]
+
+
+def fetch_history(member_id, limit, position=None, date_from=None, date_to=None):
+    """
+    Fetch one page of a member's timeline
+
+    Returns ``(entries, next_position)`` where ``next_position`` is the
+    keyset position to continue from, or ``None`` on the last page.
+    """
+    points = _Filters('p', 'transaction_date', POINT, member_id)
+    redeem = _Filters('r', 'redeem_date', REDEEM, member_id)
+    for filters in (points, redeem):
+        if position:
+            filters.before(position)
+        filters.date_range(date_from, date_to)
+
+    sql = PAGE_SQL.format(point_filters=points.sql, redeem_filters=redeem.sql, **_tables())
+    with _cursor() as cursor:
+        cursor.execute(sql, points.params + [limit + 1] + redeem.params + [limit + 1, limit + 1])
+        rows = cursor.fetchall()
+
+    if not rows:
+        return [], None
+
+    has_more = len(rows) > limit
+    oldest = rows[-1]
+    opening = 0
+    if has_more or date_from:
+        # Movements older than the page still count towards its balances
+        opening = opening_balance(member_id, (_to_datetime(oldest[2]), oldest[0], oldest[1]))
+
+    entries = [
+        {
+            'kind': kind,
+            'id': entry_id,
+            'occurred_at': _to_datetime(occurred_at),
+            'type': entry_type,
+            'points': points_delta,
+            'description': description,
+            'voucher_code': voucher_code,
+            'balance': opening + page_balance,
+        }
+        for kind, entry_id, occurred_at, entry_type, points_delta, description, voucher_code, page_balance
+        in rows[:limit]
+    ]
+
+    next_position = None
+    if has_more:
+        last = entries[-1]
+        next_position = (last['occurred_at'], last['kind'], last['id'])
+    return entries, next_position
@@ -0,0 +1,97 @@
+"""
+Management command to benchmark API scenarios and gate on regressions
+"""
+import json
+import platform
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from crm_project.benchmarks import SCENARIOS, BenchmarkFixtures
+from utils.benchmark import DEFAULT_THRESHOLDS, compare, run_scenario
+
+
+def threshold(value):
+    name, _, limit = value.partition('=')
+    if name not in DEFAULT_THRESHOLDS:
+        raise ValueError(value)
+    return name, float(limit)
+
+
+class Command(BaseCommand):
+    help = 'Run API benchmark scenarios in-process, write results as JSON and compare them with a baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per scenario')
+        parser.add_argument('--requests', type=int, default=None, help='Stop a scenario after this many requests')
+        parser.add_argument('--warmup', type=float, default=2.0, help='Uncounted seconds before each scenario')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', help='Write results to this JSON file')
+        parser.add_argument('--baseline', help='Compare with this results file; regressions fail the command')
+        parser.add_argument('--update-baseline', action='store_true', help='Write the results to --baseline')
+        parser.add_argument('--threshold', type=threshold, action='append', default=[], metavar='NAME=LIMIT',
+                            help=f'Override a regression threshold ({", ".join(DEFAULT_THRESHOLDS)})')
+
+    def handle(self, *args, **options):
+        fixtures = BenchmarkFixtures(seed=options['seed'])
+        results = {
+            'meta': {
+                'created_at': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'threads': options['threads'],
+                'duration': options['duration'],
+                'seed': options['seed'],
+            },
+            'scenarios': {},
+        }
+
+        self.stdout.write(f'{"scenario / route":<44}{"req":>8}{"req/s":>9}{"p50":>8}{"p95":>8}{"p99":>8}'
+                          f'{"queries":>9}{"errors":>8}')
+        for name in options['scenarios']:
+            result = run_scenario(
+                SCENARIOS[name], fixtures, fixtures.token,
+                threads=options['threads'], duration=options['duration'], max_requests=options['requests'],
+                warmup=options['warmup'], seed=options['seed'],
+            )
+            results['scenarios'][name] = result
+            self.report(name, result['total'], self.style.MIGRATE_HEADING)
+            for label, route in result['routes'].items():
+                self.report(f'  {label}', route)
+
+        if options['output']:
+            self.write(options['output'], results)
+
+        if not options['baseline']:
+            return
+        if options['update_baseline']:
+            self.write(options['baseline'], results)
+            return
+        try:
+            with open(options['baseline']) as stream:
+                baseline = json.load(stream)
+        except FileNotFoundError:
+            raise CommandError(f'No baseline at {options["baseline"]}; create it with --update-baseline')
+
+        regressions = compare(results, baseline, dict(options['threshold']))
+        if regressions:
+            for regression in regressions:
+                self.stderr.write(regression)
+            raise CommandError(f'{len(regressions)} regressions against {options["baseline"]}')
+        self.stdout.write(self.style.SUCCESS(f'No regressions against {options["baseline"]}'))
+
+    def report(self, label, figures, style=None):
+        queries = '-' if figures['queries'] is None else f'{figures["queries"]:.1f}'
+        line = (
+            f'{label:<44}{figures["requests"]:>8}{figures["throughput"]:>9.0f}{figures["p50"]:>8.1f}'
+            f'{figures["p95"]:>8.1f}{figures["p99"]:>8.1f}{queries:>9}{figures["errors"]:>8}'
+        )
+        self.stdout.write(style(line) if style else line)
+
+    def write(self, path, results):
+        with open(path, 'w') as stream:
+            json.dump(results, stream, indent=2)
+        self.stdout.write(f'Results written to {path}')
@@ -0,0 +1,73 @@
+"""
+Management command to measure response compression cost against bytes saved
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+
+from crm_project.benchmarks import BenchmarkFixtures
+from utils.compression import Compressor, available_encodings
+
+# Representative payloads: (label, route, URL kwargs from fixtures, query string)
+PAYLOADS = [
+    ('member list page', 'member-list', None, {}),
+    ('point transaction page', 'point-list', None, {}),
+    ('redemption page', 'redeem-list', None, {}),
+    ('voucher catalog', 'voucher-list', None, {'status': 'Active'}),
+    ('member summary', 'member-summary', lambda fixtures: {'pk': fixtures.members[0]}, {}),
+    ('member detail', 'member-detail', lambda fixtures: {'pk': fixtures.members[0]}, {}),
+    ('OpenAPI schema (JSON)', 'schema', None, {'format': 'json'}),
+]
+
+LEVELS = {
+    'gzip': (1, 6, 9),
+    'br': (1, 4, 6, 11),
+}
+
+
+def measure(data, encoding, level, min_seconds):
+    """``(compressed size, CPU seconds per compression)``, averaged over at least ``min_seconds``"""
+    runs = 0
+    started = time.process_time()
+    while True:
+        size = len(Compressor(encoding, level).compress(data))
+        runs += 1
+        elapsed = time.process_time() - started
+        if elapsed >= min_seconds:
+            return size, elapsed / runs
+
+
+class Command(BaseCommand):
+    help = 'Compress representative API responses with each codec and level; report CPU cost and bytes saved'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-seconds', type=float, default=0.2, help='CPU time spent per measurement')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        fixtures = BenchmarkFixtures(seed=options['seed'])
+        client = Client(HTTP_AUTHORIZATION=f'Bearer {fixtures.token}')
+        current = {'gzip': settings.COMPRESSION_GZIP_LEVEL, 'br': settings.COMPRESSION_BROTLI_QUALITY}
+
+        self.stdout.write(
+            f'{"payload":<26}{"bytes":>9}  {"codec":<8}{"compressed":>11}{"ratio":>7}{"cpu ms":>9}'
+            f'{"MB/s":>8}{"KB saved/cpu ms":>17}'
+        )
+        for label, route, kwargs, params in PAYLOADS:
+            response = client.get(reverse(route, kwargs=kwargs(fixtures) if kwargs else None), params)
+            data = response.content
+            for encoding in available_encodings():
+                for level in LEVELS[encoding]:
+                    size, seconds = measure(data, encoding, level, options['min_seconds'])
+                    codec = f'{encoding}-{level}{"*" if current[encoding] == level else ""}'
+                    self.stdout.write(
+                        f'{label:<26}{len(data):>9}  {codec:<8}{size:>11}{len(data) / size:>7.1f}'
+                        f'{seconds * 1000:>9.3f}{len(data) / seconds / 1e6:>8.0f}'
+                        f'{(len(data) - size) / 1024 / (seconds * 1000):>17.1f}'
+                    )
+        self.stdout.write(
+            f'* current settings; responses under {settings.COMPRESSION_MIN_BYTES} bytes are sent uncompressed'
+        )
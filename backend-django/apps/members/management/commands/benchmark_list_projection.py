@@ -0,0 +1,133 @@
+"""
+Management command to benchmark list serializers against list projections
+"""
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from apps.members.models import Member
+from apps.members.projections import MemberListProjection
+from apps.members.serializers import MemberListSerializer
+from apps.points.models import PointTransaction
+from apps.points.projections import PointTransactionListProjection
+from apps.points.serializers import PointTransactionListSerializer
+from apps.redeem.models import RedeemTransaction
+from apps.redeem.projections import RedeemTransactionListProjection
+from apps.redeem.serializers import RedeemTransactionListSerializer
+from apps.vouchers.models import Voucher
+from apps.vouchers.projections import VoucherListProjection
+from apps.vouchers.serializers import VoucherListSerializer
+
+
+class Rollback(Exception):
+    """Raised to discard the benchmark rows"""
+
+
+class Command(BaseCommand):
+    help = 'Benchmark list serializers against serializer-free list projections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[50, 500, 5000])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        sizes = options['sizes']
+        repeat = options['repeat']
+
+        try:
+            with transaction.atomic():
+                self.create_rows(max(sizes))
+                self.run(sizes, repeat)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def create_rows(self, count):
+        """Create benchmark rows with bulk inserts"""
+        self.stdout.write(f'Creating {count} rows per model...')
+        today = date.today()
+
+        members = [
+            Member(
+                id=f'BENCH-{i:06d}',
+                name=f'Benchmark Member {i}',
+                email=f'bench{i}@example.com',
+                phone='08123456789',
+                join_date=today - timedelta(days=i % 365),
+                total_points=i % 3000,
+            )
+            for i in range(count)
+        ]
+        # bulk_create bypasses save()
+        for member in members:
+            member.normalize_contacts()
+        members = Member.objects.bulk_create(members)
+        vouchers = Voucher.objects.bulk_create([
+            Voucher(
+                code=f'BENCH{i:06d}',
+                name=f'Benchmark Voucher {i}',
+                points_cost=100 + i % 900,
+                stock=i % 50,
+                start_date=today - timedelta(days=30),
+                end_date=today + timedelta(days=i % 90 - 10),
+            )
+            for i in range(count)
+        ])
+        PointTransaction.objects.bulk_create([
+            PointTransaction(
+                member=members[i],
+                transaction_type='earn',
+                points=100,
+                description='Benchmark purchase',
+            )
+            for i in range(count)
+        ])
+        RedeemTransaction.objects.bulk_create([
+            RedeemTransaction(
+                member=members[i],
+                voucher=vouchers[i],
+                points_cost=vouchers[i].points_cost,
+                status='Completed',
+            )
+            for i in range(count)
+        ])
+
+    def run(self, sizes, repeat):
+        """Time both render paths and check that their JSON output matches"""
+        renderer = JSONRenderer()
+        cases = [
+            ('members', Member.objects.all(), MemberListSerializer, MemberListProjection()),
+            ('points', PointTransaction.objects.select_related('member'),
+             PointTransactionListSerializer, PointTransactionListProjection()),
+            ('redeem', RedeemTransaction.objects.select_related('member', 'voucher'),
+             RedeemTransactionListSerializer, RedeemTransactionListProjection()),
+            ('vouchers', Voucher.objects.all(), VoucherListSerializer, VoucherListProjection()),
+        ]
+
+        self.stdout.write(f'{"endpoint":<10}{"rows":>7}{"serializer ms":>16}{"projection ms":>16}{"speedup":>10}  output')
+        for name, queryset, serializer_class, projection in cases:
+            for size in sizes:
+                serialized = lambda: serializer_class(queryset[:size], many=True).data
+                projected = lambda: projection.render(projection.project(queryset)[:size])
+
+                identical = renderer.render(serialized()) == renderer.render(projected())
+                serializer_ms = self.best_of(serialized, repeat)
+                projection_ms = self.best_of(projected, repeat)
+
+                self.stdout.write(
+                    f'{name:<10}{size:>7}{serializer_ms:>16.2f}{projection_ms:>16.2f}'
+                    f'{serializer_ms / projection_ms:>9.1f}x  '
+                    + (self.style.SUCCESS('identical') if identical else self.style.ERROR('DIFFERS'))
+                )
+
+    def best_of(self, func, repeat):
+        """Best wall time of ``repeat`` runs in milliseconds"""
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return min(timings) * 1000
@@ -0,0 +1,167 @@
+"""
+Management command to benchmark sync (WSGI) against ASGI gunicorn workers
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from urllib.error import URLError
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+class Command(BaseCommand):
+    help = 'Benchmark throughput and latency of sync and ASGI server modes under concurrent load'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', nargs='+', choices=['wsgi', 'asgi'], default=['wsgi', 'asgi'])
+        parser.add_argument('--paths', nargs='+', default=['/health/live', '/api/members/statistics/'])
+        parser.add_argument('--connections', type=int, default=500)
+        parser.add_argument('--duration', type=float, default=15.0, help='Seconds of load per mode')
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--username', help='User to authenticate as (default: first user)')
+
+    def handle(self, *args, **options):
+        user_model = get_user_model()
+        users = user_model.objects.order_by('pk')
+        user = users.filter(username=options['username']).first() if options['username'] else users.first()
+        if user is None:
+            raise CommandError('No user to authenticate as; run seed_data or pass --username')
+        token = str(AccessToken.for_user(user))
+
+        self.stdout.write(
+            f'{options["connections"]} connections, {options["duration"]:.0f}s per mode, '
+            f'{options["workers"]} workers, paths: {" ".join(options["paths"])}'
+        )
+        self.stdout.write(f'{"mode":<6}{"requests":>10}{"req/s":>10}{"p50 ms":>10}{"p99 ms":>10}{"errors":>8}')
+
+        for mode in options['modes']:
+            server = start_server(mode, options['workers'], options['port'])
+            try:
+                result = asyncio.run(LoadGenerator(
+                    port=options['port'],
+                    paths=options['paths'],
+                    headers={'Authorization': f'Bearer {token}'},
+                ).run(options['connections'], options['duration']))
+            finally:
+                server.terminate()
+                server.wait()
+
+            self.stdout.write(
+                f'{mode:<6}{result["requests"]:>10}{result["rate"]:>10.0f}'
+                f'{result["p50"]:>10.1f}{result["p99"]:>10.1f}{result["errors"]:>8}'
+            )
+
+
+def start_server(mode, workers, port, env=None):
+    """Start gunicorn in ``mode`` and wait until it answers"""
+    env = {
+        **os.environ,
+        'SERVER_MODE': mode,
+        # Measure the server, not the rate limiter
+        'THROTTLE_ANON_RATE': '100000000/hour',
+        'THROTTLE_USER_RATE': '100000000/hour',
+        **(env or {}),
+    }
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', '--workers', str(workers),
+         '--backlog', '4096', '--log-level', 'warning'],
+        cwd=settings.BASE_DIR,
+        env=env,
+    )
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/health/live', timeout=1)
+            return server
+        except (URLError, OSError):
+            time.sleep(0.2)
+    server.terminate()
+    raise CommandError(f'{mode} server did not start on port {port}')
+
+
+class LoadGenerator:
+    """Keep-alive HTTP/1.1 clients issuing GETs back to back"""
+
+    def __init__(self, port, paths, headers):
+        self.port = port
+        self.requests = [
+            (
+                f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\n'
+                + ''.join(f'{name}: {value}\r\n' for name, value in headers.items())
+                + '\r\n'
+            ).encode()
+            for path in paths
+        ]
+        self.latencies = []
+        self.errors = 0
+
+    async def run(self, connections, duration):
+        self.deadline = time.perf_counter() + duration
+        start = time.perf_counter()
+        await asyncio.gather(*(self.client(i) for i in range(connections)))
+        elapsed = time.perf_counter() - start
+
+        latencies = sorted(self.latencies) or [0.0]
+        return {
+            'requests': len(self.latencies),
+            'rate': len(self.latencies) / elapsed,
+            'p50': latencies[len(latencies) // 2] * 1000,
+            'p99': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+            'errors': self.errors,
+        }
+
+    async def client(self, index):
+        reader = writer = None
+        sent = index
+        while time.perf_counter() < self.deadline:
+            start = time.perf_counter()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection('127.0.0.1', self.port)
+                writer.write(self.requests[sent % len(self.requests)])
+                sent += 1
+                status, keep_alive = await asyncio.wait_for(self.read_response(reader), 30)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+                self.errors += 1
+                writer = self.close(writer)
+                continue
+
+            self.latencies.append(time.perf_counter() - start)
+            if status >= 400:
+                self.errors += 1
+            if not keep_alive:
+                # Sync gunicorn workers close the connection after every response
+                writer = self.close(writer)
+        self.close(writer)
+
+    @staticmethod
+    async def read_response(reader):
+        head = await reader.readuntil(b'\r\n\r\n')
+        lines = head.decode('latin-1').split('\r\n')
+        status = int(lines[0].split()[1])
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip().lower()
+
+        if 'content-length' in headers:
+            await reader.readexactly(int(headers['content-length']))
+        else:
+            await reader.read()
+            return status, False
+        return status, headers.get('connection') != 'close'
+
+    @staticmethod
+    def close(writer):
+        if writer is not None:
+            writer.close()
+        return None
@@ -0,0 +1,41 @@
+"""
+Management command to report likely duplicate members
+"""
+import io
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.members.dedupe import find_duplicates, write_report
+
+
+class Command(BaseCommand):
+    help = 'Write a ranked CSV report of likely duplicate members (see apps/members/dedupe.py)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='-', help='CSV file to write; - for stdout')
+        parser.add_argument('--min-score', type=float, default=settings.DEDUPE_MIN_SCORE,
+                            help='Lowest score reported, from 0 to 1')
+        parser.add_argument('--max-block', type=int, default=settings.DEDUPE_MAX_BLOCK,
+                            help='Members sharing one blocking key beyond which the key is ignored')
+        parser.add_argument('--shards', type=int, default=1,
+                            help='Passes over the table, each holding a slice of the blocks in memory')
+        parser.add_argument('--limit', type=int, default=None, help='Report only the best pairs')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        pairs = find_duplicates(
+            min_score=options['min_score'], max_block=options['max_block'], shards=max(options['shards'], 1)
+        )
+        if options['limit'] is not None:
+            pairs = pairs[:options['limit']]
+
+        if options['output'] == '-':
+            report = io.StringIO()
+            write_report(pairs, report)
+            self.stdout.write(report.getvalue(), ending='')
+        else:
+            with open(options['output'], 'w', newline='') as stream:
+                write_report(pairs, stream)
+        self.stderr.write(f'{len(pairs)} candidate pairs in {time.monotonic() - started:.1f}s')
@@ -0,0 +1,138 @@
+"""
+Management command to generate a large synthetic dataset with parallel COPY
+"""
+import datetime
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import accumulate
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+from apps.members.dataset import (
+    DatasetGenerator, init_worker, load_chunk, load_vouchers, secondary_indexes, worker_count, worker_load,
+)
+from utils.db.partitions import PARTITIONED_TABLES, ensure_partitions, is_partitioned
+
+TABLES = ['members', 'vouchers', 'point_transactions', 'redeem_transactions']
+
+
+class Command(BaseCommand):
+    help = 'Generate a deterministic synthetic dataset (members, vouchers, transactions) with parallel COPY'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=100000)
+        parser.add_argument('--txn-per-member', type=int, default=40,
+                            help='Average point and redeem transactions per member')
+        parser.add_argument('--vouchers', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--years', type=int, default=3, help='Years of history')
+        parser.add_argument('--end-date', type=datetime.date.fromisoformat, default=None,
+                            help='Day after the last generated activity (default: today); part of the dataset')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Worker processes; 1 loads in this process')
+        parser.add_argument('--truncate', action='store_true',
+                            help='Empty members, vouchers and both ledgers first')
+        parser.add_argument('--keep-indexes', action='store_true',
+                            help='Load with secondary indexes in place instead of rebuilding them after')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        connection = connections[using]
+        if connection.vendor != 'postgresql':
+            raise CommandError('Generating datasets requires PostgreSQL (rows are loaded with COPY)')
+
+        generator = DatasetGenerator(
+            seed=options['seed'],
+            members=options['members'],
+            txn_per_member=options['txn_per_member'],
+            vouchers=options['vouchers'],
+            end_date=options['end_date'] or timezone.localdate(),
+            years=options['years'],
+            time_zone=settings.TIME_ZONE,
+        )
+        self.stdout.write(
+            f'Generating {generator.members} members, ~{generator.members * generator.txn_per_member} transactions '
+            f'and {generator.voucher_count} vouchers (seed {generator.seed}, '
+            f'{generator.start_date} to {generator.end_date})'
+        )
+        started = time.monotonic()
+
+        with connection.cursor() as cursor:
+            if options['truncate']:
+                cursor.execute(f'TRUNCATE {", ".join(TABLES)}')
+            else:
+                cursor.execute('SELECT EXISTS (SELECT 1 FROM members) OR EXISTS (SELECT 1 FROM vouchers)')
+                if cursor.fetchone()[0]:
+                    raise CommandError('Members or vouchers already exist; pass --truncate to replace them')
+            for table in PARTITIONED_TABLES:
+                if is_partitioned(cursor, table):
+                    # Timestamps are local; partitions are bounded in UTC
+                    since = generator.start_date - datetime.timedelta(days=1)
+                    ensure_partitions(table, settings.TRANSACTION_PARTITIONS_AHEAD, using=using, since=since)
+
+            indexes = []
+            if not options['keep_indexes']:
+                # One sort per index after the load beats maintaining them row by row
+                for table in TABLES:
+                    indexes += secondary_indexes(cursor, table)
+                for name, _ in indexes:
+                    cursor.execute(f'DROP INDEX "{name}"')
+
+        try:
+            load_vouchers(generator, using=using)
+            totals = self.load(generator, options['workers'], using)
+        finally:
+            with connection.cursor() as cursor:
+                for _, definition in indexes:
+                    cursor.execute(definition)
+
+        with connection.cursor() as cursor:
+            for table in TABLES[1:]:
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence(%s, 'id'), GREATEST(MAX(id), 1)) FROM \"{table}\"", [table]
+                )
+            for table in TABLES:
+                cursor.execute(f'ANALYZE "{table}"')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Loaded {totals[0]} members, {totals[1]} point transactions, {totals[2]} redeem transactions '
+            f'and {generator.voucher_count} vouchers in {time.monotonic() - started:.0f}s'
+        ))
+
+    def load(self, generator, workers, using):
+        """Load every chunk of members; returns (members, point, redeem) row counts"""
+        chunks = range(generator.chunks)
+        totals = [0, 0, 0]
+
+        def report(counts, done):
+            for i, count in enumerate(counts):
+                totals[i] += count
+            if done % 25 == 0 or done == generator.chunks:
+                self.stdout.write(f'{done}/{generator.chunks} chunks, {totals[0]} members')
+
+        if workers <= 1:
+            first_ids = self.first_ids(sum(generator.event_counts(chunk)) for chunk in chunks)
+            for chunk in chunks:
+                report(load_chunk(generator, chunk, first_ids[chunk], using), chunk + 1)
+            return totals
+
+        # Spawned, not forked: no inherited connections or logging/audit threads
+        context = multiprocessing.get_context('spawn')
+        name = connections[using].settings_dict['NAME']
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=init_worker,
+                                 initargs=(generator, using, name)) as pool:
+            first_ids = self.first_ids(pool.map(worker_count, chunks, chunksize=16))
+            futures = [pool.submit(worker_load, chunk, first_ids[chunk]) for chunk in chunks]
+            for done, future in enumerate(as_completed(futures), 1):
+                report(future.result(), done)
+        return totals
+
+    def first_ids(self, chunk_totals):
+        """First transaction id of each chunk, so ids do not depend on load order"""
+        return list(accumulate(chunk_totals, initial=1))[:-1]
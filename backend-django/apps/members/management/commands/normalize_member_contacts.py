@@ -0,0 +1,49 @@
+"""
+Management command to backfill the canonical email and phone columns of members
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.members.models import Member
+from apps.members.normalization import backfill_contacts
+
+
+class Command(BaseCommand):
+    help = 'Set email_canonical and phone_e164 of existing members in short chunked transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Recompute every member, e.g. after changing PHONE_DEFAULT_COUNTRY_CODE '
+                                 '(default: only members never normalized)')
+        parser.add_argument('--chunk-size', type=int, default=settings.JOBS_CHUNK_SIZE)
+        parser.add_argument('--pause', type=float, default=0,
+                            help='Seconds to wait between chunks, to spare replicas and live traffic')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        members = Member.objects.all()
+        if not options['all']:
+            members = members.filter(email_canonical__isnull=True)
+
+        started = time.monotonic()
+        scanned = updated = 0
+        conflicts = []
+        for chunk_scanned, chunk_updated, chunk_conflicts in backfill_contacts(
+            members, options['chunk_size'], using=options['database']
+        ):
+            scanned += chunk_scanned
+            updated += chunk_updated
+            conflicts += chunk_conflicts
+            self.stdout.write(f'{scanned} members scanned, {updated} updated')
+            time.sleep(options['pause'])
+
+        for member in conflicts:
+            self.stderr.write(self.style.WARNING(
+                f'{member.pk}: {member.email} is another member\'s email in another case; '
+                'merge them (POST /api/members/{id}/merge/) and run again'
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f'Normalized {updated} of {scanned} members in {time.monotonic() - started:.1f}s'
+        ))
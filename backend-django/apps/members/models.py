@@ -4,11 +4,17 @@ Members models
 from django.db import models
 from django.core.validators import EmailValidator, RegexValidator
 
+from apps.changes.outbox import ChangeCaptureMixin
+from utils.cache import bump_version
+from .normalization import canonical_email, phone_e164
 
-class Member(models.Model):
+
+class Member(ChangeCaptureMixin, models.Model):
     """
     CRM Member model
     """
+    change_entity = 'member'
+    
     TIER_CHOICES = [
         ('Bronze', 'Bronze'),
         ('Silver', 'Silver'),
@@ -48,6 +54,12 @@ class Member(models.Model):
         help_text='Phone number'
     )
     
+    # Canonical forms of email and phone (see normalization.py), set by
+    # save(); bulk_create callers call normalize_contacts() first. Rows
+    # older than the columns are filled by normalize_member_contacts.
+    email_canonical = models.CharField(max_length=254, unique=True, null=True, editable=False)
+    phone_e164 = models.CharField(max_length=16, editable=False, blank=True, default='')
+    
     address = models.TextField(blank=True, default='', help_text='Full address')
     
     join_date = models.DateField(help_text='Date when member joined')
@@ -84,6 +96,8 @@ class Member(models.Model):
             models.Index(fields=['status']),
             models.Index(fields=['join_date']),
             models.Index(fields=['-total_points']),
+            models.Index(fields=['-created_at']),
+            models.Index(fields=['phone_e164']),
         ]
         verbose_name = 'Member'
         verbose_name_plural = 'Members'
@@ -92,7 +106,7 @@ class Member(models.Model):
         return f"{self.id} - {self.name}"
     
     def save(self, *args, **kwargs):
-        """Generate custom ID if not exists"""
+        """Generate custom ID if not exists and keep the canonical email and phone in step"""
         if not self.id:
             # Get last member ID and increment
             last_member = Member.objects.all().order_by('id').last()
@@ -106,11 +120,50 @@ class Member(models.Model):
             # Format: MEM-001, MEM-002, etc.
             self.id = f'MEM-{new_number:03d}'
         
+        unclaimed = not self._state.adding and self.email_canonical is None
+        self.normalize_contacts()
+        if unclaimed and Member.objects.using(kwargs.get('using') or self._state.db).filter(
+            email_canonical=self.email_canonical
+        ).exclude(pk=self.pk).exists():
+            # Another member has this email in another case (a conflict left by
+            # backfill_contacts): keep saving without it until the two are merged
+            self.email_canonical = None
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if 'email' in update_fields:
+                update_fields.add('email_canonical')
+            if 'phone' in update_fields:
+                update_fields.add('phone_e164')
+            kwargs['update_fields'] = update_fields
+        
         super().save(*args, **kwargs)
+        bump_version('member', self.pk)
+    
+    def normalize_contacts(self):
+        """Set the canonical email and E.164 phone from email and phone"""
+        self.email_canonical = canonical_email(self.email)
+        self.phone_e164 = phone_e164(self.phone)
+    
+    @staticmethod
+    def tier_for_points(total_points):
+        """Tier a balance of ``total_points`` qualifies for"""
+        if total_points >= 2500:
+            return 'Platinum'
+        if total_points >= 1000:
+            return 'Gold'
+        if total_points >= 500:
+            return 'Silver'
+        return 'Bronze'
     
     @property
     def points_to_next_tier(self):
         """Calculate points needed for next tier"""
+        return self.calculate_points_to_next_tier(self.tier_level, self.total_points)
+    
+    @staticmethod
+    def calculate_points_to_next_tier(tier_level, total_points):
+        """Points needed for the tier after ``tier_level`` (usable without an instance)"""
         tier_thresholds = {
             'Bronze': 500,
             'Silver': 1000,
@@ -118,8 +171,8 @@ class Member(models.Model):
             'Platinum': float('inf')
         }
         
-        if self.tier_level == 'Platinum':
+        if tier_level == 'Platinum':
             return 0
         
-        current_threshold = tier_thresholds.get(self.tier_level, 0)
-        return max(0, current_threshold - self.total_points)
+        current_threshold = tier_thresholds.get(tier_level, 0)
+        return max(0, current_threshold - total_points)
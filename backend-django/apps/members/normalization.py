@@ -0,0 +1,91 @@
+"""
+Canonical forms of member contact details
+
+Stored next to the values as entered (``Member.email_canonical``, unique,
+and ``Member.phone_e164``, indexed), so exact lookups, uniqueness checks
+and duplicate detection compare one form however the value was typed.
+"""
+import re
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+
+_NON_DIGITS_RE = re.compile(r'\D')
+
+# E.164 allows at most 15 digits; shorter than 8 is not a subscriber number
+E164_MIN_DIGITS = 8
+E164_MAX_DIGITS = 15
+
+
+def canonical_email(email):
+    """``email`` trimmed and lowercased"""
+    return (email or '').strip().lower()
+
+
+def phone_e164(phone, country_code=None):
+    """
+    ``phone`` in E.164 (``+628123456789``), or ``''`` if it cannot be one
+
+    Numbers in national format (a leading trunk ``0``) take
+    ``PHONE_DEFAULT_COUNTRY_CODE``; ``+`` and ``00`` prefix international
+    ones. Spaces, dashes and parentheses are ignored.
+    """
+    phone = (phone or '').strip()
+    digits = _NON_DIGITS_RE.sub('', phone)
+    if phone.startswith('+'):
+        pass
+    elif digits.startswith('00'):
+        digits = digits[2:]
+    elif digits.startswith('0'):
+        digits = (country_code or settings.PHONE_DEFAULT_COUNTRY_CODE) + digits[1:]
+    if not E164_MIN_DIGITS <= len(digits) <= E164_MAX_DIGITS:
+        return ''
+    return f'+{digits}'
+
+
+def backfill_contacts(queryset, chunk_size, using='default'):
+    """
+    Set the canonical columns of ``queryset``'s members, a chunk at a time
+
+    Each chunk is read in primary key order from where the last one ended
+    and written in a transaction of its own, so rows are locked only for as
+    long as their chunk takes. Yields ``(scanned, updated, conflicts)`` per
+    chunk; conflicts are members whose canonical email another member
+    already has, left as they were (``Member.save`` keeps them without one
+    until they are merged).
+    """
+    from .models import Member
+
+    fields = ['email_canonical', 'phone_e164']
+    last = None
+    while True:
+        with transaction.atomic(using=using):
+            chunk = queryset.using(using).select_for_update().order_by('pk').only('pk', 'email', 'phone', *fields)
+            if last is not None:
+                chunk = chunk.filter(pk__gt=last)
+            members = list(chunk[:chunk_size])
+            if not members:
+                return
+            last = members[-1].pk
+
+            changed = []
+            for member in members:
+                current = (member.email_canonical, member.phone_e164)
+                member.normalize_contacts()
+                if (member.email_canonical, member.phone_e164) != current:
+                    changed.append(member)
+            conflicts = []
+            try:
+                with transaction.atomic(using=using):
+                    Member.objects.using(using).bulk_update(changed, fields)
+            except IntegrityError:
+                # One at a time, to write all but the conflicting ones
+                for member in list(changed):
+                    try:
+                        with transaction.atomic(using=using):
+                            Member.objects.using(using).bulk_update([member], fields)
+                    except IntegrityError:
+                        changed.remove(member)
+                        conflicts.append(member)
+        yield len(members), len(changed), conflicts
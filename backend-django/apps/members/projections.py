@@ -0,0 +1,32 @@
+"""
+Members projections
+"""
+from utils.projection import ListProjection
+from .models import Member
+from .serializers import MemberSerializer, MemberListSerializer
+
+
+class MemberListProjection(ListProjection):
+    """Projection mirroring MemberListSerializer"""
+    serializer_class = MemberListSerializer
+
+
+class MemberProjection(ListProjection):
+    """Projection mirroring MemberSerializer, used for ?fields= on lists"""
+    serializer_class = MemberSerializer
+    computed_fields = {
+        'points_to_next_tier': ['tier_level', 'total_points'],
+    }
+
+    def get_computed(self, rows):
+        """Evaluate Member.points_to_next_tier from the fetched columns"""
+        if 'points_to_next_tier' not in self.field_names:
+            return {}
+
+        tier_level, total_points = self.index('tier_level', 'total_points')
+        return {
+            'points_to_next_tier': [
+                Member.calculate_points_to_next_tier(row[tier_level], row[total_points])
+                for row in rows
+            ],
+        }
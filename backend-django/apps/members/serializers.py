@@ -3,6 +3,7 @@ Members serializers
 """
 from rest_framework import serializers
 from .models import Member
+from .normalization import canonical_email, phone_e164
 
 
 class MemberSerializer(serializers.ModelSerializer):
@@ -17,13 +18,15 @@ class MemberSerializer(serializers.ModelSerializer):
             'points_to_next_tier', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at', 'total_points']
+        # Unique ignoring case: checked by validate_email, not a case-sensitive UniqueValidator
+        extra_kwargs = {'email': {'validators': []}}
     
     def validate_email(self, value):
-        """Validate email uniqueness on update"""
-        instance = self.instance
-        if instance and Member.objects.exclude(pk=instance.pk).filter(email=value).exists():
-            raise serializers.ValidationError("Email already exists")
-        elif not instance and Member.objects.filter(email=value).exists():
+        """Validate email uniqueness, ignoring case, with one probe of the email_canonical index"""
+        members = Member.objects.filter(email_canonical=canonical_email(value))
+        if self.instance:
+            members = members.exclude(pk=self.instance.pk)
+        if members.exists():
             raise serializers.ValidationError("Email already exists")
         return value
 
@@ -46,3 +49,53 @@ class MemberStatisticsSerializer(serializers.Serializer):
     inactive_members = serializers.IntegerField()
     by_tier = serializers.DictField()
     total_points = serializers.IntegerField()
+
+
+class MemberHistoryQuerySerializer(serializers.Serializer):
+    """Query parameters for member history"""
+    cursor = serializers.CharField(required=False)
+    limit = serializers.IntegerField(required=False, default=50, min_value=1, max_value=200)
+    date_from = serializers.DateTimeField(required=False)
+    date_to = serializers.DateTimeField(required=False)
+
+
+class MemberSummaryQuerySerializer(serializers.Serializer):
+    """Query parameters for member summary"""
+    recent = serializers.IntegerField(required=False, default=5, min_value=1, max_value=50)
+
+
+class MemberLookupQuerySerializer(serializers.Serializer):
+    """Exact phone number or email to look members up by"""
+    phone = serializers.CharField(required=False, help_text='In any format, e.g. 0812-3456-789 or +62 812 3456 789')
+    email = serializers.CharField(required=False)
+    
+    def validate_phone(self, value):
+        number = phone_e164(value)
+        if not number:
+            raise serializers.ValidationError('Not a phone number')
+        return number
+    
+    def validate_email(self, value):
+        return canonical_email(value)
+    
+    def validate(self, attrs):
+        if len(attrs) != 1:
+            raise serializers.ValidationError('Give either phone or email')
+        return attrs
+
+
+class MemberMergeSerializer(serializers.Serializer):
+    """Member merged into the one in the URL"""
+    duplicate = serializers.CharField(help_text='ID of the member to merge and delete')
+
+
+class MemberHistoryEntrySerializer(serializers.Serializer):
+    """Point or redeem entry in a member's history"""
+    kind = serializers.CharField()
+    id = serializers.IntegerField()
+    occurred_at = serializers.DateTimeField()
+    type = serializers.CharField()
+    points = serializers.IntegerField()
+    description = serializers.CharField()
+    voucher_code = serializers.CharField(allow_null=True)
+    balance = serializers.IntegerField()
@@ -0,0 +1,116 @@
+"""
+Member 360 summary
+
+Everything the member detail screen needs, assembled in three queries: the
+member row with lifetime totals as scalar subqueries, then the most recent
+point and redeem transactions.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from apps.points.models import PointTransaction
+from apps.points.projections import PointTransactionListProjection
+from apps.redeem.models import RedeemTransaction
+from apps.redeem.projections import RedeemTransactionListProjection
+from utils.cache import get_version
+from utils.metrics import record_cache
+from .models import Member
+from .serializers import MemberSerializer
+
+
+NEXT_TIER = {
+    'Bronze': 'Silver',
+    'Silver': 'Gold',
+    'Gold': 'Platinum',
+}
+
+ACTIVE_REDEEM_STATUSES = ['Pending', 'Completed']
+
+
+def _scalar(queryset, aggregate):
+    """Correlated ``aggregate`` over ``queryset`` rows of the outer member"""
+    return Coalesce(
+        Subquery(
+            queryset.filter(member=OuterRef('pk'))
+            .order_by()
+            .values('member')
+            .annotate(value=aggregate)
+            .values('value'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def _point_total(transaction_type):
+    return _scalar(PointTransaction.objects.filter(transaction_type=transaction_type), Sum('points'))
+
+
+def summary_queryset():
+    """Members annotated with lifetime point totals and active redemptions"""
+    active = RedeemTransaction.objects.filter(status__in=ACTIVE_REDEEM_STATUSES)
+    return Member.objects.annotate(
+        lifetime_earned=_point_total('earn'),
+        lifetime_redeemed=_point_total('redeem'),
+        lifetime_expired=_point_total('expire'),
+        active_redemptions=_scalar(active, Count('id')),
+        active_redemption_points=_scalar(active, Sum('points_cost')),
+    )
+
+
+def build_member_summary(member, recent=5):
+    """Assemble the summary for an annotated ``member`` (two more queries)"""
+    point_projection = PointTransactionListProjection.build()
+    redeem_projection = RedeemTransactionListProjection.build()
+
+    recent_points = point_projection.project(
+        PointTransaction.objects.filter(member=member.pk)
+    )[:recent]
+    recent_redeems = redeem_projection.project(
+        RedeemTransaction.objects.filter(member=member.pk)
+    )[:recent]
+
+    return {
+        'member': MemberSerializer(member).data,
+        'balance': member.total_points,
+        'tier_progress': {
+            'tier_level': member.tier_level,
+            'next_tier': NEXT_TIER.get(member.tier_level),
+            'points_to_next_tier': member.points_to_next_tier,
+        },
+        'lifetime': {
+            'earned': member.lifetime_earned,
+            'redeemed': abs(member.lifetime_redeemed),
+            'expired': abs(member.lifetime_expired),
+        },
+        'active_redemptions': {
+            'count': member.active_redemptions,
+            'points': member.active_redemption_points,
+        },
+        'recent_point_transactions': point_projection.render(recent_points),
+        'recent_redemptions': redeem_projection.render(recent_redeems),
+    }
+
+
+def get_member_summary(member_id, recent=5):
+    """
+    Cached member summary, or ``None`` if the member does not exist
+
+    Entries are keyed on the member version, which every member and
+    redemption save bumps, so a hit is never stale beyond the bump.
+    """
+    key = f'member-summary:{member_id}:{get_version("member", member_id)}:{recent}'
+    summary = cache.get(key)
+    record_cache('member_summary', summary is not None)
+    if summary is not None:
+        return summary
+
+    member = summary_queryset().filter(pk=member_id).first()
+    if member is None:
+        return None
+
+    summary = build_member_summary(member, recent)
+    cache.set(key, summary, settings.MEMBER_SUMMARY_CACHE_TIMEOUT)
+    return summary
@@ -0,0 +1,98 @@
+"""
+Member background jobs
+"""
+from celery import shared_task
+from django.db.models import Count, Q, Sum
+from rest_framework import serializers
+
+from apps.jobs.runner import fan_out, key_ranges, run_chunk, run_job
+from apps.points.models import PointTransaction
+from apps.redeem.models import RedeemTransaction
+from .models import Member
+
+
+class RetierMembersParamsSerializer(serializers.Serializer):
+    """Re-tiering takes no parameters"""
+
+
+class TierReportParamsSerializer(serializers.Serializer):
+    """Activity period of the tier report (both bounds optional)"""
+    
+    date_from = serializers.DateTimeField(required=False)
+    date_to = serializers.DateTimeField(required=False)
+
+
+@shared_task(name='maintenance.retier_members')
+def retier_members(job_id):
+    """
+    Set every member's tier from their balance; redemptions and
+    cancellations change balances without re-tiering
+    """
+    members = Member.objects.all()
+    with run_job(job_id, total=members.count()) as job:
+        fan_out(job, retier_member_chunk, key_ranges(members))
+
+
+@shared_task(name='maintenance.retier_member_chunk')
+def retier_member_chunk(job_id, first, last):
+    with run_chunk(job_id, first) as progress:
+        members = Member.objects.filter(pk__gte=first, pk__lte=last)
+        count = 0
+        for member in members:
+            count += 1
+            tier = Member.tier_for_points(member.total_points)
+            if member.tier_level != tier:
+                member.tier_level = tier
+                member.save(update_fields=['tier_level', 'updated_at'])
+        progress.advance(count)
+
+
+@shared_task(name='reporting.tier_report')
+def tier_report(job_id):
+    """Members, balances and activity in the period, per tier"""
+    with run_job(job_id, total=1) as job:
+        period = {}
+        if job.params.get('date_from'):
+            period['gte'] = job.params['date_from']
+        if job.params.get('date_to'):
+            period['lt'] = job.params['date_to']
+        
+        tiers = {
+            tier: {
+                'members': 0, 'active_members': 0, 'total_points': 0,
+                'points_earned': 0, 'points_redeemed': 0, 'redemptions': 0,
+            }
+            for tier, _ in Member.TIER_CHOICES
+        }
+        members = Member.objects.values('tier_level').annotate(
+            members=Count('id'),
+            active_members=Count('id', filter=Q(status='Active')),
+            total_points=Sum('total_points'),
+        )
+        for row in members:
+            tiers[row['tier_level']].update(
+                members=row['members'], active_members=row['active_members'], total_points=row['total_points'] or 0,
+            )
+        
+        points = PointTransaction.objects.filter(
+            **{f'transaction_date__{lookup}': value for lookup, value in period.items()}
+        ).values('member__tier_level').annotate(
+            earned=Sum('points', filter=Q(transaction_type='earn')),
+            redeemed=Sum('points', filter=Q(transaction_type='redeem')),
+        )
+        for row in points:
+            tiers[row['member__tier_level']].update(
+                points_earned=row['earned'] or 0, points_redeemed=abs(row['redeemed'] or 0),
+            )
+        
+        redemptions = RedeemTransaction.objects.filter(
+            **{f'redeem_date__{lookup}': value for lookup, value in period.items()}
+        ).exclude(status='Cancelled').values('member__tier_level').annotate(count=Count('id'))
+        for row in redemptions:
+            tiers[row['member__tier_level']]['redemptions'] = row['count']
+        
+        job.result = {
+            'date_from': job.params.get('date_from'),
+            'date_to': job.params.get('date_to'),
+            'tiers': tiers,
+        }
@@ -0,0 +1,498 @@
+"""
+Members tests
+"""
+from collections import Counter
+from datetime import date, timedelta
+from io import StringIO
+from unittest import skipUnless
+from urllib.parse import parse_qs, urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from apps.changes.models import ChangeEvent
+from apps.points.models import PointTransaction
+from apps.redeem.models import RedeemTransaction
+from apps.vouchers.models import Voucher
+from utils.pagination import encode_cursor
+from .dataset import CHUNK_MEMBERS, DatasetGenerator
+from .dedupe import (
+    REPORT_COLUMNS, email_key, find_duplicates, merge_members, name_key, phone_suffix, score_block, soundex,
+)
+from .history import decode_position, encode_position, opening_balance
+from .models import Member
+from .normalization import canonical_email, phone_e164
+from .projections import MemberListProjection, MemberProjection
+from .serializers import MemberSerializer
+
+User = get_user_model()
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class MemberSummaryTests(TestCase):
+    """Member 360 summary endpoint"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='staff', email='staff@example.com', password='staff-pass-123', full_name='Staff'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.member = Member.objects.create(
+            name='John Doe', email='john@example.com', phone='08123456789', join_date=date.today()
+        )
+        self.voucher = Voucher.objects.create(
+            code='DISC10', name='Diskon 10%', points_cost=200, stock=10,
+            start_date=date.today() - timedelta(days=1), end_date=date.today() + timedelta(days=30),
+        )
+        for points in (500, 300, 400):
+            PointTransaction.objects.create(member=self.member, transaction_type='earn', points=points)
+        PointTransaction.objects.create(member=self.member, transaction_type='expire', points=-100)
+        RedeemTransaction.objects.create(
+            member=Member.objects.get(pk=self.member.pk), voucher=self.voucher, status='Completed'
+        )
+        self.url = f'/api/members/{self.member.pk}/summary/'
+
+    def test_summary_query_budget(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual(data['balance'], 900)
+        self.assertEqual(data['lifetime'], {'earned': 1200, 'redeemed': 0, 'expired': 100})
+        self.assertEqual(data['active_redemptions'], {'count': 1, 'points': 200})
+        self.assertEqual(data['tier_progress']['next_tier'], 'Platinum')
+        self.assertEqual(len(data['recent_point_transactions']), 4)
+        self.assertEqual(data['recent_redemptions'][0]['voucher_code'], 'DISC10')
+
+    def test_summary_is_cached_until_member_changes(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+        self.member.refresh_from_db()
+        PointTransaction.objects.create(member=self.member, transaction_type='earn', points=50)
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+        self.assertEqual(response.json()['data']['balance'], 950)
+
+    def test_summary_unknown_member(self):
+        response = self.client.get('/api/members/MEM-999/summary/')
+        self.assertEqual(response.status_code, 404)
+
+
+class MemberHistoryTests(TestCase):
+    """Keyset-paginated member timeline with running balances"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(
+            username='staff', email='staff@example.com', password='staff-pass-123', full_name='Staff'
+        ))
+        self.member = Member.objects.create(
+            name='John Doe', email='john@example.com', phone='08123456789', join_date=date.today()
+        )
+        voucher = Voucher.objects.create(
+            code='DISC10', name='Diskon 10%', points_cost=200, stock=10,
+            start_date=date.today() - timedelta(days=1), end_date=date.today() + timedelta(days=30),
+        )
+        for points in (500, 300, 400):
+            PointTransaction.objects.create(member=self.member, transaction_type='earn', points=points)
+        PointTransaction.objects.create(member=self.member, transaction_type='expire', points=-100)
+        RedeemTransaction.objects.create(
+            member=Member.objects.get(pk=self.member.pk), voucher=voucher, status='Completed'
+        )
+        self.member.refresh_from_db()
+
+        # Every entry but the first earn shares one timestamp, across both tables
+        self.tied = timezone.now().replace(microsecond=0) - timedelta(days=1)
+        self.first = PointTransaction.objects.order_by('id').first()
+        PointTransaction.objects.exclude(pk=self.first.pk).update(transaction_date=self.tied)
+        PointTransaction.objects.filter(pk=self.first.pk).update(transaction_date=self.tied - timedelta(days=10))
+        RedeemTransaction.objects.update(redeem_date=self.tied)
+        self.url = f'/api/members/{self.member.pk}/history/'
+
+    def walk(self, **params):
+        """Every page of the timeline, following ``next``"""
+        pages = []
+        response = self.client.get(self.url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            pages.append(body['data'])
+            if not body['next']:
+                return pages
+            response = self.client.get(body['next'])
+
+    def test_tied_timestamps_split_across_pages(self):
+        pages = self.walk(limit=2)
+        entries = [(entry['kind'], entry['id']) for page in pages for entry in page]
+        point_ids = list(PointTransaction.objects.exclude(pk=self.first.pk).order_by('-id').values_list('id', flat=True))
+        redeem_id = RedeemTransaction.objects.get().pk
+
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        # Ties sort by kind, then id, newest first
+        self.assertEqual(
+            entries,
+            [('redeem', redeem_id)] + [('point', pk) for pk in point_ids] + [('point', self.first.pk)],
+        )
+
+    def test_cursor_round_trip(self):
+        position = (self.tied, 'point', 7)
+        self.assertEqual(decode_position(encode_position(position)), position)
+
+        first = self.client.get(self.url, {'limit': 2}).json()
+        (cursor,) = parse_qs(urlsplit(first['next']).query)['cursor']
+        self.assertEqual(decode_position(cursor)[1:], ('point', first['data'][1]['id']))
+
+    def test_tampered_cursor_is_rejected(self):
+        for cursor in (
+            'not-a-cursor',
+            encode_cursor([self.tied.isoformat(), 'refund', 1]),
+            encode_cursor([self.tied.isoformat(), 'point', '1']),
+            encode_cursor(['yesterday', 'point', 1]),
+            encode_cursor({'id': 1}),
+        ):
+            response = self.client.get(self.url, {'cursor': cursor})
+            self.assertEqual(response.status_code, 400, cursor)
+
+    def test_date_range(self):
+        window = {
+            'date_from': (self.tied - timedelta(days=11)).isoformat(),
+            'date_to': (self.tied - timedelta(days=9)).isoformat(),
+        }
+        response = self.client.get(self.url, window).json()
+        self.assertEqual([entry['id'] for entry in response['data']], [self.first.pk])
+        self.assertEqual(response['data'][0]['balance'], self.first.points)
+
+        recent = self.client.get(self.url, {'date_from': (self.tied - timedelta(days=1)).isoformat()}).json()
+        self.assertEqual(len(recent['data']), 4)
+        # Entries before date_from still count towards the balances
+        self.assertEqual(recent['data'][-1]['balance'], self.first.points + recent['data'][-1]['points'])
+
+    def test_balances_add_up_to_total_points(self):
+        pages = self.walk(limit=2)
+        self.assertEqual(pages[0][0]['balance'], self.member.total_points)
+        for page in pages:
+            oldest = page[-1]
+            opening = opening_balance(
+                self.member.pk, (parse_datetime(oldest['occurred_at']), oldest['kind'], oldest['id'])
+            )
+            self.assertEqual(opening + sum(entry['points'] for entry in page), page[0]['balance'])
+        self.assertEqual(sum(entry['points'] for page in pages for entry in page), self.member.total_points)
+
+
+def replay_balances(points, redeems):
+    """Member balances implied by point and redeem transaction rows"""
+    balances = Counter()
+    for row in points:
+        balances[row[1]] += row[3]
+    for row in redeems:
+        if row[4] != 'Cancelled':
+            balances[row[1]] -= row[3]
+    return balances
+
+
+class DatasetGeneratorTests(SimpleTestCase):
+    """Synthetic dataset rows"""
+
+    def generator(self, seed=7):
+        return DatasetGenerator(
+            seed=seed, members=CHUNK_MEMBERS + 500, txn_per_member=20, vouchers=200,
+            end_date=date(2026, 1, 1), time_zone='Asia/Jakarta',
+        )
+
+    def test_chunks_are_deterministic(self):
+        rows = self.generator().chunk_rows(1, first_id=1000)
+        self.assertEqual(self.generator().chunk_rows(1, first_id=1000), rows)
+        self.assertNotEqual(self.generator(seed=8).chunk_rows(1, first_id=1000), rows)
+
+        members, points, redeems = rows
+        self.assertEqual(len(members), 500)
+        self.assertEqual(members[0][0], 'MEM-2001')
+        # One id per transaction of either kind, from first_id on
+        ids = sorted(row[0] for row in points + redeems)
+        self.assertEqual(ids, list(range(1000, 1000 + sum(self.generator().event_counts(1)))))
+
+    def test_balances_and_tiers_are_consistent(self):
+        members, points, redeems = self.generator().chunk_rows(0, first_id=1)
+        balances = replay_balances(points, redeems)
+        for member_id, *_, total_points, tier_level, _, _, _ in members:
+            self.assertEqual(total_points, balances[member_id])
+            self.assertGreaterEqual(total_points, 0)
+            self.assertEqual(tier_level, Member.tier_for_points(total_points))
+
+        vouchers = {row[0]: row for row in self.generator().vouchers[0]}
+        for row in redeems:
+            voucher = vouchers[row[2]]
+            self.assertEqual(row[3], voucher[6])
+            self.assertTrue(voucher[8] <= row[5].date() <= voucher[9])
+
+    def test_activity_is_skewed(self):
+        counts = sorted(self.generator().event_counts(0), reverse=True)
+        self.assertAlmostEqual(sum(counts) / len(counts), 20, delta=3)
+        # The most active 10% of members make far more than 10% of transactions
+        self.assertGreater(sum(counts[:len(counts) // 10]), 0.3 * sum(counts))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Datasets are loaded with COPY, which requires PostgreSQL')
+class GenerateDatasetCommandTests(TestCase):
+    """generate_dataset command"""
+
+    def test_generates_consistent_dataset(self):
+        call_command('generate_dataset', members=50, txn_per_member=10, vouchers=20, seed=3, workers=1,
+                     end_date=date(2026, 1, 1), truncate=True, stdout=StringIO())
+
+        self.assertEqual(Member.objects.count(), 50)
+        self.assertEqual(Voucher.objects.count(), 20)
+        member = Member.objects.order_by('-total_points').first()
+        earned = sum(member.point_transactions.values_list('points', flat=True))
+        redeemed = sum(member.redeem_transactions.exclude(status='Cancelled').values_list('points_cost', flat=True))
+        self.assertEqual(member.total_points, earned - redeemed)
+        # Sequences continue after the generated ids
+        self.assertGreater(
+            PointTransaction.objects.create(member=member, transaction_type='earn', points=1).pk,
+            PointTransaction.objects.exclude(points=1).order_by('-id').values_list('id', flat=True)[0],
+        )
+
+
+class NormalizationTests(SimpleTestCase):
+    """Canonical email and E.164 phone"""
+
+    def test_canonical_forms(self):
+        self.assertEqual(canonical_email('  Siti.Rahma@Gmail.COM '), 'siti.rahma@gmail.com')
+        self.assertEqual(phone_e164('0812-3456-789'), '+628123456789')
+        self.assertEqual(phone_e164('+62 812 3456 789'), '+628123456789')
+        self.assertEqual(phone_e164('0062 812 3456 789'), '+628123456789')
+        self.assertEqual(phone_e164('(0811) 55'), '')
+
+    @override_settings(PHONE_DEFAULT_COUNTRY_CODE='65')
+    def test_default_country_code(self):
+        self.assertEqual(phone_e164('0812 3456 789'), '+658123456789')
+        self.assertEqual(phone_e164('0812 3456 789', country_code='62'), '+628123456789')
+
+
+class DedupeTests(TestCase):
+    """Duplicate member detection and merging"""
+
+    @classmethod
+    def setUpTestData(cls):
+        today = date.today()
+        rows = [
+            ('Budi Santoso', 'budi.santoso@gmail.com', '0812-3456-7890'),
+            ('budi santoso', 'BudiSantoso+promo@googlemail.com', '+62 812 3456 7890'),
+            ('Siti Rahma', 'siti.rahma@yahoo.com', '0813 1111 2222'),
+            ('Siti Rachma', 'srahma@outlook.com', '0813-1111-2222'),
+            ('Agus Wijaya', 'agus@example.com', '0857 9999 0000'),
+            ('Dewi Lestari', 'dewi@example.com', '0878 1234 0000'),
+        ]
+        cls.members = [
+            Member.objects.create(name=name, email=email, phone=phone, join_date=today - timedelta(days=i))
+            for i, (name, email, phone) in enumerate(rows)
+        ]
+
+    def test_canonical_columns_are_saved(self):
+        member = Member.objects.get(pk=self.members[1].pk)
+        self.assertEqual(member.email_canonical, 'budisantoso+promo@googlemail.com')
+        self.assertEqual(member.phone_e164, '+6281234567890')
+
+        member.email = 'Budi@Example.com'
+        member.save(update_fields=['email'])
+        self.assertEqual(Member.objects.get(pk=member.pk).email_canonical, 'budi@example.com')
+
+    def test_keys(self):
+        self.assertEqual(soundex('Santoso'), 'S532')
+        self.assertEqual(soundex('Pfister'), 'P236')
+        self.assertEqual(soundex('Rahma'), soundex('Rahmah'))
+        self.assertEqual(name_key('Santoso, Budi'), name_key('Budi Santoso'))
+        self.assertEqual(email_key('budi.santoso+promo@googlemail.com'), 'budisantoso@gmail.com')
+        self.assertEqual(phone_suffix('+6281234567890'), '34567890')
+
+    def test_score_block(self):
+        i, j, scores, email, phone, name = score_block(
+            ['Budi Santoso', 'budi santoso', 'Agus Wijaya'],
+            ['budisantoso@gmail.com', 'budisantoso@gmail.com', ''],
+            ['+6281234567890', '', ''],
+        )
+        self.assertEqual(list(zip(i, j)), [(0, 1), (0, 2), (1, 2)])
+        self.assertAlmostEqual(scores[0], 0.65)
+        self.assertEqual(list(email), [True, False, False])
+        self.assertEqual(list(phone), [False, False, False])
+        self.assertLess(name[1], 0.2)
+
+    def test_finds_duplicates_best_first(self):
+        for shards in (1, 3):
+            pairs = find_duplicates(min_score=0.5, shards=shards)
+            found = [(pair['members'][0][0], pair['members'][1][0]) for pair in pairs]
+            self.assertEqual(found, [
+                (self.members[0].pk, self.members[1].pk),
+                (self.members[2].pk, self.members[3].pk),
+            ])
+        self.assertEqual(pairs[0]['score'], 1.0)
+        self.assertEqual(pairs[1]['matched'][0], 'phone')
+
+        # Blocks larger than max_block are not scored
+        self.assertEqual(find_duplicates(min_score=0.5, max_block=1), [])
+
+    def test_report(self):
+        out = StringIO()
+        call_command('find_duplicate_members', min_score=0.5, limit=1, stdout=out, stderr=StringIO())
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0].split(','), REPORT_COLUMNS)
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith('1,1.0,'))
+
+    def test_merge_moves_transactions_and_balance(self):
+        voucher = Voucher.objects.create(
+            code='DEDUPE', name='Dedupe', points_cost=100, stock=10,
+            start_date=date.today() - timedelta(days=1), end_date=date.today() + timedelta(days=30),
+        )
+        survivor, duplicate = self.members[0], self.members[1]
+        PointTransaction.objects.create(member=survivor, transaction_type='earn', points=300)
+        PointTransaction.objects.create(member=duplicate, transaction_type='earn', points=5000)
+        RedeemTransaction.objects.create(member=Member.objects.get(pk=duplicate.pk), voucher=voucher)
+
+        merged = merge_members(survivor.pk, duplicate.pk)
+
+        self.assertFalse(Member.objects.filter(pk=duplicate.pk).exists())
+        self.assertEqual(merged.total_points, 300 + 5000 - 100)
+        self.assertEqual(Member.objects.get(pk=survivor.pk).tier_level, Member.tier_for_points(5200))
+        self.assertEqual(merged.join_date, duplicate.join_date)
+        self.assertEqual(PointTransaction.objects.filter(member=survivor).count(), 2)
+        self.assertEqual(RedeemTransaction.objects.filter(member=survivor).count(), 1)
+        moved = ChangeEvent.objects.filter(entity='point_transaction', operation='updated')
+        self.assertEqual([event.payload['member_id'] for event in moved], [survivor.pk])
+
+        with self.assertRaises(ValueError):
+            merge_members(survivor.pk, survivor.pk)
+        with self.assertRaises(Member.DoesNotExist):
+            merge_members(survivor.pk, duplicate.pk)
+
+    def test_merge_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(
+            username='staff', email='staff@example.com', password='staff-pass-123', full_name='Staff'
+        ))
+        url = f'/api/members/{self.members[2].pk}/merge/'
+
+        response = client.post(url, {'duplicate': self.members[3].pk}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['id'], self.members[2].pk)
+        self.assertEqual(client.post(url, {'duplicate': self.members[3].pk}, format='json').status_code, 404)
+        self.assertEqual(client.post(url, {'duplicate': self.members[2].pk}, format='json').status_code, 400)
+
+
+class CanonicalContactTests(TestCase):
+    """Uniqueness and lookups on the canonical email and phone columns"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='staff', email='staff@example.com', password='staff-pass-123', full_name='Staff'
+        )
+        cls.siti = Member.objects.create(
+            name='Siti Rahma', email='Siti.Rahma@Example.com', phone='0812-3456-789', join_date=date.today()
+        )
+        cls.budi = Member.objects.create(
+            name='Budi Santoso', email='budi@example.com', phone='+62 812 3456 789', join_date=date.today()
+        )
+        cls.agus = Member.objects.create(
+            name='Agus Wijaya', email='agus@example.com', phone='0857 1111 2222', join_date=date.today()
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_email_is_unique_ignoring_case(self):
+        data = {'name': 'Siti', 'email': ' siti.rahma@EXAMPLE.com', 'phone': '0811', 'join_date': str(date.today())}
+        with self.assertNumQueries(1):
+            serializer = MemberSerializer(data=data)
+            self.assertFalse(serializer.is_valid())
+        self.assertIn('email', serializer.errors)
+
+        self.assertTrue(MemberSerializer(self.siti, data={'email': 'SITI.RAHMA@example.com'}, partial=True).is_valid())
+
+    def test_lookup_by_phone_in_any_format(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/members/lookup/', {'phone': '(0812) 3456789'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([member['id'] for member in response.json()['data']], [self.siti.pk, self.budi.pk])
+
+        response = self.client.get('/api/members/lookup/', {'email': 'SITI.rahma@example.com '})
+        self.assertEqual([member['id'] for member in response.json()['data']], [self.siti.pk])
+
+        self.assertEqual(self.client.get('/api/members/lookup/', {'phone': '12'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/members/lookup/').status_code, 400)
+
+    def test_phone_filter(self):
+        response = self.client.get('/api/members/', {'phone': '+62 857-1111-2222'})
+        self.assertEqual([member['id'] for member in response.json()['results']], [self.agus.pk])
+
+    def test_backfill(self):
+        Member.objects.update(email_canonical=None, phone_e164='')
+        Member.objects.filter(pk=self.agus.pk).update(email='Budi@Example.com')
+
+        out, err = StringIO(), StringIO()
+        call_command('normalize_member_contacts', chunk_size=2, stdout=out, stderr=err)
+
+        self.assertEqual(
+            set(Member.objects.values_list('pk', 'email_canonical', 'phone_e164')),
+            {
+                (self.siti.pk, 'siti.rahma@example.com', '+628123456789'),
+                (self.budi.pk, 'budi@example.com', '+628123456789'),
+                (self.agus.pk, None, ''),
+            },
+        )
+        self.assertIn(self.agus.pk, err.getvalue())
+        self.assertIn('Normalized 2 of 3 members', out.getvalue())
+
+    def test_backfill_conflicts_stay_saveable(self):
+        Member.objects.filter(pk=self.agus.pk).update(email='Budi@Example.com', email_canonical=None)
+
+        response = self.client.post('/api/points/', {
+            'member': self.agus.pk, 'transaction_type': 'earn', 'points': 100,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        agus = Member.objects.get(pk=self.agus.pk)
+        self.assertEqual((agus.total_points, agus.email_canonical), (100, None))
+
+        # Merged away, the address is the other member's alone
+        self.budi.delete()
+        agus.save()
+        self.assertEqual(Member.objects.get(pk=self.agus.pk).email_canonical, 'budi@example.com')
+
+
+class MemberProjectionTests(TestCase):
+    """List projections render what their serializers would"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Member.objects.create(
+            name='John Doe', email='john@example.com', phone='08123456789', address='Jl. Sudirman 1',
+            join_date=date(2024, 2, 29), total_points=12000, tier_level='Platinum',
+        )
+        # Blank address, inactive, no points
+        Member.objects.create(
+            name='Siti Rahma', email='siti@example.com', phone='0812', join_date=date.today(), status='Inactive'
+        )
+
+    def test_projections_match_serializers(self):
+        queryset = Member.objects.order_by('pk')
+        for projection_class in (MemberListProjection, MemberProjection):
+            with self.subTest(projection_class.__name__):
+                projection = projection_class.build()
+                projected = projection.render(projection.project(queryset))
+                serialized = projection_class.serializer_class(queryset, many=True).data
+                self.assertEqual(projected, serialized)
+                self.assertEqual(JSONRenderer().render(projected), JSONRenderer().render(serialized))
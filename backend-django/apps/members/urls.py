@@ -3,11 +3,13 @@ Members URLs
 """
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import MemberViewSet
+from .views import MemberViewSet, MemberStatisticsView
 
 router = DefaultRouter()
 router.register(r'', MemberViewSet, basename='member')
 
 urlpatterns = [
+    # Ahead of the router, whose detail route would match it
+    path('statistics/', MemberStatisticsView.as_view(), name='member-statistics'),
     path('', include(router.urls)),
 ]
@@ -5,16 +5,43 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.utils.urls import replace_query_param
 from django.db.models import Q, Count, Sum
+from django.http import Http404
 from django_filters import rest_framework as filters
 
+from apps.audit.capture import AuditMixin
+from utils.asyncviews import AsyncAPIView
+from utils.conditional import ConditionalGetMixin, conditional_get
+from utils.db.router import ReplicaReadMixin
+from utils.fieldsets import SparseFieldsetMixin
+
 from .models import Member
-from .serializers import MemberSerializer, MemberListSerializer, MemberStatisticsSerializer
+from .serializers import (
+    MemberSerializer,
+    MemberListSerializer,
+    MemberStatisticsSerializer,
+    MemberHistoryQuerySerializer,
+    MemberHistoryEntrySerializer,
+    MemberSummaryQuerySerializer,
+    MemberLookupQuerySerializer,
+    MemberMergeSerializer,
+)
+from .dedupe import merge_members
+from .history import fetch_history, encode_position, decode_position
+from .summary import get_member_summary
+from .normalization import phone_e164
+from .projections import MemberListProjection, MemberProjection
+
+
+# Members sharing one phone number (a household) returned by a lookup
+LOOKUP_LIMIT = 20
 
 
 class MemberFilter(filters.FilterSet):
     """Filter for members"""
     search = filters.CharFilter(method='filter_search')
+    phone = filters.CharFilter(method='filter_phone')
     tier_level = filters.ChoiceFilter(choices=Member.TIER_CHOICES)
     status = filters.ChoiceFilter(choices=Member.STATUS_CHOICES)
     min_points = filters.NumberFilter(field_name='total_points', lookup_expr='gte')
@@ -22,7 +49,7 @@ class MemberFilter(filters.FilterSet):
     
     class Meta:
         model = Member
-        fields = ['tier_level', 'status', 'search', 'min_points', 'max_points']
+        fields = ['tier_level', 'status', 'search', 'phone', 'min_points', 'max_points']
     
     def filter_search(self, queryset, name, value):
         """Search across multiple fields"""
@@ -32,17 +59,25 @@ class MemberFilter(filters.FilterSet):
             Q(email__icontains=value) |
             Q(phone__icontains=value)
         )
+    
+    def filter_phone(self, queryset, name, value):
+        """Exact phone number, in any format, through the phone_e164 index"""
+        number = phone_e164(value)
+        return queryset.filter(phone_e164=number) if number else queryset.none()
 
 
-class MemberViewSet(viewsets.ModelViewSet):
+class MemberViewSet(AuditMixin, ReplicaReadMixin, ConditionalGetMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     ViewSet for Member CRUD operations
     """
     queryset = Member.objects.all()
     serializer_class = MemberSerializer
     permission_classes = [IsAuthenticated]
+    replica_actions = ('list', 'retrieve', 'history', 'lookup')
     filter_backends = [filters.DjangoFilterBackend]
     filterset_class = MemberFilter
+    list_projection_class = MemberListProjection
+    projection_class = MemberProjection
     
     def get_serializer_class(self):
         """Use different serializer for list view"""
@@ -50,20 +85,20 @@ class MemberViewSet(viewsets.ModelViewSet):
             return MemberListSerializer
         return MemberSerializer
     
+    @conditional_get
     def list(self, request, *args, **kwargs):
         """List all members with filters"""
-        queryset = self.filter_queryset(self.get_queryset())
+        projection = self.get_list_projection()
+        queryset = projection.project(self.filter_queryset(self.get_queryset()))
         
         # Pagination
         page = self.paginate_queryset(queryset)
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            return self.get_paginated_response(projection.render(page))
         
-        serializer = self.get_serializer(queryset, many=True)
         return Response({
             'success': True,
-            'data': serializer.data,
+            'data': projection.render(queryset),
             'count': queryset.count()
         })
     
@@ -79,6 +114,7 @@ class MemberViewSet(viewsets.ModelViewSet):
             'data': serializer.data
         }, status=status.HTTP_201_CREATED)
     
+    @conditional_get
     def retrieve(self, request, *args, **kwargs):
         """Get member detail"""
         instance = self.get_object()
@@ -113,19 +149,116 @@ class MemberViewSet(viewsets.ModelViewSet):
             'message': 'Member deleted successfully'
         }, status=status.HTTP_200_OK)
     
+    @action(detail=True, methods=['get'])
+    def history(self, request, pk=None):
+        """Get point and redeem activity as one timeline, newest first"""
+        member = self.get_object()
+        query = MemberHistoryQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        
+        entries, next_position = fetch_history(
+            member.pk,
+            params['limit'],
+            position=decode_position(params['cursor']) if 'cursor' in params else None,
+            date_from=params.get('date_from'),
+            date_to=params.get('date_to'),
+        )
+        
+        next_url = None
+        if next_position:
+            next_url = replace_query_param(
+                request.build_absolute_uri(), 'cursor', encode_position(next_position)
+            )
+        
+        return Response({
+            'success': True,
+            'data': MemberHistoryEntrySerializer(entries, many=True).data,
+            'next': next_url
+        })
+    
+    @action(detail=True, methods=['get'])
+    def summary(self, request, pk=None):
+        """Get profile, balance, tier progress, lifetime totals and recent activity"""
+        query = MemberSummaryQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        
+        summary = get_member_summary(pk, query.validated_data['recent'])
+        if summary is None:
+            raise Http404
+        
+        return Response({
+            'success': True,
+            'data': summary
+        })
+    
     @action(detail=False, methods=['get'])
-    def statistics(self, request):
+    def lookup(self, request):
+        """Find members by exact phone number or email, however it is formatted"""
+        query = MemberLookupQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        
+        # One probe of the phone_e164 or (unique) email_canonical index
+        if 'phone' in params:
+            members = self.get_queryset().filter(phone_e164=params['phone'])
+        else:
+            members = self.get_queryset().filter(email_canonical=params['email'])
+        members = members.order_by('pk')[:LOOKUP_LIMIT]
+        
+        return Response({
+            'success': True,
+            'data': MemberListSerializer(members, many=True).data
+        })
+    
+    @action(detail=True, methods=['post'], serializer_class=MemberMergeSerializer)
+    def merge(self, request, pk=None):
+        """Merge a duplicate member into this one: its transactions and points move here"""
+        serializer = MemberMergeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            member = merge_members(pk, serializer.validated_data['duplicate'])
+        except Member.DoesNotExist:
+            raise Http404
+        except ValueError as exc:
+            return Response({
+                'success': False,
+                'message': str(exc)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'success': True,
+            'message': 'Members merged successfully',
+            'data': MemberSerializer(member).data
+        })
+
+
+class MemberStatisticsView(ReplicaReadMixin, AsyncAPIView):
+    """
+    Member statistics, served asynchronously
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = MemberStatisticsSerializer
+    replica_actions = ('get',)
+    
+    async def get(self, request):
         """Get member statistics"""
         members = Member.objects.all()
         
+        totals = await members.aaggregate(
+            total_members=Count('id'),
+            active_members=Count('id', filter=Q(status='Active')),
+            inactive_members=Count('id', filter=Q(status='Inactive')),
+            total_points=Sum('total_points'),
+        )
+        by_tier = members.values('tier_level').annotate(count=Count('id')).values_list('tier_level', 'count')
+        
         stats = {
-            'total_members': members.count(),
-            'active_members': members.filter(status='Active').count(),
-            'inactive_members': members.filter(status='Inactive').count(),
-            'by_tier': dict(
-                members.values('tier_level').annotate(count=Count('id')).values_list('tier_level', 'count')
-            ),
-            'total_points': members.aggregate(total=Sum('total_points'))['total'] or 0
+            'total_members': totals['total_members'],
+            'active_members': totals['active_members'],
+            'inactive_members': totals['inactive_members'],
+            'by_tier': {tier: count async for tier, count in by_tier},
+            'total_points': totals['total_points'] or 0,
         }
         
         serializer = MemberStatisticsSerializer(stats)
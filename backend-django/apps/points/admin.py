@@ -2,18 +2,22 @@
 Points admin
 """
 from django.contrib import admin
+
+from utils.admin import DateDrilldownListFilter, LargeTableAdmin
 from .models import PointTransaction
 
 
 @admin.register(PointTransaction)
-class PointTransactionAdmin(admin.ModelAdmin):
+class PointTransactionAdmin(LargeTableAdmin):
     """Point Transaction admin interface"""
     list_display = ['id', 'member', 'transaction_type', 'points', 'transaction_date', 'created_by']
-    list_filter = ['transaction_type', 'transaction_date']
-    search_fields = ['member__id', 'member__name', 'description', 'created_by']
+    list_filter = ['transaction_type', ('transaction_date', DateDrilldownListFilter)]
+    # By member id, without joining members; find members by name in their own admin
+    search_fields = ['member_id__exact', 'created_by__exact']
     readonly_fields = ['transaction_date', 'created_at']
     ordering = ['-transaction_date']
-    date_hierarchy = 'transaction_date'
+    list_select_related = ['member']
+    raw_id_fields = ['member']
     
     fieldsets = (
         ('Transaction Details', {
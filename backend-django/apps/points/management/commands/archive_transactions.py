@@ -0,0 +1,56 @@
+"""
+Management command to archive old transaction partitions to compressed files
+"""
+import gzip
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from utils.db.partitions import (
+    PARTITIONED_TABLES, archivable_partitions, detach_partition, drop_table, dump_table, is_partitioned, lock_table,
+)
+
+
+class Command(BaseCommand):
+    help = 'Dump monthly transaction partitions past retention to .csv.gz, then detach and drop them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=settings.TRANSACTION_RETENTION_MONTHS,
+                            help='Months of transactions to keep attached')
+        parser.add_argument('--output-dir', default=settings.TRANSACTION_ARCHIVE_DIR)
+        parser.add_argument('--keep', action='store_true', help='Keep detached partitions instead of dropping them')
+        parser.add_argument('--dry-run', action='store_true')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        connection = connections[using]
+        if connection.vendor != 'postgresql':
+            raise CommandError('Archiving requires PostgreSQL')
+        os.makedirs(options['output_dir'], exist_ok=True)
+
+        for table in PARTITIONED_TABLES:
+            with connection.cursor() as cursor:
+                if not is_partitioned(cursor, table):
+                    raise CommandError(f'{table} is not partitioned; run partition_transactions first')
+
+            for partition in archivable_partitions(table, options['months'], using=using):
+                path = os.path.join(options['output_dir'], f'{partition}.csv.gz')
+                if options['dry_run']:
+                    self.stdout.write(f'Would archive {partition} to {path}')
+                    continue
+
+                # Writes to the partition wait while it is dumped, and it is only
+                # detached once the archive is in place: a failed dump leaves it
+                # attached for the next run
+                with transaction.atomic(using=using):
+                    lock_table(partition, 'SHARE', using=using)
+                    with gzip.open(f'{path}.part', 'wb') as stream:
+                        dump_table(partition, stream, using=using)
+                    os.replace(f'{path}.part', path)
+                    detach_partition(table, partition, using=using)
+                    if not options['keep']:
+                        drop_table(partition, using=using)
+                self.stdout.write(self.style.SUCCESS(f'Archived {partition} to {path}'))
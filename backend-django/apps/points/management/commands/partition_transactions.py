@@ -0,0 +1,46 @@
+"""
+Management command to partition the transaction ledgers and create upcoming partitions
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from utils.db.partitions import PARTITIONED_TABLES, convert_table, partition_ledgers
+
+
+class Command(BaseCommand):
+    help = (
+        'Create partitions for the coming months of the partitioned point/redeem transaction tables; '
+        'with --convert, first convert unpartitioned ones while they stay in use'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=settings.TRANSACTION_PARTITIONS_AHEAD)
+        parser.add_argument('--convert', action='store_true',
+                            help='Partition tables that are not partitioned yet, copying their rows in batches')
+        parser.add_argument('--batch-size', type=int, default=10000, help='Ids copied per transaction with --convert')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if connections[using].vendor != 'postgresql':
+            raise CommandError('Partitioning requires PostgreSQL')
+
+        if options['convert']:
+            for table in PARTITIONED_TABLES:
+                def progress(copied, last, table=table):
+                    self.stdout.write(f'{table}: copied {copied} rows (ids up to {last})')
+
+                if convert_table(table, options['months_ahead'], options['batch_size'], using=using, progress=progress):
+                    self.stdout.write(self.style.SUCCESS(
+                        f'{table}: converted to a partitioned table; the old rows remain in {table}_unpartitioned'
+                    ))
+
+        results = partition_ledgers(options['months_ahead'], using=using)
+        for table, created in results.items():
+            if created is None:
+                self.stdout.write(self.style.WARNING(f'{table}: not partitioned; run with --convert'))
+            for name in created or ():
+                self.stdout.write(f'{table}: created {name}')
+            if created == []:
+                self.stdout.write(f'{table}: up to date')
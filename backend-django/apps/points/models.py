@@ -4,12 +4,16 @@ Points transaction models
 from django.db import models
 from django.core.exceptions import ValidationError
 from apps.members.models import Member
+from apps.changes.outbox import ChangeCaptureMixin
+from utils.metrics import POINT_POSTINGS, POINTS_POSTED
 
 
-class PointTransaction(models.Model):
+class PointTransaction(ChangeCaptureMixin, models.Model):
     """
     Point transaction model
     """
+    change_entity = 'point_transaction'
+    
     TRANSACTION_TYPE_CHOICES = [
         ('earn', 'Earn'),
         ('redeem', 'Redeem'),
@@ -56,7 +60,7 @@ class PointTransaction(models.Model):
         db_table = 'point_transactions'
         ordering = ['-transaction_date']
         indexes = [
-            models.Index(fields=['member']),
+            models.Index(fields=['member', '-transaction_date', '-id']),
             models.Index(fields=['transaction_type']),
             models.Index(fields=['-transaction_date']),
         ]
@@ -64,7 +68,7 @@ class PointTransaction(models.Model):
         verbose_name_plural = 'Point Transactions'
     
     def __str__(self):
-        return f"{self.member.id} - {self.transaction_type} - {self.points} pts"
+        return f"{self.member_id} - {self.transaction_type} - {self.points} pts"
     
     def clean(self):
         """Validate transaction"""
@@ -94,16 +98,10 @@ class PointTransaction(models.Model):
             self.update_member_tier()
             
             self.member.save()
+            
+            POINT_POSTINGS.labels(self.transaction_type).inc()
+            POINTS_POSTED.labels(self.transaction_type).inc(abs(self.points))
     
     def update_member_tier(self):
         """Update member tier based on total points"""
-        points = self.member.total_points
-        
-        if points >= 2500:
-            self.member.tier_level = 'Platinum'
-        elif points >= 1000:
-            self.member.tier_level = 'Gold'
-        elif points >= 500:
-            self.member.tier_level = 'Silver'
-        else:
-            self.member.tier_level = 'Bronze'
+        self.member.tier_level = Member.tier_for_points(self.member.total_points)
@@ -0,0 +1,19 @@
+"""
+Points projections
+"""
+from utils.projection import ListProjection
+from apps.members.projections import MemberListProjection
+from .serializers import PointTransactionSerializer, PointTransactionListSerializer
+
+
+class PointTransactionListProjection(ListProjection):
+    """Projection mirroring PointTransactionListSerializer"""
+    serializer_class = PointTransactionListSerializer
+    expandable_fields = {
+        'member': ('member', MemberListProjection),
+    }
+
+
+class PointTransactionProjection(PointTransactionListProjection):
+    """Projection mirroring PointTransactionSerializer, used for ?fields= on lists"""
+    serializer_class = PointTransactionSerializer
@@ -54,3 +54,9 @@ class PointStatisticsSerializer(serializers.Serializer):
     total_adjusted = serializers.IntegerField()
     net_points = serializers.IntegerField()
     total_transactions = serializers.IntegerField()
+
+
+class MemberTransactionsQuerySerializer(serializers.Serializer):
+    """Query parameters for a member's transactions"""
+    cursor = serializers.CharField(required=False)
+    limit = serializers.IntegerField(required=False, default=50, min_value=1, max_value=200)
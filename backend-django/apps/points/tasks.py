@@ -0,0 +1,64 @@
+"""
+Point background jobs
+"""
+from celery import shared_task
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+from rest_framework import serializers
+
+from apps.jobs.models import Job
+from apps.jobs.runner import fan_out, key_ranges, run_chunk, run_job
+from apps.members.models import Member
+from utils.db.partitions import partition_ledgers
+from .models import PointTransaction
+
+
+class AwardPointsParamsSerializer(serializers.Serializer):
+    """Points to award and the member segment that gets them"""
+    
+    points = serializers.IntegerField(min_value=1)
+    description = serializers.CharField(required=False, default='', allow_blank=True)
+    tier_level = serializers.ChoiceField(choices=Member.TIER_CHOICES, required=False)
+    status = serializers.ChoiceField(choices=Member.STATUS_CHOICES, default='Active')
+
+
+def award_segment(params):
+    members = Member.objects.filter(status=params['status'])
+    if params.get('tier_level'):
+        members = members.filter(tier_level=params['tier_level'])
+    return members
+
+
+@shared_task(name='ingestion.award_points')
+def award_points(job_id):
+    """Post an earn transaction to every member of a segment"""
+    with run_job(job_id) as job:
+        members = award_segment(job.params)
+        job.total = members.count()
+        fan_out(job, award_points_chunk, key_ranges(members))
+
+
+@shared_task(name='ingestion.award_points_chunk')
+def award_points_chunk(job_id, first, last):
+    params = Job.objects.values_list('params', flat=True).get(pk=job_id)
+    # Marks the job's transactions, so a redelivered chunk skips members already awarded
+    created_by = f'job:{job_id}'
+    
+    with run_chunk(job_id, first) as progress:
+        members = award_segment(params).filter(pk__gte=first, pk__lte=last).exclude(
+            Exists(PointTransaction.objects.filter(member=OuterRef('pk'), created_by=created_by))
+        )
+        count = 0
+        for member in members:
+            PointTransaction(
+                member=member, transaction_type='earn', points=params['points'],
+                description=params['description'], created_by=created_by,
+            ).save()
+            count += 1
+        progress.advance(count)
+
+
+@shared_task(name='maintenance.ensure_partitions')
+def ensure_ledger_partitions():
+    """Create the coming months' ledger partitions; scheduled daily by Celery beat"""
+    partition_ledgers(settings.TRANSACTION_PARTITIONS_AHEAD)
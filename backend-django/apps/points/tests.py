@@ -0,0 +1,228 @@
+"""
+Points tests
+"""
+import gzip
+import os
+import tempfile
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from apps.members.models import Member
+from utils.db import partitions
+from utils.pagination import encode_cursor
+from .models import PointTransaction
+from .projections import PointTransactionListProjection, PointTransactionProjection
+from .tasks import ensure_ledger_partitions
+from .views import PointTransactionFilter
+
+User = get_user_model()
+
+
+class MemberTransactionsTests(TestCase):
+    """Keyset-paginated transactions of one member"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='staff', email='staff@example.com', password='staff-pass-123', full_name='Staff'
+        )
+        cls.member = Member.objects.create(
+            name='John Doe', email='john@example.com', phone='08123456789', join_date=date.today()
+        )
+        other = Member.objects.create(name='Jane Doe', email='jane@example.com', phone='0811', join_date=date.today())
+        for points in (100, 200, 300, 400, 500):
+            PointTransaction.objects.create(member=cls.member, transaction_type='earn', points=points)
+        PointTransaction.objects.create(member=other, transaction_type='earn', points=50)
+        # All but the first share one timestamp
+        cls.tied = timezone.now().replace(microsecond=0) - timedelta(days=1)
+        cls.first = PointTransaction.objects.filter(member=cls.member).order_by('id').first()
+        PointTransaction.objects.update(transaction_date=cls.tied)
+        PointTransaction.objects.filter(pk=cls.first.pk).update(transaction_date=cls.tied - timedelta(days=10))
+        cls.url = f'/api/points/member/{cls.member.pk}/'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_pages_follow_next(self):
+        pages = []
+        response = self.client.get(self.url, {'limit': 2})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            pages.append([transaction['id'] for transaction in body['data']])
+            if not body['next']:
+                break
+            with self.assertNumQueries(1):
+                response = self.client.get(body['next'])
+
+        ids = list(
+            PointTransaction.objects.filter(member=self.member).exclude(pk=self.first.pk)
+            .order_by('-id').values_list('id', flat=True)
+        )
+        self.assertEqual(pages, [ids[:2], ids[2:], [self.first.pk]])
+
+    def test_tampered_cursor_is_rejected(self):
+        for cursor in ('not-a-cursor', encode_cursor(['yesterday', 1]), encode_cursor([self.tied.isoformat(), '1'])):
+            response = self.client.get(self.url, {'cursor': cursor})
+            self.assertEqual(response.status_code, 400, cursor)
+
+
+class PointTransactionProjectionTests(TestCase):
+    """List projections render what their serializers would"""
+
+    @classmethod
+    def setUpTestData(cls):
+        member = Member.objects.create(
+            name='John Doe', email='john@example.com', phone='08123456789', join_date=date.today()
+        )
+        PointTransaction.objects.create(
+            member=member, transaction_type='earn', points=500, description='Welcome bonus', created_by='staff'
+        )
+        # Blank description and creator, negative points
+        PointTransaction.objects.create(member=member, transaction_type='expire', points=-100)
+
+    def test_projections_match_serializers(self):
+        queryset = PointTransaction.objects.select_related('member').order_by('pk')
+        for projection_class in (PointTransactionListProjection, PointTransactionProjection):
+            with self.subTest(projection_class.__name__):
+                projection = projection_class.build()
+                projected = projection.render(projection.project(queryset))
+                serialized = projection_class.serializer_class(queryset, many=True).data
+                self.assertEqual(projected, serialized)
+                self.assertEqual(JSONRenderer().render(projected), JSONRenderer().render(serialized))
+
+
+class PartitionMonthTests(TestCase):
+    """Monthly partition naming"""
+
+    def test_add_months_crosses_years(self):
+        self.assertEqual(partitions.add_months(date(2025, 11, 1), 3), date(2026, 2, 1))
+        self.assertEqual(partitions.add_months(date(2025, 1, 1), -1), date(2024, 12, 1))
+
+    def test_partition_name(self):
+        self.assertEqual(partitions.partition_name('point_transactions', date(2026, 3, 1)), 'point_transactions_p2026_03')
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Ledger partitioning requires PostgreSQL')
+class LedgerPartitionTests(TestCase):
+    """Ledgers converted by ``partition_transactions --convert`` on the test database"""
+
+    @classmethod
+    def setUpTestData(cls):
+        member = Member.objects.create(
+            name='Unpartitioned', email='unpartitioned@example.com', phone='0814', join_date=date.today()
+        )
+        cls.postings = [
+            PointTransaction.objects.create(member=member, transaction_type='earn', points=points).pk
+            for points in (10, 20, 30)
+        ]
+        connection.check_constraints()
+        call_command('partition_transactions', convert=True, batch_size=2, stdout=mock.MagicMock())
+
+    def setUp(self):
+        self.member = Member.objects.create(
+            name='Partitioned', email='partitioned@example.com', phone='0815', join_date=date.today()
+        )
+        self.month = partitions.month_start(datetime.now(dt_timezone.utc))
+
+    def test_ledgers_are_partitioned_ahead(self):
+        with connection.cursor() as cursor:
+            for table in partitions.PARTITIONED_TABLES:
+                self.assertTrue(partitions.is_partitioned(cursor, table))
+                existing = partitions.list_partitions(cursor, table)
+                for offset in range(settings.TRANSACTION_PARTITIONS_AHEAD + 1):
+                    self.assertIn(partitions.add_months(self.month, offset), existing)
+                self.assertTrue(partitions.table_exists(cursor, partitions.default_partition_name(table)))
+                self.assertFalse(partitions.table_exists(cursor, partitions.shadow_name(table)))
+
+    def test_conversion_keeps_rows_and_ids(self):
+        self.assertEqual(
+            list(PointTransaction.objects.filter(pk__in=self.postings).order_by('pk').values_list('points', flat=True)),
+            [10, 20, 30],
+        )
+        posting = PointTransaction.objects.create(member=self.member, transaction_type='earn', points=5)
+        self.assertGreater(posting.pk, max(self.postings))
+
+    def test_beat_task_moves_default_rows_into_new_partitions(self):
+        far = partitions.add_months(self.month, settings.TRANSACTION_PARTITIONS_AHEAD + 2)
+        posting = PointTransaction.objects.create(member=self.member, transaction_type='earn', points=10)
+        PointTransaction.objects.filter(pk=posting.pk).update(
+            transaction_date=datetime.combine(far, datetime.min.time(), dt_timezone.utc)
+        )
+        connection.check_constraints()
+
+        def partition_of(pk):
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT tableoid::regclass::text FROM point_transactions WHERE id = %s', [pk])
+                return cursor.fetchone()[0]
+
+        self.assertEqual(partition_of(posting.pk), partitions.default_partition_name('point_transactions'))
+        with override_settings(TRANSACTION_PARTITIONS_AHEAD=settings.TRANSACTION_PARTITIONS_AHEAD + 2):
+            ensure_ledger_partitions()
+        self.assertEqual(partition_of(posting.pk), partitions.partition_name('point_transactions', far))
+
+    def test_date_filter_prunes_partitions(self):
+        PointTransaction.objects.create(member=self.member, transaction_type='earn', points=10)
+        queryset = PointTransactionFilter({
+            'date_from': datetime.combine(self.month, datetime.min.time(), dt_timezone.utc).isoformat(),
+            'date_to': datetime.combine(partitions.add_months(self.month, 1), datetime.min.time(),
+                                        dt_timezone.utc).isoformat(),
+        }, queryset=PointTransaction.objects.all()).qs
+        plan = queryset.explain()
+
+        self.assertIn(partitions.partition_name('point_transactions', self.month), plan)
+        self.assertNotIn(partitions.partition_name('point_transactions', partitions.add_months(self.month, 2)), plan)
+        self.assertEqual(queryset.count(), 1)
+
+    def old_posting(self):
+        """A posting in a new partition just past retention; returns it and the partition"""
+        old_month = partitions.add_months(self.month, -(settings.TRANSACTION_RETENTION_MONTHS + 1))
+        with connection.cursor() as cursor:
+            partitions.create_partition(cursor, 'point_transactions', old_month)
+        posting = PointTransaction.objects.create(member=self.member, transaction_type='earn', points=10)
+        PointTransaction.objects.filter(pk=posting.pk).update(
+            transaction_date=datetime.combine(old_month, datetime.min.time(), dt_timezone.utc)
+        )
+        # Fire the deferred FK checks; ALTER TABLE refuses tables with pending trigger events
+        connection.check_constraints()
+        return posting, partitions.partition_name('point_transactions', old_month)
+
+    def test_archive_detaches_and_dumps_old_partitions(self):
+        posting, name = self.old_posting()
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            call_command('archive_transactions', output_dir=output_dir, stdout=mock.MagicMock())
+            with gzip.open(f'{output_dir}/{name}.csv.gz', 'rt') as archive:
+                rows = archive.read().splitlines()
+
+        self.assertEqual(len(rows), 2)
+        self.assertTrue(rows[1].startswith(f'{posting.pk},'))
+        self.assertFalse(PointTransaction.objects.filter(pk=posting.pk).exists())
+        with connection.cursor() as cursor:
+            self.assertFalse(partitions.table_exists(cursor, name))
+
+    def test_failed_dump_leaves_the_partition_attached(self):
+        posting, name = self.old_posting()
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            with mock.patch('apps.points.management.commands.archive_transactions.dump_table',
+                            side_effect=OSError('No space left on device')):
+                with self.assertRaises(OSError):
+                    call_command('archive_transactions', output_dir=output_dir, stdout=mock.MagicMock())
+            self.assertFalse(os.path.exists(f'{output_dir}/{name}.csv.gz'))
+            self.assertTrue(PointTransaction.objects.filter(pk=posting.pk).exists())
+
+            # The next run finds it again
+            call_command('archive_transactions', output_dir=output_dir, stdout=mock.MagicMock())
+            self.assertTrue(os.path.exists(f'{output_dir}/{name}.csv.gz'))
+        self.assertFalse(PointTransaction.objects.filter(pk=posting.pk).exists())
@@ -3,11 +3,13 @@ Points URLs
 """
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import PointTransactionViewSet
+from .views import PointTransactionViewSet, PointStatisticsView
 
 router = DefaultRouter()
 router.register(r'', PointTransactionViewSet, basename='point')
 
 urlpatterns = [
+    # Ahead of the router, whose detail route would match it
+    path('statistics/', PointStatisticsView.as_view(), name='point-statistics'),
     path('', include(router.urls)),
 ]
@@ -3,17 +3,29 @@ Points views
 """
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Q, Sum
+from django.db.models import Q, Count, Sum
+from django.utils.dateparse import parse_datetime
 from django_filters import rest_framework as filters
 
+from apps.audit.capture import AuditMixin
+from utils.asyncviews import AsyncAPIView
+from utils.conditional import ConditionalGetMixin, conditional_get
+from utils.db.router import ReplicaReadMixin
+from utils.fieldsets import SparseFieldsetMixin
+from utils.pagination import decode_cursor, encode_cursor
+
 from .models import PointTransaction
 from .serializers import (
     PointTransactionSerializer,
     PointTransactionListSerializer,
-    PointStatisticsSerializer
+    PointStatisticsSerializer,
+    MemberTransactionsQuerySerializer,
 )
+from .projections import PointTransactionListProjection, PointTransactionProjection
 
 
 class PointTransactionFilter(filters.FilterSet):
@@ -28,15 +40,41 @@ class PointTransactionFilter(filters.FilterSet):
         fields = ['member', 'transaction_type', 'date_from', 'date_to']
 
 
-class PointTransactionViewSet(viewsets.ModelViewSet):
+def encode_position(transaction):
+    """Cursor continuing after ``transaction`` in ``(transaction_date, id)`` descending order"""
+    return encode_cursor([transaction.transaction_date.isoformat(), transaction.pk])
+
+
+def decode_position(cursor):
+    """``(transaction_date, id)`` from a cursor produced by ``encode_position``"""
+    try:
+        transaction_date, transaction_id = decode_cursor(cursor)
+        transaction_date = parse_datetime(transaction_date)
+    except (TypeError, ValueError):
+        transaction_date = None
+
+    if transaction_date is None or not isinstance(transaction_id, int):
+        raise ValidationError({'cursor': 'Invalid cursor'})
+    return transaction_date, transaction_id
+
+
+class PointTransactionViewSet(
+    AuditMixin, ReplicaReadMixin, ConditionalGetMixin, SparseFieldsetMixin, viewsets.ModelViewSet
+):
     """
     ViewSet for Point Transaction CRUD operations
     """
     queryset = PointTransaction.objects.select_related('member').all()
     serializer_class = PointTransactionSerializer
     permission_classes = [IsAuthenticated]
+    replica_actions = ('list', 'retrieve', 'member_transactions')
     filter_backends = [filters.DjangoFilterBackend]
     filterset_class = PointTransactionFilter
+    list_projection_class = PointTransactionListProjection
+    projection_class = PointTransactionProjection
+    # No updated_at: the ETag covers the columns shown, plus the embedded member
+    etag_fields = ('member_id', 'transaction_type', 'points', 'description', 'created_by', 'member__updated_at')
+    last_modified = False
     
     def get_serializer_class(self):
         """Use different serializer for list view"""
@@ -46,18 +84,17 @@ class PointTransactionViewSet(viewsets.ModelViewSet):
     
     def list(self, request, *args, **kwargs):
         """List all point transactions with filters"""
-        queryset = self.filter_queryset(self.get_queryset())
+        projection = self.get_list_projection()
+        queryset = projection.project(self.filter_queryset(self.get_queryset()))
         
         # Pagination
         page = self.paginate_queryset(queryset)
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            return self.get_paginated_response(projection.render(page))
         
-        serializer = self.get_serializer(queryset, many=True)
         return Response({
             'success': True,
-            'data': serializer.data,
+            'data': projection.render(queryset),
             'count': queryset.count()
         })
     
@@ -77,6 +114,7 @@ class PointTransactionViewSet(viewsets.ModelViewSet):
             'data': serializer.data
         }, status=status.HTTP_201_CREATED)
     
+    @conditional_get
     def retrieve(self, request, *args, **kwargs):
         """Get point transaction detail"""
         instance = self.get_object()
@@ -87,8 +125,44 @@ class PointTransactionViewSet(viewsets.ModelViewSet):
             'data': serializer.data
         })
     
-    @action(detail=False, methods=['get'])
-    def statistics(self, request):
+    @action(detail=False, methods=['get'], url_path='member/(?P<member_id>[^/.]+)')
+    def member_transactions(self, request, member_id=None):
+        """Get a member's transactions, newest first, a page at a time"""
+        query = MemberTransactionsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        
+        # Keyset pagination over the (member, transaction_date DESC, id DESC) index
+        transactions = self.get_queryset().filter(member__id=member_id).order_by('-transaction_date', '-id')
+        if 'cursor' in params:
+            transaction_date, transaction_id = decode_position(params['cursor'])
+            transactions = transactions.filter(
+                Q(transaction_date__lt=transaction_date) | Q(transaction_date=transaction_date, id__lt=transaction_id)
+            )
+        
+        # One extra row tells whether another page follows
+        page = list(transactions[:params['limit'] + 1])
+        next_url = None
+        if len(page) > params['limit']:
+            page = page[:params['limit']]
+            next_url = replace_query_param(request.build_absolute_uri(), 'cursor', encode_position(page[-1]))
+        
+        return Response({
+            'success': True,
+            'data': self.get_serializer(page, many=True).data,
+            'next': next_url
+        })
+
+
+class PointStatisticsView(ReplicaReadMixin, AsyncAPIView):
+    """
+    Point transaction statistics, served asynchronously
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = PointStatisticsSerializer
+    replica_actions = ('get',)
+    
+    async def get(self, request):
         """Get point transaction statistics"""
         transactions = PointTransaction.objects.all()
         
@@ -97,17 +171,22 @@ class PointTransactionViewSet(viewsets.ModelViewSet):
         if member_id:
             transactions = transactions.filter(member__id=member_id)
         
+        totals = await transactions.aaggregate(
+            total_earned=Sum('points', filter=Q(transaction_type='earn')),
+            total_redeemed=Sum('points', filter=Q(transaction_type='redeem')),
+            total_expired=Sum('points', filter=Q(transaction_type='expire')),
+            total_adjusted=Sum('points', filter=Q(transaction_type='adjustment')),
+            net_points=Sum('points'),
+            total_transactions=Count('id'),
+        )
+        
         stats = {
-            'total_earned': transactions.filter(transaction_type='earn').aggregate(
-                total=Sum('points'))['total'] or 0,
-            'total_redeemed': abs(transactions.filter(transaction_type='redeem').aggregate(
-                total=Sum('points'))['total'] or 0),
-            'total_expired': abs(transactions.filter(transaction_type='expire').aggregate(
-                total=Sum('points'))['total'] or 0),
-            'total_adjusted': transactions.filter(transaction_type='adjustment').aggregate(
-                total=Sum('points'))['total'] or 0,
-            'net_points': transactions.aggregate(total=Sum('points'))['total'] or 0,
-            'total_transactions': transactions.count()
+            'total_earned': totals['total_earned'] or 0,
+            'total_redeemed': abs(totals['total_redeemed'] or 0),
+            'total_expired': abs(totals['total_expired'] or 0),
+            'total_adjusted': totals['total_adjusted'] or 0,
+            'net_points': totals['net_points'] or 0,
+            'total_transactions': totals['total_transactions'],
         }
         
         serializer = PointStatisticsSerializer(stats)
@@ -116,15 +195,3 @@ class PointTransactionViewSet(viewsets.ModelViewSet):
             'success': True,
             'data': serializer.data
         })
-    
-    @action(detail=False, methods=['get'], url_path='member/(?P<member_id>[^/.]+)')
-    def member_transactions(self, request, member_id=None):
-        """Get all transactions for a specific member"""
-        transactions = self.get_queryset().filter(member__id=member_id)
-        serializer = self.get_serializer(transactions, many=True)
-        
-        return Response({
-            'success': True,
-            'data': serializer.data,
-            'count': transactions.count()
-        })
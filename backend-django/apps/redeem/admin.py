@@ -2,18 +2,23 @@
 Redeem admin
 """
 from django.contrib import admin
+
+from utils.admin import DateDrilldownListFilter, LargeTableAdmin
 from .models import RedeemTransaction
 
 
 @admin.register(RedeemTransaction)
-class RedeemTransactionAdmin(admin.ModelAdmin):
+class RedeemTransactionAdmin(LargeTableAdmin):
     """Redeem Transaction admin interface"""
     list_display = ['id', 'member', 'voucher', 'points_cost', 'status', 'redeem_date', 'used_date']
-    list_filter = ['status', 'redeem_date', 'used_date']
-    search_fields = ['member__id', 'member__name', 'voucher__code', 'voucher__name']
+    list_filter = ['status', ('redeem_date', DateDrilldownListFilter), 'used_date']
+    # By member id without joining members, or by exact voucher code
+    search_fields = ['member_id__exact', 'voucher__code__exact']
     readonly_fields = ['redeem_date', 'created_at', 'updated_at', 'points_cost']
     ordering = ['-redeem_date']
-    date_hierarchy = 'redeem_date'
+    list_select_related = ['member', 'voucher']
+    raw_id_fields = ['member']
+    autocomplete_fields = ['voucher']
     
     fieldsets = (
         ('Transaction Details', {
@@ -5,12 +5,17 @@ from django.db import models
 from django.core.exceptions import ValidationError
 from apps.members.models import Member
 from apps.vouchers.models import Voucher
+from apps.changes.outbox import ChangeCaptureMixin
+from utils.cache import bump_version
+from utils.metrics import REDEMPTIONS
 
 
-class RedeemTransaction(models.Model):
+class RedeemTransaction(ChangeCaptureMixin, models.Model):
     """
     Redeem transaction model
     """
+    change_entity = 'redeem_transaction'
+    
     STATUS_CHOICES = [
         ('Pending', 'Pending'),
         ('Completed', 'Completed'),
@@ -59,7 +64,7 @@ class RedeemTransaction(models.Model):
         db_table = 'redeem_transactions'
         ordering = ['-redeem_date']
         indexes = [
-            models.Index(fields=['member']),
+            models.Index(fields=['member', '-redeem_date', '-id']),
             models.Index(fields=['voucher']),
             models.Index(fields=['status']),
             models.Index(fields=['-redeem_date']),
@@ -68,7 +73,9 @@ class RedeemTransaction(models.Model):
         verbose_name_plural = 'Redeem Transactions'
     
     def __str__(self):
-        return f"{self.member.id} - {self.voucher.code} - {self.status}"
+        # The voucher's code only when already loaded: admin pages list many at once
+        voucher = self.voucher.code if RedeemTransaction.voucher.is_cached(self) else self.voucher_id
+        return f"{self.member_id} - {voucher} - {self.status}"
     
     def clean(self):
         """Validate redemption"""
@@ -107,3 +114,9 @@ class RedeemTransaction(models.Model):
             # Decrease voucher stock
             self.voucher.stock -= 1
             self.voucher.save()
+        
+        if is_new:
+            REDEMPTIONS.labels(self.status).inc()
+        
+        # Status changes alter the member's active redemptions
+        bump_version('member', self.member_id)
@@ -0,0 +1,21 @@
+"""
+Redeem projections
+"""
+from utils.projection import ListProjection
+from apps.members.projections import MemberListProjection
+from apps.vouchers.projections import VoucherListProjection
+from .serializers import RedeemTransactionSerializer, RedeemTransactionListSerializer
+
+
+class RedeemTransactionListProjection(ListProjection):
+    """Projection mirroring RedeemTransactionListSerializer"""
+    serializer_class = RedeemTransactionListSerializer
+    expandable_fields = {
+        'member': ('member', MemberListProjection),
+        'voucher': ('voucher', VoucherListProjection),
+    }
+
+
+class RedeemTransactionProjection(RedeemTransactionListProjection):
+    """Projection mirroring RedeemTransactionSerializer, used for ?fields= on lists"""
+    serializer_class = RedeemTransactionSerializer
@@ -0,0 +1,146 @@
+"""
+Redeem tests
+"""
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from apps.members.models import Member
+from apps.members.serializers import MemberSerializer
+from apps.points.models import PointTransaction
+from apps.vouchers.models import Voucher
+from utils.fieldsets import narrow_queryset
+from .models import RedeemTransaction
+from .projections import RedeemTransactionListProjection, RedeemTransactionProjection
+from .serializers import RedeemTransactionSerializer
+
+User = get_user_model()
+
+
+class SparseFieldsetTests(TestCase):
+    """``?fields=`` and ``?expand=`` on redeem transactions"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='staff', email='staff@example.com', password='staff-pass-123', full_name='Staff'
+        )
+        member = Member.objects.create(
+            name='John Doe', email='john@example.com', phone='08123456789', join_date=date.today()
+        )
+        PointTransaction.objects.create(member=member, transaction_type='earn', points=500)
+        cls.voucher = Voucher.objects.create(
+            code='DISC10', name='Diskon 10%', points_cost=200, stock=10,
+            start_date=date.today() - timedelta(days=1), end_date=date.today() + timedelta(days=30),
+        )
+        cls.redeem = RedeemTransaction.objects.create(
+            member=Member.objects.get(pk=member.pk), voucher=cls.voucher, status='Completed'
+        )
+        cls.member = member
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, path, params, queries):
+        """GET ``path`` in ``queries`` queries; returns the body and the SQL of the last query"""
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(len(captured), queries)
+        return response.json(), captured[-1]['sql']
+
+    def test_list_fields(self):
+        body, sql = self.get('/api/redeem/', {'fields': 'status,id'}, queries=2)
+        self.assertEqual(body['results'], [{'id': self.redeem.pk, 'status': 'Completed'}])
+        self.assertNotIn('JOIN', sql)
+        self.assertNotIn('points_cost', sql)
+
+    def test_list_fields_beyond_the_list_serializer(self):
+        body, sql = self.get('/api/redeem/', {'fields': 'id,member_email'}, queries=2)
+        self.assertEqual(body['results'], [{'id': self.redeem.pk, 'member_email': 'john@example.com'}])
+        self.assertIn('"members"', sql)
+        self.assertNotIn('"vouchers"', sql)
+
+    def test_list_expand(self):
+        body, _ = self.get('/api/redeem/', {'fields': 'id', 'expand': 'voucher'}, queries=2)
+        (item,) = body['results']
+        self.assertEqual(list(item), ['id', 'voucher'])
+        self.assertEqual(item['voucher']['code'], 'DISC10')
+        self.assertTrue(item['voucher']['is_available'])
+
+    def test_detail_fields(self):
+        body, sql = self.get(f'/api/redeem/{self.redeem.pk}/', {'fields': 'status,voucher_code'}, queries=1)
+        self.assertEqual(body['data'], {'status': 'Completed', 'voucher_code': 'DISC10'})
+        self.assertIn('"vouchers"."code"', sql)
+        # Members are joined for the ETag's member__updated_at only
+        self.assertIn('"members"."updated_at"', sql)
+        self.assertNotIn('"members"."email"', sql)
+        self.assertNotIn('points_cost', sql)
+
+    def test_detail_expand(self):
+        body, sql = self.get(f'/api/redeem/{self.redeem.pk}/', {'fields': 'id', 'expand': 'member'}, queries=1)
+        self.assertEqual(list(body['data']), ['id', 'member'])
+        self.assertEqual(body['data']['member']['id'], self.member.pk)
+        self.assertIn('"members"."email"', sql)
+        self.assertNotIn('"vouchers"."code"', sql)
+
+    def test_unknown_fields_are_rejected(self):
+        for params in ({'fields': 'id,secret'}, {'expand': 'status'}):
+            self.assertEqual(self.client.get('/api/redeem/', params).status_code, 400, params)
+            self.assertEqual(self.client.get(f'/api/redeem/{self.redeem.pk}/', params).status_code, 400, params)
+
+    def test_narrow_queryset(self):
+        queryset = RedeemTransaction.objects.select_related('member', 'voucher')
+        narrowed = narrow_queryset(queryset, RedeemTransactionSerializer(), ('status', 'voucher_code'), [])
+        self.assertEqual(narrowed.query.select_related, {'voucher': {}})
+        self.assertEqual(narrowed.query.deferred_loading, (frozenset({'id', 'status', 'voucher__code'}), False))
+
+        expanded = narrow_queryset(
+            queryset, RedeemTransactionSerializer(), ('id',), ['member'], extra=('updated_at', 'voucher__updated_at')
+        )
+        self.assertEqual(expanded.query.select_related, {'member': {}, 'voucher': {}})
+        self.assertEqual(
+            expanded.query.deferred_loading, (frozenset({'id', 'member', 'updated_at', 'voucher__updated_at'}), False)
+        )
+
+        # Properties may read any column
+        computed = narrow_queryset(Member.objects.all(), MemberSerializer(), ('points_to_next_tier',), [])
+        self.assertEqual(computed.query.deferred_loading, (frozenset(), True))
+
+
+class RedeemTransactionProjectionTests(TestCase):
+    """List projections render what their serializers would"""
+
+    @classmethod
+    def setUpTestData(cls):
+        member = Member.objects.create(
+            name='John Doe', email='john@example.com', phone='08123456789', join_date=date.today()
+        )
+        PointTransaction.objects.create(member=member, transaction_type='earn', points=1000)
+        voucher = Voucher.objects.create(
+            code='DISC10', name='Diskon 10%', points_cost=200, stock=10,
+            start_date=date.today() - timedelta(days=1), end_date=date.today() + timedelta(days=30),
+        )
+        for status in ('Completed', 'Pending'):
+            RedeemTransaction.objects.create(member=Member.objects.get(pk=member.pk), voucher=voucher, status=status)
+        # One used, one with no used_date
+        RedeemTransaction.objects.filter(status='Completed').update(
+            used_date=timezone.now().replace(microsecond=123456)
+        )
+
+    def test_projections_match_serializers(self):
+        queryset = RedeemTransaction.objects.select_related('member', 'voucher').order_by('pk')
+        for projection_class in (RedeemTransactionListProjection, RedeemTransactionProjection):
+            with self.subTest(projection_class.__name__):
+                projection = projection_class.build()
+                projected = projection.render(projection.project(queryset))
+                serialized = projection_class.serializer_class(queryset, many=True).data
+                self.assertEqual(projected, serialized)
+                self.assertEqual(JSONRenderer().render(projected), JSONRenderer().render(serialized))
@@ -3,11 +3,13 @@ Redeem URLs
 """
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import RedeemTransactionViewSet
+from .views import RedeemTransactionViewSet, RedeemStatisticsView
 
 router = DefaultRouter()
 router.register(r'', RedeemTransactionViewSet, basename='redeem')
 
 urlpatterns = [
+    # Ahead of the router, whose detail route would match it
+    path('statistics/', RedeemStatisticsView.as_view(), name='redeem-statistics'),
     path('', include(router.urls)),
 ]
@@ -9,12 +9,19 @@ from django.db.models import Q, Count, Sum
 from django.utils import timezone
 from django_filters import rest_framework as filters
 
+from apps.audit.capture import AuditMixin
+from utils.asyncviews import AsyncAPIView
+from utils.conditional import ConditionalGetMixin, conditional_get
+from utils.db.router import ReplicaReadMixin
+from utils.fieldsets import SparseFieldsetMixin
+
 from .models import RedeemTransaction
 from .serializers import (
     RedeemTransactionSerializer,
     RedeemTransactionListSerializer,
     RedeemStatisticsSerializer
 )
+from .projections import RedeemTransactionListProjection, RedeemTransactionProjection
 
 
 class RedeemTransactionFilter(filters.FilterSet):
@@ -30,7 +37,7 @@ class RedeemTransactionFilter(filters.FilterSet):
         fields = ['member', 'voucher', 'status', 'date_from', 'date_to']
 
 
-class RedeemTransactionViewSet(viewsets.ModelViewSet):
+class RedeemTransactionViewSet(AuditMixin, ReplicaReadMixin, ConditionalGetMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     ViewSet for Redeem Transaction CRUD operations
     """
@@ -39,6 +46,11 @@ class RedeemTransactionViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.DjangoFilterBackend]
     filterset_class = RedeemTransactionFilter
+    list_projection_class = RedeemTransactionListProjection
+    projection_class = RedeemTransactionProjection
+    # Member and voucher fields are embedded; an expanded voucher changes with the date
+    etag_fields = ('updated_at', 'member__updated_at', 'voucher__updated_at')
+    etag_daily = True
     
     def get_serializer_class(self):
         """Use different serializer for list view"""
@@ -46,19 +58,19 @@ class RedeemTransactionViewSet(viewsets.ModelViewSet):
             return RedeemTransactionListSerializer
         return RedeemTransactionSerializer
     
+    @conditional_get
     def list(self, request, *args, **kwargs):
         """List all redeem transactions with filters"""
-        queryset = self.filter_queryset(self.get_queryset())
+        projection = self.get_list_projection()
+        queryset = projection.project(self.filter_queryset(self.get_queryset()))
         
         page = self.paginate_queryset(queryset)
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            return self.get_paginated_response(projection.render(page))
         
-        serializer = self.get_serializer(queryset, many=True)
         return Response({
             'success': True,
-            'data': serializer.data,
+            'data': projection.render(queryset),
             'count': queryset.count()
         })
     
@@ -74,6 +86,7 @@ class RedeemTransactionViewSet(viewsets.ModelViewSet):
             'data': serializer.data
         }, status=status.HTTP_201_CREATED)
     
+    @conditional_get
     def retrieve(self, request, *args, **kwargs):
         """Get redeem transaction detail"""
         instance = self.get_object()
@@ -147,9 +160,17 @@ class RedeemTransactionViewSet(viewsets.ModelViewSet):
             'message': 'Redemption cancelled successfully',
             'data': serializer.data
         })
+
+
+class RedeemStatisticsView(ReplicaReadMixin, AsyncAPIView):
+    """
+    Redeem transaction statistics, served asynchronously
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = RedeemStatisticsSerializer
+    replica_actions = ('get',)
     
-    @action(detail=False, methods=['get'])
-    def statistics(self, request):
+    async def get(self, request):
         """Get redeem transaction statistics"""
         transactions = RedeemTransaction.objects.all()
         
@@ -158,17 +179,17 @@ class RedeemTransactionViewSet(viewsets.ModelViewSet):
         if member_id:
             transactions = transactions.filter(member__id=member_id)
         
-        stats = {
-            'total_redeems': transactions.count(),
-            'pending_redeems': transactions.filter(status='Pending').count(),
-            'completed_redeems': transactions.filter(status='Completed').count(),
-            'used_redeems': transactions.filter(status='Used').count(),
-            'cancelled_redeems': transactions.filter(status='Cancelled').count(),
-            'total_points_redeemed': transactions.exclude(status='Cancelled').aggregate(
-                total=Sum('points_cost'))['total'] or 0
-        }
-        
-        serializer = RedeemStatisticsSerializer(stats)
+        totals = await transactions.aaggregate(
+            total_redeems=Count('id'),
+            pending_redeems=Count('id', filter=Q(status='Pending')),
+            completed_redeems=Count('id', filter=Q(status='Completed')),
+            used_redeems=Count('id', filter=Q(status='Used')),
+            cancelled_redeems=Count('id', filter=Q(status='Cancelled')),
+            total_points_redeemed=Sum('points_cost', filter=~Q(status='Cancelled')),
+        )
+        totals['total_points_redeemed'] = totals['total_points_redeemed'] or 0
+        
+        serializer = RedeemStatisticsSerializer(totals)
         
         return Response({
             'success': True,
@@ -4,12 +4,15 @@ Vouchers models
 from django.db import models
 from django.core.validators import MinValueValidator
 from django.utils import timezone
+from apps.changes.outbox import ChangeCaptureMixin
 
 
-class Voucher(models.Model):
+class Voucher(ChangeCaptureMixin, models.Model):
     """
     Voucher model for rewards
     """
+    change_entity = 'voucher'
+    
     TYPE_CHOICES = [
         ('discount', 'Discount'),
         ('cashback', 'Cashback'),
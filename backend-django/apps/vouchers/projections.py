@@ -0,0 +1,45 @@
+"""
+Vouchers projections
+"""
+from django.utils import timezone
+
+from utils.projection import ListProjection
+from .serializers import VoucherSerializer, VoucherListSerializer
+
+
+class VoucherListProjection(ListProjection):
+    """Projection mirroring VoucherListSerializer"""
+    serializer_class = VoucherListSerializer
+    computed_fields = {
+        'is_available': ['status', 'stock', 'start_date', 'end_date'],
+    }
+
+    def get_computed(self, rows):
+        """Evaluate Voucher properties for the whole page with one clock read"""
+        today = timezone.now().date()
+        computed = {}
+
+        if 'is_available' in self.field_names:
+            status, stock, start_date, end_date = self.index('status', 'stock', 'start_date', 'end_date')
+            computed['is_available'] = [
+                row[status] == 'Active' and row[stock] > 0 and row[start_date] <= today <= row[end_date]
+                for row in rows
+            ]
+
+        if 'days_until_expiry' in self.field_names:
+            end_date, = self.index('end_date')
+            computed['days_until_expiry'] = [
+                0 if row[end_date] < today else (row[end_date] - today).days
+                for row in rows
+            ]
+
+        return computed
+
+
+class VoucherProjection(VoucherListProjection):
+    """Projection mirroring VoucherSerializer, used for ?fields= on lists"""
+    serializer_class = VoucherSerializer
+    computed_fields = {
+        'is_available': ['status', 'stock', 'start_date', 'end_date'],
+        'days_until_expiry': ['end_date'],
+    }
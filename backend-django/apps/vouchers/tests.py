@@ -0,0 +1,39 @@
+"""
+Vouchers tests
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+
+from .models import Voucher
+from .projections import VoucherListProjection, VoucherProjection
+
+
+class VoucherProjectionTests(TestCase):
+    """List projections render what their serializers would"""
+
+    @classmethod
+    def setUpTestData(cls):
+        today = date.today()
+        Voucher.objects.create(
+            code='DISC10', name='Diskon 10%', discount_value=Decimal('10.50'), points_cost=200, stock=10,
+            start_date=today - timedelta(days=1), end_date=today + timedelta(days=30),
+        )
+        # No discount value, out of stock and past its end date
+        Voucher.objects.create(
+            code='FREEBIE', name='Free Coffee', description='Any size', type='freebie', discount_value=None,
+            points_cost=0, stock=0, status='Expired',
+            start_date=today - timedelta(days=60), end_date=today - timedelta(days=1),
+        )
+
+    def test_projections_match_serializers(self):
+        queryset = Voucher.objects.order_by('pk')
+        for projection_class in (VoucherListProjection, VoucherProjection):
+            with self.subTest(projection_class.__name__):
+                projection = projection_class.build()
+                projected = projection.render(projection.project(queryset))
+                serialized = projection_class.serializer_class(queryset, many=True).data
+                self.assertEqual(projected, serialized)
+                self.assertEqual(JSONRenderer().render(projected), JSONRenderer().render(serialized))
@@ -3,11 +3,13 @@ Vouchers URLs
 """
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import VoucherViewSet
+from .views import VoucherViewSet, VoucherStatisticsView
 
 router = DefaultRouter()
 router.register(r'', VoucherViewSet, basename='voucher')
 
 urlpatterns = [
+    # Ahead of the router, whose detail route would match it
+    path('statistics/', VoucherStatisticsView.as_view(), name='voucher-statistics'),
     path('', include(router.urls)),
 ]
@@ -2,14 +2,20 @@
 Vouchers views
 """
 from rest_framework import viewsets, status
-from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.db.models import Q, Count, Sum
 from django_filters import rest_framework as filters
 
+from apps.audit.capture import AuditMixin
+from utils.asyncviews import AsyncAPIView
+from utils.conditional import ConditionalGetMixin, conditional_get
+from utils.db.router import ReplicaReadMixin
+from utils.fieldsets import SparseFieldsetMixin
+
 from .models import Voucher
 from .serializers import VoucherSerializer, VoucherListSerializer, VoucherStatisticsSerializer
+from .projections import VoucherListProjection, VoucherProjection
 
 
 class VoucherFilter(filters.FilterSet):
@@ -33,7 +39,7 @@ class VoucherFilter(filters.FilterSet):
         )
 
 
-class VoucherViewSet(viewsets.ModelViewSet):
+class VoucherViewSet(AuditMixin, ReplicaReadMixin, ConditionalGetMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     ViewSet for Voucher CRUD operations
     """
@@ -42,6 +48,10 @@ class VoucherViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.DjangoFilterBackend]
     filterset_class = VoucherFilter
+    list_projection_class = VoucherListProjection
+    projection_class = VoucherProjection
+    # is_available and days_until_expiry change with the date
+    etag_daily = True
     
     def get_serializer_class(self):
         """Use different serializer for list view"""
@@ -49,19 +59,19 @@ class VoucherViewSet(viewsets.ModelViewSet):
             return VoucherListSerializer
         return VoucherSerializer
     
+    @conditional_get
     def list(self, request, *args, **kwargs):
         """List all vouchers with filters"""
-        queryset = self.filter_queryset(self.get_queryset())
+        projection = self.get_list_projection()
+        queryset = projection.project(self.filter_queryset(self.get_queryset()))
         
         page = self.paginate_queryset(queryset)
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            return self.get_paginated_response(projection.render(page))
         
-        serializer = self.get_serializer(queryset, many=True)
         return Response({
             'success': True,
-            'data': serializer.data,
+            'data': projection.render(queryset),
             'count': queryset.count()
         })
     
@@ -77,6 +87,7 @@ class VoucherViewSet(viewsets.ModelViewSet):
             'data': serializer.data
         }, status=status.HTTP_201_CREATED)
     
+    @conditional_get
     def retrieve(self, request, *args, **kwargs):
         """Get voucher detail"""
         instance = self.get_object()
@@ -110,19 +121,32 @@ class VoucherViewSet(viewsets.ModelViewSet):
             'success': True,
             'message': 'Voucher deleted successfully'
         }, status=status.HTTP_200_OK)
+
+
+class VoucherStatisticsView(ReplicaReadMixin, AsyncAPIView):
+    """
+    Voucher statistics, served asynchronously
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = VoucherStatisticsSerializer
+    replica_actions = ('get',)
     
-    @action(detail=False, methods=['get'])
-    def statistics(self, request):
+    async def get(self, request):
         """Get voucher statistics"""
         vouchers = Voucher.objects.all()
         
+        totals = await vouchers.aaggregate(
+            total_vouchers=Count('id'),
+            active_vouchers=Count('id', filter=Q(status='Active')),
+            total_stock=Sum('stock'),
+        )
+        by_type = vouchers.values('type').annotate(count=Count('id')).values_list('type', 'count')
+        
         stats = {
-            'total_vouchers': vouchers.count(),
-            'active_vouchers': vouchers.filter(status='Active').count(),
-            'total_stock': vouchers.aggregate(total=Sum('stock'))['total'] or 0,
-            'by_type': dict(
-                vouchers.values('type').annotate(count=Count('id')).values_list('type', 'count')
-            )
+            'total_vouchers': totals['total_vouchers'],
+            'active_vouchers': totals['active_vouchers'],
+            'total_stock': totals['total_stock'] or 0,
+            'by_type': {voucher_type: count async for voucher_type, count in by_type},
         }
         
         serializer = VoucherStatisticsSerializer(stats)
@@ -1,2 +1,25 @@
-# celery.py
-# Content placeholder: CELERY_CONFIG
+"""
+Celery application
+
+Background jobs (apps.jobs) run on Celery workers using the Redis instance
+the cache uses as broker. Configuration comes from the ``CELERY_*``
+settings; tasks are discovered in each app's ``tasks.py``. Workers are
+started per queue:
+
+    celery -A config worker -Q ingestion
+    celery -A config worker -Q reporting
+    celery -A config worker -Q maintenance
+
+plus one scheduler for ``CELERY_BEAT_SCHEDULE``:
+
+    celery -A config beat
+"""
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'crm_project.settings')
+
+app = Celery('crm')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
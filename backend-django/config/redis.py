@@ -1,2 +1,29 @@
-# redis.py
-# Content placeholder: REDIS_CONFIG
+"""
+Async Redis client
+
+Async views use ``redis.asyncio`` directly, since the django-redis cache
+backend is sync-only. Connections belong to the event loop that opened
+them, so one client is kept per loop. For ASGI workers only, which run a
+single long-lived loop: under WSGI ``async_to_sync`` runs every request on
+a loop of its own, and each would leave a client behind; use the sync
+client (``django_redis.get_redis_connection``) there.
+"""
+import asyncio
+import weakref
+
+from django.conf import settings
+from redis import asyncio as aioredis
+
+
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_redis():
+    """Async Redis client for the running event loop"""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        # Same timeouts as the django-redis cache backend
+        client = aioredis.Redis.from_url(settings.REDIS_URL, socket_connect_timeout=5, socket_timeout=5)
+        _clients[loop] = client
+    return client
@@ -1 +1,6 @@
 # CRM Project Package
+
+# Loaded with Django so that tasks use this app and its settings
+from config.celery import app as celery_app
+
+__all__ = ('celery_app',)
@@ -9,3 +9,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'crm_project.settings')
 
 application = get_asgi_application()
+
+# Imported after setup; bounds the threads taken by sync (DRF) views
+from django.conf import settings  # noqa: E402
+from utils.asgi import SyncViewLimiter  # noqa: E402
+
+application = SyncViewLimiter(application, settings.ASGI_SYNC_CONCURRENCY)
@@ -0,0 +1,245 @@
+"""
+Batch requests
+
+``POST /api/batch/`` runs an ordered list of API requests in one round trip,
+e.g. create a member, post a welcome bonus and redeem a voucher::
+
+    {
+        "atomic": true,
+        "operations": [
+            {"id": "member", "method": "POST", "path": "/api/members/", "body": {...}},
+            {"method": "POST", "path": "/api/points/",
+             "body": {"member": "{{member.body.data.id}}", "transaction_type": "earn", "points": 100}}
+        ]
+    }
+
+Each operation is dispatched to the view its path resolves to, as the
+authenticated user of the batch: JWT authentication and throttling run once,
+for the batch. Operations skip the middleware stack, so only DRF API views
+under ``/api/``, whose authentication and permissions run in the view, can
+be batched; anything else (the admin, plain Django views) is rejected.
+
+``{{<id>.<key>...}}`` in a path or body is replaced by that key of an
+earlier operation's result; a body value that is nothing but a reference
+keeps its type.
+
+Without ``atomic``, every operation runs and commits on its own. With it,
+all run in one transaction and the first that fails rolls them all back;
+operations after it are not run and report 424.
+"""
+import io
+import json
+import logging
+import re
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import transaction
+from django.urls import Resolver404, resolve
+from rest_framework import serializers, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from utils.db.router import ReplicaRoutingMiddleware, _read_alias
+
+
+logger = logging.getLogger('crm.batch')
+
+METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+
+# Request headers not passed on to operations: they describe the batch request
+BATCH_ONLY_HEADERS = (
+    'CONTENT_TYPE', 'CONTENT_LENGTH', 'HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE', 'HTTP_ACCEPT_ENCODING',
+)
+
+_REFERENCE_RE = re.compile(r'\{\{\s*([\w-]+)((?:\.[\w-]+)*)\s*\}\}')
+
+
+class UnresolvedReference(Exception):
+    pass
+
+
+class BatchOperationSerializer(serializers.Serializer):
+    id = serializers.RegexField(r'^[\w-]+$', required=False, help_text='Name later operations refer to')
+    method = serializers.ChoiceField(choices=METHODS)
+    path = serializers.CharField(help_text='e.g. /api/members/42/?fields=id,name')
+    body = serializers.JSONField(required=False)
+
+
+class BatchSerializer(serializers.Serializer):
+    atomic = serializers.BooleanField(default=False)
+    operations = BatchOperationSerializer(many=True, allow_empty=False)
+
+    def validate_operations(self, operations):
+        if len(operations) > settings.BATCH_MAX_OPERATIONS:
+            raise serializers.ValidationError(f'At most {settings.BATCH_MAX_OPERATIONS} operations per batch')
+        ids = [operation['id'] for operation in operations if 'id' in operation]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError('Operation ids must be unique')
+        return operations
+
+
+def lookup(results, name, keys):
+    """Value at ``keys`` of the result of operation ``name``"""
+    if name not in results:
+        raise UnresolvedReference(f'No earlier operation with id "{name}"')
+    value = results[name]
+    for key in keys:
+        try:
+            value = value[int(key)] if isinstance(value, list) else value[key]
+        except (KeyError, IndexError, TypeError, ValueError):
+            raise UnresolvedReference(f'"{name}" has no {".".join(keys)}')
+    return value
+
+
+def substitute(value, results):
+    """``value`` with every ``{{<id>.<key>...}}`` replaced from ``results``"""
+    if isinstance(value, dict):
+        return {key: substitute(item, results) for key, item in value.items()}
+    if isinstance(value, list):
+        return [substitute(item, results) for item in value]
+    if not isinstance(value, str):
+        return value
+    match = _REFERENCE_RE.fullmatch(value)
+    if match:
+        return lookup(results, match.group(1), match.group(2).split('.')[1:])
+    return _REFERENCE_RE.sub(
+        lambda match: str(lookup(results, match.group(1), match.group(2).split('.')[1:])), value
+    )
+
+
+def operation_request(request, method, path, body):
+    """A request for one operation, carrying the batch request's user"""
+    path, _, query = path.partition('?')
+    content = b'' if body is None else json.dumps(body).encode()
+    environ = {key: value for key, value in request.META.items() if key not in BATCH_ONLY_HEADERS}
+    environ.update({
+        'REQUEST_METHOD': method,
+        # WSGI strings: the UTF-8 bytes as latin-1
+        'PATH_INFO': path.encode().decode('iso-8859-1'),
+        'SCRIPT_NAME': '',
+        'QUERY_STRING': query.encode().decode('iso-8859-1'),
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(content)),
+        'HTTP_ACCEPT': 'application/json',
+        'wsgi.input': io.BytesIO(content),
+    })
+    operation = WSGIRequest(environ)
+    # Authenticated and throttled once, as the batch (see utils/throttling.py)
+    operation._force_auth_user = request.user
+    operation._force_auth_token = request.auth
+    operation.batched = True
+    return operation
+
+
+def batchable(match, path):
+    """Whether ``path``, resolved to ``match``, may run as a batch operation"""
+    view_class = getattr(match.func, 'cls', None)
+    return (
+        path.startswith('/api/')
+        and isinstance(view_class, type) and issubclass(view_class, APIView)
+        # Nested batches, and responses that never end
+        and getattr(view_class, 'batchable', True)
+    )
+
+
+def error_result(status_code, message):
+    return {
+        'status': status_code,
+        'body': {'success': False, 'error': {'message': message, 'status_code': status_code}},
+    }
+
+
+def run_operation(request, operation, results):
+    """Result (``status`` and ``body``) of one operation"""
+    try:
+        path = substitute(operation['path'], results)
+        body = substitute(operation.get('body'), results)
+    except UnresolvedReference as exc:
+        return error_result(status.HTTP_400_BAD_REQUEST, str(exc))
+
+    try:
+        match = resolve(path.partition('?')[0])
+    except Resolver404:
+        return error_result(status.HTTP_404_NOT_FOUND, f'No route for {path}')
+    if not batchable(match, path):
+        return error_result(status.HTTP_400_BAD_REQUEST, f'{path} cannot be batched')
+
+    sub_request = operation_request(request, operation['method'], path, body)
+    # Scoped like a request of its own (see ReplicaRoutingMiddleware)
+    token = _read_alias.set(None)
+    try:
+        response = match.func(sub_request, *match.args, **match.kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+    finally:
+        _read_alias.reset(token)
+    # Later reads of the batch see this write, even on replicas
+    ReplicaRoutingMiddleware.record_write(sub_request, response)
+
+    if response.streaming:
+        return error_result(status.HTTP_400_BAD_REQUEST, f'{path} streams its response and cannot be batched')
+    if not response.content:
+        content = None
+    elif response.get('Content-Type', '').startswith('application/json'):
+        content = json.loads(response.content)
+    else:
+        content = response.content.decode(response.charset)
+    return {'status': response.status_code, 'body': content}
+
+
+def run_batch(request, operations, atomic):
+    """Results of ``operations`` in order, and whether all of them succeeded"""
+    results = []
+    by_id = {}
+    failed = False
+    for index, operation in enumerate(operations):
+        if failed and atomic:
+            result = error_result(status.HTTP_424_FAILED_DEPENDENCY, 'Not run: an earlier operation failed')
+        else:
+            try:
+                result = run_operation(request, operation, by_id)
+            except Exception:
+                logger.exception('Batch operation %s %s failed', operation['method'], operation['path'])
+                result = error_result(status.HTTP_500_INTERNAL_SERVER_ERROR, 'Internal server error')
+            failed = failed or result['status'] >= 400
+        result = {'id': operation.get('id', str(index)), **result}
+        if 'id' in operation:
+            by_id[operation['id']] = result
+        results.append(result)
+    return results, not failed
+
+
+class BatchView(APIView):
+    """
+    Run several API requests in one round trip; see crm_project/batch.py
+
+    Responds 200 with one result per operation, in order.
+    """
+    serializer_class = BatchSerializer
+    batchable = False
+
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        operations = serializer.validated_data['operations']
+        atomic = serializer.validated_data['atomic']
+        # Budgeted per operation by QueryBudgetMiddleware
+        request._request.batch_operations = len(operations)
+
+        if atomic:
+            with transaction.atomic():
+                results, succeeded = run_batch(request, operations, atomic)
+                if not succeeded:
+                    transaction.set_rollback(True)
+        else:
+            results, succeeded = run_batch(request, operations, atomic)
+
+        return Response({
+            'success': succeeded,
+            'data': {
+                'atomic': atomic,
+                'committed': succeeded or not atomic,
+                'results': results,
+            }
+        })
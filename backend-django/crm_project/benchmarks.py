@@ -0,0 +1,268 @@
+"""
+API benchmark scenarios
+
+Realistic request mixes for ``manage.py benchmark_api`` (see
+utils/benchmark.py):
+
+- ``dashboard``: staff browsing, mostly list, statistics and member 360 reads
+- ``pos_earn``: point-of-sale terminals posting earn transactions in bursts
+- ``flash_redemption``: a flash sale, everyone redeeming the same voucher
+- ``endpoints``: every API route in turn, so none goes unmeasured
+
+Scenarios draw ids from ``BenchmarkFixtures``, a sample of the rows already
+in the database (e.g. from ``generate_dataset``).
+"""
+import datetime
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from apps.jobs.models import Job
+from apps.members.dataset import DatasetGenerator, create_dataset
+from apps.members.models import Member
+from apps.points.models import PointTransaction
+from apps.redeem.models import RedeemTransaction
+from apps.vouchers.models import Voucher
+from utils.benchmark import Operation, Scenario
+
+
+BENCHMARK_USERNAME = 'benchmark'
+BENCHMARK_PASSWORD = 'bench-Pass-2024'
+FLASH_VOUCHER_CODE = 'FLASH-BENCH'
+
+# Members created when the database has none (smoke runs)
+FIXTURE_MEMBERS = 300
+
+
+class BenchmarkFixtures:
+    """Ids the scenarios pick from, sampled once per run"""
+
+    def __init__(self, sample=1000, seed=1):
+        self.user = self.benchmark_user()
+        if not Member.objects.exists():
+            create_dataset(DatasetGenerator(
+                seed=seed, members=FIXTURE_MEMBERS, txn_per_member=20, vouchers=50,
+                end_date=datetime.date.today(), time_zone=settings.TIME_ZONE,
+            ))
+
+        # A window of members at a random offset, read straight off the primary key index
+        count = Member.objects.count()
+        offset = (seed * 7919) % max(count - sample, 1)
+        self.members = list(Member.objects.order_by('pk').values_list('pk', flat=True)[offset:offset + sample])
+        self.vouchers = list(Voucher.objects.order_by('pk').values_list('pk', flat=True)[:sample])
+        # As entered, for lookups by phone
+        self.phones = list(Member.objects.filter(pk__in=self.members[:100]).values_list('phone', flat=True))
+        self.points = list(
+            PointTransaction.objects.filter(member_id__in=self.members[:100]).values_list('pk', flat=True)[:sample]
+        )
+        # Able to afford the flash voucher many times over
+        self.redeemers = list(
+            Member.objects.filter(pk__in=self.members, total_points__gte=1000).values_list('pk', flat=True)
+        ) or self.members
+        self.redemptions = list(
+            RedeemTransaction.objects.filter(member_id__in=self.members[:100]).values_list('pk', flat=True)[:sample]
+        )
+        self.flash_voucher = self.flash_sale_voucher()
+        self.token = str(AccessToken.for_user(self.user))
+
+    @staticmethod
+    def benchmark_user():
+        user, _ = get_user_model().objects.get_or_create(
+            username=BENCHMARK_USERNAME,
+            defaults={'email': 'benchmark@crm.com', 'full_name': 'Benchmark', 'role': 'staff'},
+        )
+        # Reset every run: the endpoints scenario changes it
+        user.set_password(BENCHMARK_PASSWORD)
+        user.save(update_fields=['password'])
+        return user
+
+    @staticmethod
+    def flash_sale_voucher():
+        today = datetime.date.today()
+        voucher, _ = Voucher.objects.update_or_create(
+            code=FLASH_VOUCHER_CODE,
+            defaults={
+                'name': 'Flash Sale', 'type': 'discount', 'discount_value': 50, 'points_cost': 10,
+                'stock': 10 ** 6, 'start_date': today - datetime.timedelta(days=1),
+                'end_date': today + datetime.timedelta(days=1), 'status': 'Active',
+            },
+        )
+        return voucher.pk
+
+    def redemption(self, rng):
+        """A fresh completed redemption of the flash voucher, for routes that change one"""
+        member = Member.objects.get(pk=rng.choice(self.members))
+        # Earned first, so the member can always afford it
+        PointTransaction.objects.create(member=member, transaction_type='earn', points=10, description='Top-up')
+        return RedeemTransaction.objects.create(
+            member=member, voucher=Voucher.objects.get(pk=self.flash_voucher), status='Completed'
+        ).pk
+
+    def disposable_member(self, rng):
+        """A fresh member with a point transaction, for routes that delete one"""
+        member = Member.objects.create(
+            name='Benchmark Duplicate', email=f'{unique("dupe")}@example.com', phone='08123456789',
+            join_date=datetime.date.today(),
+        )
+        PointTransaction.objects.create(member=member, transaction_type='earn', points=10, description='Top-up')
+        return member.pk
+
+
+def member(fixtures, rng):
+    return {'pk': rng.choice(fixtures.members)}
+
+
+def voucher(fixtures, rng):
+    return {'pk': rng.choice(fixtures.vouchers)}
+
+
+def unique(prefix):
+    return f'{prefix}{uuid.uuid4().hex[:12]}'
+
+
+def member_search(fixtures, rng):
+    return rng.choice([
+        {},
+        {'tier_level': rng.choice(['Bronze', 'Silver', 'Gold', 'Platinum'])},
+        {'status': 'Active', 'min_points': 1000},
+        {'search': rng.choice(['john', 'siti', 'gmail', '0812'])},
+        {'page': rng.randint(1, 20)},
+    ])
+
+
+def phone_lookup(fixtures, rng):
+    return {'phone': rng.choice(fixtures.phones)}
+
+
+def recent_points(fixtures, rng):
+    date_from = datetime.date.today() - datetime.timedelta(days=rng.choice([1, 7, 30]))
+    return {'date_from': date_from.isoformat()}
+
+
+def earn(fixtures, rng):
+    return {
+        'member': rng.choice(fixtures.members),
+        'transaction_type': 'earn',
+        'points': rng.choice([10, 25, 50, 75, 120]),
+        'description': 'POS purchase',
+    }
+
+
+def flash_redeem(fixtures, rng):
+    return {'member': rng.choice(fixtures.redeemers), 'voucher': fixtures.flash_voucher}
+
+
+def new_member(fixtures, rng):
+    return {
+        'name': 'Benchmark Member', 'email': f'{unique("bench")}@example.com', 'phone': '08123456789',
+        'join_date': datetime.date.today().isoformat(),
+    }
+
+
+def new_voucher(fixtures, rng):
+    today = datetime.date.today()
+    return {
+        'code': unique('BENCH').upper(), 'name': 'Benchmark Voucher', 'points_cost': 100, 'stock': 10,
+        'start_date': today.isoformat(), 'end_date': (today + datetime.timedelta(days=30)).isoformat(),
+    }
+
+
+def registration(fixtures, rng):
+    username = unique('bench')
+    return {
+        'username': username, 'email': f'{username}@example.com', 'full_name': 'Benchmark Staff',
+        'password': BENCHMARK_PASSWORD, 'password2': BENCHMARK_PASSWORD,
+    }
+
+
+def pos_batch(fixtures, rng):
+    """An earn and the refreshed member, as a POS terminal sends them in one round trip"""
+    member = rng.choice(fixtures.members)
+    return {'operations': [
+        {'method': 'POST', 'path': '/api/points/', 'body': earn(fixtures, rng) | {'member': member}},
+        {'method': 'GET', 'path': f'/api/members/{member}/summary/'},
+    ]}
+
+
+SCENARIOS = {scenario.name: scenario for scenario in [
+    Scenario('dashboard', 'Read-heavy staff dashboard', [
+        Operation('member-list', weight=6, params=member_search),
+        Operation('member-statistics', weight=3),
+        Operation('member-summary', weight=4, kwargs=member),
+        Operation('member-detail', weight=3, kwargs=member),
+        Operation('member-history', weight=2, kwargs=member),
+        Operation('point-list', weight=3, params=recent_points),
+        Operation('point-statistics', weight=2),
+        Operation('point-member-transactions', weight=2, kwargs=lambda f, rng: {'member_id': rng.choice(f.members)}),
+        Operation('voucher-list', weight=2, params=lambda f, rng: {'status': 'Active'}),
+        Operation('voucher-statistics', weight=1),
+        Operation('redeem-list', weight=2),
+        Operation('redeem-statistics', weight=1),
+    ]),
+    Scenario('pos_earn', 'Point-of-sale earn bursts', [
+        Operation('member-lookup', weight=4, params=phone_lookup),
+        Operation('point-list', 'post', weight=8, data=earn),
+        Operation('batch', 'post', weight=2, data=pos_batch),
+        Operation('member-detail', weight=2, kwargs=member),
+        Operation('member-summary', weight=1, kwargs=member),
+    ]),
+    Scenario('flash_redemption', 'Flash sale: concurrent redemptions of one voucher', [
+        Operation('redeem-list', 'post', weight=6, data=flash_redeem),
+        Operation('voucher-detail', weight=3, kwargs=lambda f, rng: {'pk': f.flash_voucher}),
+        Operation('member-summary', weight=1, kwargs=member),
+    ]),
+    Scenario('endpoints', 'Every API route in turn', [
+        Operation('health', anonymous=True),
+        Operation('health-live', anonymous=True),
+        Operation('health-ready', anonymous=True),
+        Operation('metrics', anonymous=True),
+        Operation('root', anonymous=True),
+        Operation('schema', anonymous=True),
+        Operation('swagger-ui', anonymous=True),
+        Operation('redoc', anonymous=True),
+        Operation('register', 'post', data=registration, anonymous=True),
+        Operation('login', 'post', anonymous=True,
+                  data=lambda f, rng: {'username': BENCHMARK_USERNAME, 'password': BENCHMARK_PASSWORD}),
+        Operation('token_refresh', 'post', anonymous=True,
+                  data=lambda f, rng: {'refresh': str(RefreshToken.for_user(f.user))}),
+        Operation('current_user'),
+        Operation('update_profile', 'put', data=lambda f, rng: {'full_name': 'Benchmark'}),
+        Operation('change_password', 'post', data=lambda f, rng: {
+            'old_password': BENCHMARK_PASSWORD, 'new_password': BENCHMARK_PASSWORD,
+            'new_password2': BENCHMARK_PASSWORD,
+        }),
+        Operation('member-list', params=member_search),
+        Operation('member-list', 'post', data=new_member),
+        Operation('member-detail', kwargs=member),
+        Operation('member-detail', 'patch', kwargs=member, data=lambda f, rng: {'address': 'Jl. Benchmark No. 1'}),
+        Operation('member-statistics'),
+        Operation('member-history', kwargs=member),
+        Operation('member-summary', kwargs=member),
+        Operation('member-lookup', params=phone_lookup),
+        Operation('member-merge', 'post', kwargs=lambda f, rng: {'pk': f.disposable_member(rng)},
+                  data=lambda f, rng: {'duplicate': f.disposable_member(rng)}),
+        Operation('point-list', params=recent_points),
+        Operation('point-list', 'post', data=earn),
+        Operation('point-detail', kwargs=lambda f, rng: {'pk': rng.choice(f.points)}),
+        Operation('point-statistics'),
+        Operation('point-member-transactions', kwargs=lambda f, rng: {'member_id': rng.choice(f.members)}),
+        Operation('voucher-list'),
+        Operation('voucher-list', 'post', data=new_voucher),
+        Operation('voucher-detail', kwargs=voucher),
+        Operation('voucher-detail', 'patch', kwargs=lambda f, rng: {'pk': f.flash_voucher},
+                  data=lambda f, rng: {'name': 'Flash Sale'}),
+        Operation('voucher-statistics'),
+        Operation('redeem-list'),
+        Operation('redeem-list', 'post', data=flash_redeem),
+        Operation('redeem-detail', kwargs=lambda f, rng: {'pk': rng.choice(f.redemptions)}),
+        Operation('redeem-mark-used', 'post', kwargs=lambda f, rng: {'pk': f.redemption(rng)}),
+        Operation('redeem-cancel', 'post', kwargs=lambda f, rng: {'pk': f.redemption(rng)}),
+        Operation('redeem-statistics'),
+        Operation('changes', params=lambda f, rng: {'since': 0}),
+        Operation('jobs', 'post', data=lambda f, rng: {'kind': 'tier_report'}),
+        Operation('job-detail', kwargs=lambda f, rng: {'pk': Job.objects.create(kind='tier_report').pk}),
+        Operation('batch', 'post', data=pos_batch),
+    ], sequential=True),
+]}
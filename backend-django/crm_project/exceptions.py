@@ -4,6 +4,9 @@ Custom exception handler for DRF
 from rest_framework.views import exception_handler
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import Throttled
+
+from utils.metrics import THROTTLED, route_label
 
 
 def custom_exception_handler(exc, context):
@@ -13,6 +16,9 @@ def custom_exception_handler(exc, context):
     # Call REST framework's default exception handler first
     response = exception_handler(exc, context)
 
+    if isinstance(exc, Throttled):
+        THROTTLED.labels(route_label(context['request'])).inc()
+
     if response is not None:
         # Customize error response format
         custom_response_data = {
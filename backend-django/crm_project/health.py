@@ -0,0 +1,150 @@
+"""
+Liveness and readiness probes
+
+Liveness only says the worker answers. Readiness probes Postgres, Redis and
+the migration state and reports per-dependency latency; the load balancer
+ejects a worker whose dependencies fail and holds back a new one until its
+migrations are applied. Readiness results are cached per process for
+``HEALTH_READY_CACHE_SECONDS`` so a burst of probes costs one round trip.
+"""
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django_redis import get_redis_connection
+from django_redis.cache import RedisCache
+from rest_framework import status
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from config.redis import get_async_redis
+from utils.asyncviews import AsyncAPIView
+
+
+_ready_result = None
+_ready_checked_at = 0.0
+_migrated = False
+
+
+def _select_one():
+    connection = connections[DEFAULT_DB_ALIAS]
+    if connection.vendor != 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        return
+
+    # SET LOCAL keeps the timeout off the persistent connection
+    timeout_ms = int(settings.HEALTH_PROBE_TIMEOUT * 1000)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'SET LOCAL statement_timeout = {timeout_ms}')
+        cursor.execute('SELECT 1')
+
+
+def _check_migrations():
+    global _migrated
+    if _migrated:
+        return
+
+    executor = MigrationExecutor(connections[DEFAULT_DB_ALIAS])
+    pending = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    if pending:
+        raise RuntimeError(f'{len(pending)} unapplied migration(s)')
+    _migrated = True
+
+
+async def check_database():
+    await sync_to_async(_select_one)()
+
+
+def _ping_redis():
+    get_redis_connection('default').ping()
+
+
+async def check_cache():
+    backend = caches['default']
+    if not isinstance(backend, RedisCache):
+        # Not a Redis cache (tests, local development)
+        await backend.aget('health:ping')
+    elif settings.ASGI:
+        await asyncio.wait_for(get_async_redis().ping(), settings.HEALTH_PROBE_TIMEOUT)
+    else:
+        # Under WSGI every probe runs on an event loop of its own, which an
+        # async client would outlive; the cache's pooled connection is used
+        await asyncio.wait_for(sync_to_async(_ping_redis)(), settings.HEALTH_PROBE_TIMEOUT)
+
+
+async def check_migrations():
+    """Fail until every migration is applied; passes stay cached"""
+    await sync_to_async(_check_migrations)()
+
+
+CHECKS = {
+    'database': check_database,
+    'cache': check_cache,
+    'migrations': check_migrations,
+}
+
+
+async def _timed(check):
+    start = time.perf_counter()
+    try:
+        await check()
+    except Exception as exc:
+        result = {'ok': False, 'error': f'{type(exc).__name__}: {exc}'}
+    else:
+        result = {'ok': True}
+    result['latency_ms'] = round((time.perf_counter() - start) * 1000, 2)
+    return result
+
+
+async def run_checks():
+    """Run every check concurrently, returning ``(ready, {name: result})``"""
+    results = await asyncio.gather(*(_timed(check) for check in CHECKS.values()))
+    results = dict(zip(CHECKS, results))
+    return all(result['ok'] for result in results.values()), results
+
+
+async def get_readiness():
+    """
+    Readiness result, probed at most once per cache window per process
+
+    Probes arriving while one is in flight get the previous result.
+    """
+    global _ready_result, _ready_checked_at
+    now = time.monotonic()
+    if _ready_result is None or now - _ready_checked_at >= settings.HEALTH_READY_CACHE_SECONDS:
+        _ready_checked_at = now
+        _ready_result = await run_checks()
+    return _ready_result
+
+
+class ProbeView(AsyncAPIView):
+    """Unauthenticated and unthrottled, so probes never hit rate limits"""
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    throttle_classes = []
+
+
+class LivenessView(ProbeView):
+    async def get(self, request):
+        """Liveness probe: the worker is serving requests"""
+        return Response({'success': True, 'status': 'alive'})
+
+
+class ReadinessView(ProbeView):
+    async def get(self, request):
+        """Readiness probe: dependencies reachable and migrations applied"""
+        ready, checks = await get_readiness()
+        return Response(
+            {
+                'success': ready,
+                'status': 'ready' if ready else 'unavailable',
+                'checks': checks,
+            },
+            status=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
@@ -0,0 +1,100 @@
+"""
+OpenAPI schema served from memory
+
+Introspecting every serializer takes hundreds of milliseconds, so the schema
+is built once per process: loaded from ``OPENAPI_SCHEMA_FILE`` when the
+image ships one (the Dockerfile runs ``manage.py spectacular --format
+openapi-json``), generated on first use otherwise. Each format is rendered
+once and served with a strong ETag, gzipped for clients that accept it.
+``gunicorn.conf.py`` warms it as workers start.
+
+``?lang`` and ``?version`` are not supported: the API has neither.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from drf_spectacular.generators import SchemaGenerator
+from drf_spectacular.utils import extend_schema
+from drf_spectacular.views import SpectacularAPIView
+
+
+_lock = threading.Lock()
+_schema = None
+# Media type -> {'body', 'gzipped', 'etag', 'content_type'}
+_rendered = {}
+
+
+def load_schema():
+    """The schema as a dict, from the bundled file if there is one"""
+    path = settings.OPENAPI_SCHEMA_FILE
+    if path and os.path.exists(path):
+        with open(path) as stream:
+            return json.load(stream)
+    return SchemaGenerator().get_schema(request=None, public=True)
+
+
+def get_schema():
+    global _schema
+    with _lock:
+        if _schema is None:
+            _schema = load_schema()
+        return _schema
+
+
+def rendered(renderer, media_type):
+    """Body, gzipped body, ETag and content type of the schema as ``media_type``"""
+    entry = _rendered.get(media_type)
+    if entry is None:
+        body = renderer.render(get_schema(), media_type, {})
+        entry = _rendered[media_type] = {
+            'body': body,
+            'gzipped': gzip.compress(body, mtime=0),
+            'etag': f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+            'content_type': f'{media_type}; charset=utf-8' if renderer.charset else media_type,
+        }
+    return entry
+
+
+def warm():
+    """Load the schema and render every format ahead of the first request"""
+    for renderer_class in SpectacularAPIView.renderer_classes:
+        rendered(renderer_class(), renderer_class.media_type)
+
+
+def clear():
+    """Forget the schema, e.g. after the URLconf or the schema file changed"""
+    global _schema
+    with _lock:
+        _schema = None
+        _rendered.clear()
+
+
+class CachedSchemaView(SpectacularAPIView):
+    """
+    OpenAPI schema (YAML, or JSON via content negotiation), built once per
+    process
+    """
+
+    @extend_schema(exclude=True)
+    def get(self, request, *args, **kwargs):
+        entry = rendered(request.accepted_renderer, request.accepted_media_type)
+
+        # Weak comparison: CompressionMiddleware weakens the ETag of bodies it compresses
+        etags = [etag.removeprefix('W/') for etag in parse_etags(request.headers.get('If-None-Match', ''))]
+        if entry['etag'] in etags:
+            response = HttpResponseNotModified()
+        elif 'gzip' in request.headers.get('Accept-Encoding', ''):
+            response = HttpResponse(entry['gzipped'], content_type=entry['content_type'])
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(entry['body'], content_type=entry['content_type'])
+        response['ETag'] = entry['etag']
+        patch_vary_headers(response, ['Accept', 'Accept-Encoding'])
+        return response
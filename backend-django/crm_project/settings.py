@@ -27,6 +27,13 @@ DEBUG = env('DEBUG', default=True)
 
 ALLOWED_HOSTS = env.list('ALLOWED_HOSTS', default=['*'])
 
+# 'wsgi' (gunicorn sync workers) or 'asgi' (gunicorn + uvicorn workers), see gunicorn.conf.py
+SERVER_MODE = env('SERVER_MODE', default='wsgi')
+ASGI = SERVER_MODE == 'asgi'
+
+# ASGI: concurrent requests served by sync views per worker (utils.asgi.SyncViewLimiter)
+ASGI_SYNC_CONCURRENCY = env.int('ASGI_SYNC_CONCURRENCY', default=32)
+
 # Application definition
 INSTALLED_APPS = [
     'django.contrib.admin',
@@ -42,6 +49,7 @@ INSTALLED_APPS = [
     'corsheaders',
     'django_filters',
     'drf_spectacular',
+    'drf_spectacular_sidecar',
     
     # Local apps
     'apps.authentication',
@@ -49,11 +57,18 @@ INSTALLED_APPS = [
     'apps.points',
     'apps.vouchers',
     'apps.redeem',
+    'apps.changes',
+    'apps.audit',
+    'apps.jobs',
 ]
 
 MIDDLEWARE = [
+    'utils.metrics.MetricsMiddleware',
+    'utils.querybudget.QueryBudgetMiddleware',
+    'utils.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'utils.compression.CompressionMiddleware',
+    'utils.asgi.AsyncWhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -61,6 +76,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'utils.db.router.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'crm_project.urls'
@@ -92,13 +108,43 @@ DATABASES = {
         'PASSWORD': env('DB_PASSWORD', default='crm_password'),
         'HOST': env('DB_HOST', default='localhost'),
         'PORT': env('DB_PORT', default='5432'),
-        'CONN_MAX_AGE': env.int('DB_CONN_MAX_AGE', default=600),
+        # Persistent connections are per request context under ASGI, so they would leak there
+        'CONN_MAX_AGE': env.int('DB_CONN_MAX_AGE', default=0 if ASGI else 600),
         'OPTIONS': {
             'connect_timeout': 10,
         }
     }
 }
 
+# Connection pooling (psycopg 3): a positive DB_POOL_MAX_SIZE switches to the
+# pooled backend, which returns connections to the pool after each request
+DB_POOL_MAX_SIZE = env.int('DB_POOL_MAX_SIZE', default=0)
+if DB_POOL_MAX_SIZE:
+    DATABASES['default']['ENGINE'] = 'utils.db.postgresql_pool'
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': env.int('DB_POOL_MIN_SIZE', default=1),
+        'max_size': DB_POOL_MAX_SIZE,
+        'timeout': env.float('DB_POOL_TIMEOUT', default=10.0),
+    }
+
+# Read replicas (utils.db.router): one alias per host, replica_1..n, with the
+# primary's credentials and pool settings
+DB_REPLICA_HOSTS = env.list('DB_REPLICA_HOSTS', default=[])
+DATABASE_REPLICAS = []
+for index, host in enumerate(DB_REPLICA_HOSTS, start=1):
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'OPTIONS': {**DATABASES['default']['OPTIONS']},
+        'TEST': {'NAME': f"test_{DATABASES['default']['NAME']}_{alias}"},
+    }
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['utils.db.router.ReplicaRouter']
+# Seconds a user's reads stay on the primary after they write
+DB_REPLICA_STICKY_SECONDS = env.int('DB_REPLICA_STICKY_SECONDS', default=5)
+
 # Redis Configuration
 REDIS_HOST = env('REDIS_HOST', default='localhost')
 REDIS_PORT = env.int('REDIS_PORT', default=6379)
@@ -131,6 +177,117 @@ CACHES = {
     }
 }
 
+# Query budget instrumentation (utils.querybudget.QueryBudgetMiddleware)
+QUERY_BUDGET_HEADERS = env.bool('QUERY_BUDGET_HEADERS', default=DEBUG)
+QUERY_BUDGET_MAX_QUERIES = env.int('QUERY_BUDGET_MAX_QUERIES', default=20)
+QUERY_BUDGET_MAX_DB_MS = env.float('QUERY_BUDGET_MAX_DB_MS', default=200.0)
+
+# Readiness probe (crm_project.health): per-process result cache and DB timeout (seconds)
+HEALTH_READY_CACHE_SECONDS = env.float('HEALTH_READY_CACHE_SECONDS', default=0.5)
+HEALTH_PROBE_TIMEOUT = env.float('HEALTH_PROBE_TIMEOUT', default=1.0)
+
+# Prometheus scrapes (utils.metrics.metrics_view): networks allowed by their
+# connecting address (REMOTE_ADDR, not a forwarded header), and a bearer token
+# accepted from anywhere else; nginx does not proxy /metrics
+METRICS_ALLOWED_NETWORKS = env.list('METRICS_ALLOWED_NETWORKS', default=['127.0.0.0/8', '::1/128'])
+METRICS_TOKEN = env('METRICS_TOKEN', default='')
+
+# On-demand profiling (utils.profiling): sampling interval (seconds), longest
+# run, run length when a worker receives SIGUSR2, where profiles are written,
+# and lines of cProfile stats returned for ?__profile=1
+PROFILER_INTERVAL = env.float('PROFILER_INTERVAL', default=0.01)
+PROFILER_MAX_SECONDS = env.int('PROFILER_MAX_SECONDS', default=300)
+PROFILER_SIGNAL_SECONDS = env.int('PROFILER_SIGNAL_SECONDS', default=30)
+PROFILE_DIR = env('PROFILE_DIR', default=os.path.join(BASE_DIR, 'logs', 'profiles'))
+REQUEST_PROFILE_LINES = env.int('REQUEST_PROFILE_LINES', default=60)
+
+# Response compression (utils.compression): smallest body compressed (bytes),
+# gzip level and Brotli quality (Brotli needs the brotli package); see
+# manage.py benchmark_compression for the trade-off
+COMPRESSION_MIN_BYTES = env.int('COMPRESSION_MIN_BYTES', default=1024)
+COMPRESSION_GZIP_LEVEL = env.int('COMPRESSION_GZIP_LEVEL', default=6)
+COMPRESSION_BROTLI_QUALITY = env.int('COMPRESSION_BROTLI_QUALITY', default=4)
+
+# Admin changelists (utils.admin): unfiltered tables estimated at this many rows
+# or more are counted from planner statistics instead of COUNT(*) (PostgreSQL)
+ESTIMATED_COUNT_MIN_ROWS = env.int('ESTIMATED_COUNT_MIN_ROWS', default=100000)
+
+# Country code of phone numbers entered in national format (leading 0),
+# for Member.phone_e164
+PHONE_DEFAULT_COUNTRY_CODE = env('PHONE_DEFAULT_COUNTRY_CODE', default='62')
+
+# Duplicate member detection (apps.members.dedupe): lowest pair score reported,
+# and blocks larger than this are skipped as too common to tell members apart
+DEDUPE_MIN_SCORE = env.float('DEDUPE_MIN_SCORE', default=0.5)
+DEDUPE_MAX_BLOCK = env.int('DEDUPE_MAX_BLOCK', default=500)
+
+# Batch requests (POST /api/batch/): most operations one batch may carry
+BATCH_MAX_OPERATIONS = env.int('BATCH_MAX_OPERATIONS', default=25)
+
+# Monthly ledger partitions (utils.db.partitions, PostgreSQL only): partitions kept
+# ahead of the current month (created by the maintenance.ensure_partitions beat
+# task), and months kept before archive_transactions detaches them
+TRANSACTION_PARTITIONS_AHEAD = env.int('TRANSACTION_PARTITIONS_AHEAD', default=3)
+TRANSACTION_RETENTION_MONTHS = env.int('TRANSACTION_RETENTION_MONTHS', default=24)
+TRANSACTION_ARCHIVE_DIR = env('TRANSACTION_ARCHIVE_DIR', default=os.path.join(BASE_DIR, 'archive'))
+
+# Change outbox (apps.changes): relay sink, Redis Stream and retention
+CHANGES_SINK = env('CHANGES_SINK', default='apps.changes.sinks.RedisStreamSink')
+CHANGES_REDIS_STREAM = env('CHANGES_REDIS_STREAM', default='crm:changes')
+CHANGES_REDIS_STREAM_MAXLEN = env.int('CHANGES_REDIS_STREAM_MAXLEN', default=1000000)
+CHANGES_FILE_SINK_PATH = env('CHANGES_FILE_SINK_PATH', default=os.path.join(BASE_DIR, 'logs', 'changes.jsonl'))
+CHANGES_RETENTION_DAYS = env.int('CHANGES_RETENTION_DAYS', default=7)
+
+# Live dashboard feed (apps.changes.live): relay_changes publishes relayed changes
+# to LIVE_CHANNEL; per-client queue bound, heartbeat interval and client retry delay
+LIVE_UPDATES = env.bool('LIVE_UPDATES', default=True)
+LIVE_CHANNEL = env('LIVE_CHANNEL', default='crm:live')
+LIVE_QUEUE_SIZE = env.int('LIVE_QUEUE_SIZE', default=256)
+LIVE_HEARTBEAT_SECONDS = env.float('LIVE_HEARTBEAT_SECONDS', default=15.0)
+LIVE_RETRY_MS = env.int('LIVE_RETRY_MS', default=3000)
+
+# Audit log writer (apps.audit.writer): records per multi-row insert, flush interval,
+# queue bound, and seconds a request waits for room before writing its record itself
+AUDIT_BATCH_SIZE = env.int('AUDIT_BATCH_SIZE', default=500)
+AUDIT_FLUSH_INTERVAL_MS = env.int('AUDIT_FLUSH_INTERVAL_MS', default=200)
+AUDIT_QUEUE_SIZE = env.int('AUDIT_QUEUE_SIZE', default=10000)
+AUDIT_ENQUEUE_TIMEOUT = env.float('AUDIT_ENQUEUE_TIMEOUT', default=0.05)
+
+# Background jobs (config/celery.py, apps.jobs): broker, per-queue routing by
+# task name prefix, and members per fanned-out chunk. Eager mode runs tasks
+# in-process without a broker (tests, local development).
+CELERY_BROKER_URL = env('CELERY_BROKER_URL', default=REDIS_URL)
+CELERY_TASK_ALWAYS_EAGER = env.bool('CELERY_TASK_ALWAYS_EAGER', default=False)
+CELERY_TASK_EAGER_PROPAGATES = True
+# Job state lives in the jobs table, not in a result backend
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_TASK_ACKS_LATE = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+# Workers log through LOGGING like the web processes
+CELERY_WORKER_HIJACK_ROOT_LOGGER = False
+CELERY_TASK_DEFAULT_QUEUE = 'maintenance'
+CELERY_TASK_ROUTES = {
+    'ingestion.*': {'queue': 'ingestion'},
+    'reporting.*': {'queue': 'reporting'},
+    'maintenance.*': {'queue': 'maintenance'},
+}
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    # Unacknowledged (acks_late) tasks are redelivered after this many seconds
+    'visibility_timeout': env.int('CELERY_VISIBILITY_TIMEOUT', default=3600),
+}
+# Periodic tasks (celery -A config beat)
+CELERY_BEAT_SCHEDULE = {
+    # Inserts past the last monthly partition would land in the default one
+    'ensure-ledger-partitions': {
+        'task': 'maintenance.ensure_partitions',
+        'schedule': timedelta(hours=env.int('TRANSACTION_PARTITIONS_CHECK_HOURS', default=24)),
+    },
+}
+JOBS_CHUNK_SIZE = env.int('JOBS_CHUNK_SIZE', default=1000)
+
+# Member 360 summary cache (seconds); entries are also keyed on member version
+MEMBER_SUMMARY_CACHE_TIMEOUT = env.int('MEMBER_SUMMARY_CACHE_TIMEOUT', default=30)
+
 # Session Configuration (Redis)
 SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
 SESSION_CACHE_ALIAS = 'default'
@@ -175,7 +332,13 @@ USE_TZ = True
 # Static files (CSS, JavaScript, Images)
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# collectstatic writes hashed names (served with far-future caching) plus .gz
+# and, with brotli installed, .br copies that WhiteNoise picks per request,
+# covering the admin and the Swagger UI/ReDoc bundles
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+}
 
 # Media files
 MEDIA_URL = '/media/'
@@ -240,12 +403,12 @@ REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'EXCEPTION_HANDLER': 'crm_project.exceptions.custom_exception_handler',
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle',
+        'utils.throttling.AnonRateThrottle',
+        'utils.throttling.UserRateThrottle',
     ],
     'DEFAULT_THROTTLE_RATES': {
-        'anon': '100/hour',
-        'user': '1000/hour',
+        'anon': env('THROTTLE_ANON_RATE', default='100/hour'),
+        'user': env('THROTTLE_USER_RATE', default='1000/hour'),
     },
 }
 
@@ -279,8 +442,16 @@ SPECTACULAR_SETTINGS = {
         'displayOperationId': True,
     },
     'COMPONENT_SPLIT_REQUEST': True,
+    # Swagger UI and ReDoc assets from our own static files, not a CDN
+    'SWAGGER_UI_DIST': 'SIDECAR',
+    'SWAGGER_UI_FAVICON_HREF': 'SIDECAR',
+    'REDOC_DIST': 'SIDECAR',
 }
 
+# Pre-generated schema served by crm_project.schema (built into the image);
+# generated on first request when the file is missing
+OPENAPI_SCHEMA_FILE = env('OPENAPI_SCHEMA_FILE', default=os.path.join(BASE_DIR, 'openapi.json'))
+
 # Security Settings
 SECURE_BROWSER_XSS_FILTER = True
 SECURE_CONTENT_TYPE_NOSNIFF = True
@@ -293,49 +464,80 @@ CSRF_COOKIE_SECURE = not DEBUG
 CSRF_COOKIE_HTTPONLY = True
 
 # Logging Configuration
+# Logging: loggers only enqueue records (utils.logqueue); a listener thread per
+# process writes them as JSON to stdout, and to LOG_FILE when set: one file
+# shared by every worker, appended to and rotated externally (logrotate).
+# Access log lines below WARNING are sampled at ACCESS_LOG_SAMPLE_RATE.
+LOG_LEVEL = env('LOG_LEVEL', default='INFO')
+LOG_QUEUE_SIZE = env.int('LOG_QUEUE_SIZE', default=10000)
+LOG_FILE = env('LOG_FILE', default='')
+ACCESS_LOG_SAMPLE_RATE = env.float('ACCESS_LOG_SAMPLE_RATE', default=0.01)
+ACCESS_LOG_SLOW_SECONDS = env.float('ACCESS_LOG_SLOW_SECONDS', default=1.0)
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
     'formatters': {
-        'verbose': {
-            'format': '{levelname} {asctime} {module} {process:d} {thread:d} {message}',
-            'style': '{',
+        'json': {
+            '()': 'utils.logqueue.JsonFormatter',
+            'format': '%(asctime)s %(levelname)s %(name)s %(process)d %(thread)d %(message)s',
+            'rename_fields': {'asctime': 'time', 'levelname': 'level', 'name': 'logger'},
         },
-        'simple': {
-            'format': '{levelname} {message}',
-            'style': '{',
+    },
+    'filters': {
+        'access_sample': {
+            '()': 'utils.logqueue.SampleFilter',
+            'rate': ACCESS_LOG_SAMPLE_RATE,
         },
     },
     'handlers': {
+        'queue': {
+            '()': 'utils.logqueue.QueueingHandler',
+            'sink': 'crm.log_sink',
+            'queue_size': LOG_QUEUE_SIZE,
+        },
         'console': {
             'class': 'logging.StreamHandler',
-            'formatter': 'verbose',
-        },
-        'file': {
-            'class': 'logging.handlers.RotatingFileHandler',
-            'filename': os.path.join(BASE_DIR, 'logs', 'django.log'),
-            'maxBytes': 1024 * 1024 * 10,  # 10 MB
-            'backupCount': 5,
-            'formatter': 'verbose',
+            'formatter': 'json',
         },
     },
     'root': {
-        'handlers': ['console', 'file'],
-        'level': 'INFO',
+        'handlers': ['queue'],
+        'level': LOG_LEVEL,
     },
     'loggers': {
-        'django': {
-            'handlers': ['console', 'file'],
-            'level': 'INFO',
+        # Records taken off the queue by the listener; never logged to directly
+        'crm.log_sink': {
+            'handlers': ['console'],
             'propagate': False,
         },
+        'crm.access': {
+            'filters': ['access_sample'],
+        },
+        'django': {
+            'level': LOG_LEVEL,
+        },
+        'crm.query_budget': {
+            'level': 'WARNING',
+        },
         'django.db.backends': {
-            'handlers': ['console'],
             'level': 'WARNING',
+        },
+        # Replaced by crm.access; gunicorn's access log is disabled as well
+        'uvicorn.access': {
+            'handlers': [],
             'propagate': False,
         },
     },
 }
 
-# Create logs directory if not exists
-os.makedirs(os.path.join(BASE_DIR, 'logs'), exist_ok=True)
+if LOG_FILE:
+    # Reopened when logrotate moves it; workers never rotate it themselves
+    LOGGING['handlers']['file'] = {
+        'class': 'logging.handlers.WatchedFileHandler',
+        'filename': LOG_FILE,
+        'delay': True,
+        'formatter': 'json',
+    }
+    LOGGING['loggers']['crm.log_sink']['handlers'].append('file')
+    os.makedirs(os.path.dirname(os.path.abspath(LOG_FILE)), exist_ok=True)
@@ -0,0 +1,537 @@
+"""
+Per-endpoint query budgets
+
+Every named route in crm_project/urls.py must have a budget here. Fixtures
+hold several rows per table, so a per-row query (N+1) blows the budget.
+
+The rest covers code in crm_project itself: benchmarks, batch, schema and
+health. Tests for apps and utils live beside them.
+"""
+import contextlib
+import gzip
+import io
+import json
+import os
+import tempfile
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import get_resolver, reverse
+from django_redis.cache import RedisCache
+from drf_spectacular.generators import SchemaGenerator
+from rest_framework.test import APIClient
+from rest_framework.throttling import SimpleRateThrottle
+
+from apps.audit.models import AuditLog
+from apps.jobs.models import Job
+from apps.members.models import Member
+from apps.points.models import PointTransaction
+from apps.redeem.models import RedeemTransaction
+from apps.vouchers.models import Voucher
+from crm_project import health, schema
+from crm_project.benchmarks import SCENARIOS, BenchmarkFixtures
+from utils.benchmark import run_scenario
+from utils.querybudget import QueryBudgetAssertions, count_queries, fingerprint
+from utils.tests.test_profiling import join_profilers
+
+User = get_user_model()
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+# The docs pages link static assets, whose manifest only exists after collectstatic
+UNHASHED_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+# Routes not served by this project's code, and the live stream (ASGI only; no queries)
+UNBUDGETED_ROUTES = {'api-root', 'live'}
+UNBUDGETED_NAMESPACES = {'admin'}
+
+# Diagnostics: starting the sampler would perturb the benchmark it is part of
+UNBENCHMARKED_ROUTES = {'profiles', 'profile-detail'}
+
+
+def named_routes(patterns=None, namespace=None):
+    """Names of every route reachable from the root URLconf"""
+    names = set()
+    for pattern in get_resolver().url_patterns if patterns is None else patterns:
+        if hasattr(pattern, 'url_patterns'):
+            if pattern.namespace not in UNBUDGETED_NAMESPACES:
+                names |= named_routes(pattern.url_patterns, pattern.namespace)
+        elif pattern.name and pattern.name not in UNBUDGETED_ROUTES:
+            names.add(pattern.name)
+    return names
+
+
+@override_settings(CACHES=LOCMEM_CACHE, STORAGES=UNHASHED_STORAGES)
+class EndpointQueryBudgetTests(QueryBudgetAssertions, TestCase):
+    """Query budgets for every API route"""
+
+    # (route name, method): max queries
+    BUDGETS = {
+        ('health', 'get'): 0,
+        ('health-live', 'get'): 0,
+        ('health-ready', 'get'): 2,
+        ('metrics', 'get'): 0,
+        ('root', 'get'): 0,
+        ('schema', 'get'): 0,
+        ('swagger-ui', 'get'): 0,
+        ('redoc', 'get'): 0,
+        ('register', 'post'): 3,
+        ('login', 'post'): 4,
+        ('token_refresh', 'post'): 0,
+        ('current_user', 'get'): 0,
+        ('update_profile', 'put'): 1,
+        ('change_password', 'post'): 1,
+        ('member-list', 'get'): 2,
+        ('member-list', 'post'): 5,
+        ('member-detail', 'get'): 1,
+        ('member-detail', 'patch'): 3,
+        ('member-statistics', 'get'): 2,
+        ('member-history', 'get'): 3,
+        ('member-summary', 'get'): 3,
+        ('member-lookup', 'get'): 1,
+        ('member-merge', 'post'): 15,
+        ('point-list', 'get'): 2,
+        ('point-list', 'post'): 5,
+        ('point-detail', 'get'): 1,
+        ('point-statistics', 'get'): 1,
+        ('point-member-transactions', 'get'): 1,
+        ('voucher-list', 'get'): 2,
+        ('voucher-list', 'post'): 4,
+        ('voucher-detail', 'get'): 1,
+        ('voucher-detail', 'patch'): 3,
+        ('voucher-statistics', 'get'): 2,
+        ('redeem-list', 'get'): 2,
+        ('redeem-list', 'post'): 8,
+        ('redeem-detail', 'get'): 1,
+        ('redeem-mark-used', 'post'): 3,
+        ('redeem-cancel', 'post'): 7,
+        ('redeem-statistics', 'get'): 1,
+        ('changes', 'get'): 1,
+        ('jobs', 'post'): 1,
+        ('job-detail', 'get'): 1,
+        ('profiles', 'get'): 0,
+        ('profiles', 'post'): 0,
+        ('profile-detail', 'get'): 0,
+        ('batch', 'post'): 6,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        today = date.today()
+        cls.user = User.objects.create_user(
+            username='staff', email='staff@example.com', password='staff-pass-123', full_name='Staff'
+        )
+        cls.vouchers = [
+            Voucher.objects.create(
+                code=f'VOUCHER{i}', name=f'Voucher {i}', points_cost=100, stock=50,
+                start_date=today - timedelta(days=1), end_date=today + timedelta(days=30),
+            )
+            for i in range(3)
+        ]
+        cls.members = []
+        for i in range(5):
+            member = Member.objects.create(
+                name=f'Member {i}', email=f'member{i}@example.com', phone='08123456789', join_date=today
+            )
+            for points in (300, 200):
+                PointTransaction.objects.create(member=member, transaction_type='earn', points=points)
+            for voucher in cls.vouchers:
+                RedeemTransaction.objects.create(
+                    member=Member.objects.get(pk=member.pk), voucher=voucher, status='Completed'
+                )
+            cls.members.append(member)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.member = Member.objects.get(pk=self.members[0].pk)
+        self.voucher = self.vouchers[0]
+        self.redeem = RedeemTransaction.objects.filter(member=self.member).first()
+        self.point = PointTransaction.objects.filter(member=self.member).first()
+
+    def request(self, name, method, data=None, **kwargs):
+        url = reverse(name, kwargs=kwargs or None)
+        with self.assertMaxQueries(self.BUDGETS[(name, method)], f'{method.upper()} {url}'):
+            response = getattr(self.client, method)(url, data, format='json')
+        self.assertLess(response.status_code, 400, f'{method.upper()} {url}: {response.content[:300]}')
+        return response
+
+    def test_every_route_has_a_budget(self):
+        budgeted = {name for name, method in self.BUDGETS}
+        self.assertEqual(named_routes() - budgeted, set())
+
+    def test_project_routes(self):
+        self.client.logout()
+        for name in ('health', 'health-live', 'health-ready', 'metrics', 'root', 'schema', 'swagger-ui', 'redoc'):
+            self.request(name, 'get')
+
+    def test_auth_routes(self):
+        self.client.logout()
+        self.request('register', 'post', {
+            'username': 'newstaff', 'email': 'new@example.com', 'full_name': 'New Staff',
+            'password': 'x7-Strong-pass', 'password2': 'x7-Strong-pass',
+        })
+        tokens = self.request('login', 'post', {'username': 'staff', 'password': 'staff-pass-123'})
+        self.request('token_refresh', 'post', {'refresh': tokens.json()['data']['refresh']})
+
+        self.client.force_authenticate(self.user)
+        self.request('current_user', 'get')
+        self.request('update_profile', 'put', {'full_name': 'Staff Renamed'})
+        self.request('change_password', 'post', {
+            'old_password': 'staff-pass-123', 'new_password': 'y8-Strong-pass', 'new_password2': 'y8-Strong-pass',
+        })
+
+    def test_member_routes(self):
+        self.request('member-list', 'get')
+        self.request('member-list', 'post', {
+            'name': 'New Member', 'email': 'new.member@example.com', 'phone': '0811', 'join_date': str(date.today()),
+        })
+        self.request('member-detail', 'get', pk=self.member.pk)
+        self.request('member-detail', 'patch', {'name': 'Renamed'}, pk=self.member.pk)
+        self.request('member-statistics', 'get')
+        self.request('member-history', 'get', pk=self.member.pk)
+        self.request('member-summary', 'get', pk=self.member.pk)
+        self.request('member-lookup', 'get', {'phone': '+62 812-345-6789'})
+        self.request('member-merge', 'post', {'duplicate': self.members[1].pk}, pk=self.member.pk)
+
+    def test_point_routes(self):
+        self.request('point-list', 'get')
+        self.request('point-list', 'post', {
+            'member': self.member.pk, 'transaction_type': 'earn', 'points': 50,
+        })
+        self.request('point-detail', 'get', pk=self.point.pk)
+        self.request('point-statistics', 'get')
+        self.request('point-member-transactions', 'get', member_id=self.member.pk)
+
+    def test_voucher_routes(self):
+        self.request('voucher-list', 'get')
+        self.request('voucher-list', 'post', {
+            'code': 'NEW10', 'name': 'New', 'points_cost': 10, 'stock': 5,
+            'start_date': str(date.today()), 'end_date': str(date.today() + timedelta(days=5)),
+        })
+        self.request('voucher-detail', 'get', pk=self.voucher.pk)
+        self.request('voucher-detail', 'patch', {'stock': 40}, pk=self.voucher.pk)
+        self.request('voucher-statistics', 'get')
+
+    def test_redeem_routes(self):
+        self.request('redeem-list', 'get')
+        self.request('redeem-list', 'post', {'member': self.member.pk, 'voucher': self.voucher.pk})
+        self.request('redeem-detail', 'get', pk=self.redeem.pk)
+        self.request('redeem-mark-used', 'post', pk=self.redeem.pk)
+        other = RedeemTransaction.objects.filter(member=self.member, status='Completed').first()
+        self.request('redeem-cancel', 'post', pk=other.pk)
+        self.request('redeem-statistics', 'get')
+
+    def test_change_routes(self):
+        self.request('changes', 'get')
+
+    def test_job_routes(self):
+        # Tasks are only queued once the transaction commits, which it does not here
+        job = self.request('jobs', 'post', {'kind': 'retier_members'}).json()['data']
+        self.request('job-detail', 'get', pk=job['id'])
+
+    def test_batch_routes(self):
+        self.request('batch', 'post', {'operations': [
+            {'method': 'POST', 'path': '/api/points/', 'body': {
+                'member': self.member.pk, 'transaction_type': 'earn', 'points': 50,
+            }},
+            {'method': 'GET', 'path': f'/api/members/{self.member.pk}/'},
+        ]})
+
+    def test_profile_routes(self):
+        self.client.force_authenticate(User(username='admin', role='admin'))
+        with tempfile.TemporaryDirectory() as directory, override_settings(PROFILE_DIR=directory):
+            name = self.request('profiles', 'post', {'seconds': 1}).json()['data']['name']
+            join_profilers()
+            self.request('profiles', 'get')
+            self.request('profile-detail', 'get', filename=name)
+
+
+class FingerprintTests(TestCase):
+    """SQL fingerprint normalization"""
+
+    def test_values_are_normalized(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM members WHERE id = 'MEM-001' AND total_points > 10"),
+            fingerprint("SELECT *  FROM members\nWHERE id = 'MEM-002' AND total_points > 200"),
+        )
+
+    def test_in_lists_collapse(self):
+        self.assertEqual(
+            fingerprint('SELECT * FROM vouchers WHERE id IN (%s, %s, %s)'),
+            'SELECT * FROM vouchers WHERE id IN (...)',
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHE, STORAGES=UNHASHED_STORAGES)
+class BenchmarkTests(TestCase):
+    """API benchmark scenarios in crm_project/benchmarks.py"""
+
+    def test_every_route_is_benchmarked(self):
+        benchmarked = {operation.route for scenario in SCENARIOS.values() for operation in scenario.operations}
+        self.assertEqual(named_routes() - benchmarked - UNBENCHMARKED_ROUTES, set())
+
+    def test_scenarios_run_without_errors(self):
+        fixtures = BenchmarkFixtures(sample=50)
+        for name, scenario in SCENARIOS.items():
+            with self.subTest(name):
+                result = run_scenario(
+                    scenario, fixtures, fixtures.token, threads=1, duration=60, max_requests=len(scenario.operations)
+                )
+                self.assertEqual(result['total']['requests'], len(scenario.operations))
+                failed = {label: route['errors'] for label, route in result['routes'].items() if route['errors']}
+                self.assertEqual(failed, {})
+                self.assertGreater(result['total']['p95'], 0)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class BatchTests(TestCase):
+    """Several API requests in one round trip"""
+
+    @classmethod
+    def setUpTestData(cls):
+        today = date.today()
+        cls.user = User.objects.create_user(
+            username='staff', email='staff@example.com', password='staff-pass-123', full_name='Staff'
+        )
+        cls.voucher = Voucher.objects.create(
+            code='WELCOME', name='Welcome', points_cost=100, stock=50,
+            start_date=today - timedelta(days=1), end_date=today + timedelta(days=30),
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def batch(self, operations, atomic=False):
+        response = self.client.post(reverse('batch'), {'atomic': atomic, 'operations': operations}, format='json')
+        self.assertEqual(response.status_code, 200, response.content[:300])
+        return response.json()
+
+    def onboarding(self, bonus):
+        return [
+            {'id': 'member', 'method': 'POST', 'path': '/api/members/', 'body': {
+                'name': 'New Member', 'email': 'new.member@example.com', 'phone': '0811',
+                'join_date': str(date.today()),
+            }},
+            {'id': 'bonus', 'method': 'POST', 'path': '/api/points/', 'body': {
+                'member': '{{member.body.data.id}}', 'transaction_type': 'earn', 'points': bonus,
+            }},
+            {'method': 'POST', 'path': '/api/redeem/', 'body': {
+                'member': '{{member.body.data.id}}', 'voucher': self.voucher.pk,
+            }},
+            {'method': 'GET', 'path': '/api/members/{{member.body.data.id}}/?fields=total_points'},
+        ]
+
+    def test_operations_run_in_order_with_references(self):
+        batch = self.batch(self.onboarding(bonus=150), atomic=True)
+        self.assertTrue(batch['success'])
+        results = batch['data']['results']
+        self.assertEqual([result['status'] for result in results], [201, 201, 201, 200])
+        self.assertEqual([result['id'] for result in results], ['member', 'bonus', '2', '3'])
+        self.assertEqual(results[3]['body']['data'], {'total_points': 50})
+
+    def test_atomic_batch_rolls_back_on_failure(self):
+        batch = self.batch(self.onboarding(bonus=50), atomic=True)
+        self.assertFalse(batch['success'])
+        self.assertFalse(batch['data']['committed'])
+        self.assertEqual([result['status'] for result in batch['data']['results']], [201, 201, 400, 424])
+        self.assertFalse(Member.objects.filter(email='new.member@example.com').exists())
+        self.assertEqual(PointTransaction.objects.count(), 0)
+
+    def test_operations_commit_on_their_own_without_atomic(self):
+        batch = self.batch(self.onboarding(bonus=50))
+        self.assertFalse(batch['success'])
+        self.assertTrue(batch['data']['committed'])
+        self.assertEqual([result['status'] for result in batch['data']['results']], [201, 201, 400, 200])
+        self.assertEqual(Member.objects.get(email='new.member@example.com').total_points, 50)
+
+    def test_authenticated_and_throttled_once(self):
+        with mock.patch.object(SimpleRateThrottle, 'allow_request', return_value=True) as allow_request:
+            self.batch([{'method': 'GET', 'path': '/api/vouchers/'}] * 5)
+        # Once per default throttle class, for the batch request only
+        self.assertEqual(allow_request.call_count, 2)
+
+        self.client.logout()
+        response = self.client.post(
+            reverse('batch'), {'operations': [{'method': 'GET', 'path': '/api/vouchers/'}]}, format='json'
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_invalid_operations(self):
+        results = self.batch([
+            {'method': 'GET', 'path': '/api/nowhere/'},
+            {'method': 'POST', 'path': '/api/batch/', 'body': {'operations': []}},
+            {'method': 'GET', 'path': '/api/members/{{missing.body.data.id}}/'},
+            {'method': 'GET', 'path': '/api/live/'},
+            # Only DRF views under /api/: these would skip CSRF and session middleware
+            {'method': 'POST', 'path': '/admin/members/member/add/', 'body': {'name': 'Admin'}},
+            {'method': 'GET', 'path': '/health'},
+            {'method': 'GET', 'path': '/metrics'},
+        ])['data']['results']
+        self.assertEqual([result['status'] for result in results], [404, 400, 400, 400, 400, 400, 400])
+
+        with override_settings(BATCH_MAX_OPERATIONS=2):
+            response = self.client.post(
+                reverse('batch'), {'operations': [{'method': 'GET', 'path': '/api/vouchers/'}] * 3}, format='json'
+            )
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(CACHES=LOCMEM_CACHE, STORAGES=UNHASHED_STORAGES)
+class AdminChangelistTests(TestCase):
+    """Admin changelists run the same queries however many rows there are"""
+
+    CHANGELISTS = [
+        ('members_member', {}),
+        ('members_member', {'q': 'member1@example.com', 'join_date__gte': str(date.today())}),
+        ('points_pointtransaction', {}),
+        ('points_pointtransaction', {'q': 'MEM-000001', 'transaction_type': 'earn'}),
+        ('redeem_redeemtransaction', {}),
+        ('redeem_redeemtransaction', {'q': 'VOUCHER1', 'status': 'Completed'}),
+        ('vouchers_voucher', {}),
+        ('audit_auditlog', {}),
+        ('changes_changeevent', {}),
+        ('jobs_job', {}),
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin-pass-123', full_name='Admin'
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.rows = 0
+
+    def add_rows(self, count):
+        today = date.today()
+        for i in range(self.rows, self.rows + count):
+            voucher = Voucher.objects.create(
+                code=f'VOUCHER{i}', name=f'Voucher {i}', points_cost=10, stock=50,
+                start_date=today - timedelta(days=i + 1), end_date=today + timedelta(days=30),
+            )
+            member = Member.objects.create(
+                name=f'Member {i}', email=f'member{i}@example.com', phone='08123456789',
+                join_date=today - timedelta(days=40 * i),
+            )
+            PointTransaction.objects.create(member=member, transaction_type='earn', points=100)
+            RedeemTransaction.objects.create(member=Member.objects.get(pk=member.pk), voucher=voucher)
+            Job.objects.create(kind='tier_report', created_by=self.admin)
+            AuditLog.objects.create(
+                user_id=str(self.admin.pk), action='CREATE', entity_type='member', entity_id=member.pk,
+                created_at=datetime.now(dt_timezone.utc) - timedelta(days=40 * i),
+            )
+        self.rows += count
+
+    def changelist_queries(self, name, params):
+        url = reverse(f'admin:{name}_changelist')
+        with count_queries() as counter:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, f'{url} {params}')
+        return counter.count
+
+    def test_query_count_is_constant(self):
+        self.add_rows(2)
+        before = {f'{name} {params}': self.changelist_queries(name, params) for name, params in self.CHANGELISTS}
+        self.add_rows(6)
+        after = {f'{name} {params}': self.changelist_queries(name, params) for name, params in self.CHANGELISTS}
+        self.assertEqual(after, before)
+
+
+class SchemaTests(TestCase):
+    """OpenAPI schema served from memory"""
+
+    JSON = 'application/vnd.oai.openapi+json'
+
+    def setUp(self):
+        schema.clear()
+        self.addCleanup(schema.clear)
+
+    def live_schema(self):
+        return SchemaGenerator().get_schema(request=None, public=True)
+
+    def test_matches_live_introspection(self):
+        response = self.client.get(reverse('schema'), HTTP_ACCEPT=self.JSON)
+        self.assertEqual(response['Content-Type'], self.JSON)
+        self.assertEqual(json.loads(response.content), json.loads(json.dumps(self.live_schema())))
+
+    def test_bundled_file_matches_live_introspection(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'openapi.json')
+            with contextlib.redirect_stderr(io.StringIO()):
+                call_command('spectacular', '--format', 'openapi-json', '--file', path)
+            with override_settings(OPENAPI_SCHEMA_FILE=path), \
+                    mock.patch.object(SchemaGenerator, 'get_schema', side_effect=AssertionError('introspected')):
+                response = self.client.get(reverse('schema'), HTTP_ACCEPT=self.JSON)
+        self.assertEqual(json.loads(response.content), json.loads(json.dumps(self.live_schema())))
+
+    def test_etag_and_gzip(self):
+        plain = self.client.get(reverse('schema'))
+        self.assertTrue(plain.content.startswith(b'openapi: 3'))
+        self.assertIn('Accept-Encoding', plain['Vary'])
+
+        compressed = self.client.get(reverse('schema'), HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+        self.assertEqual(compressed['ETag'], plain['ETag'])
+
+        unchanged = self.client.get(reverse('schema'), HTTP_IF_NONE_MATCH=plain['ETag'])
+        self.assertEqual(unchanged.status_code, 304)
+        self.assertEqual(unchanged.content, b'')
+
+    def test_generated_once(self):
+        with mock.patch.object(SchemaGenerator, 'get_schema', wraps=SchemaGenerator().get_schema) as get_schema:
+            for accept in ('application/vnd.oai.openapi', self.JSON, self.JSON):
+                self.client.get(reverse('schema'), HTTP_ACCEPT=accept)
+        self.assertEqual(get_schema.call_count, 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ReadinessTests(TestCase):
+    """Readiness probe results and caching"""
+
+    def setUp(self):
+        health._ready_checked_at = 0.0
+
+    def test_ready(self):
+        response = self.client.get(reverse('health-ready'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()['checks']), {'database', 'cache', 'migrations'})
+
+    def test_failing_dependency_is_unavailable(self):
+        with mock.patch.dict(health.CHECKS, database=mock.AsyncMock(side_effect=OSError('refused'))):
+            response = self.client.get(reverse('health-ready'))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['checks']['database']['error'], 'OSError: refused')
+
+    @override_settings(HEALTH_READY_CACHE_SECONDS=60)
+    def test_probes_are_cached(self):
+        check = mock.AsyncMock()
+        with mock.patch.dict(health.CHECKS, database=check):
+            self.client.get(reverse('health-ready'))
+            self.client.get(reverse('health-ready'))
+        self.assertEqual(check.call_count, 1)
+
+    def test_redis_client_follows_server_mode(self):
+        redis = mock.Mock(spec=RedisCache)
+        async_client = mock.Mock(ping=mock.AsyncMock())
+        with mock.patch.object(health, 'caches', {'default': redis}), \
+                mock.patch.object(health, 'get_redis_connection') as get_redis_connection, \
+                mock.patch.object(health, 'get_async_redis', return_value=async_client):
+            # A loop per probe under WSGI: the pooled sync connection, no async client left behind
+            async_to_sync(health.check_cache)()
+            get_redis_connection.return_value.ping.assert_called_once()
+            async_client.ping.assert_not_called()
+
+            with override_settings(ASGI=True):
+                async_to_sync(health.check_cache)()
+            async_client.ping.assert_awaited_once()
@@ -5,16 +5,19 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from drf_spectacular.views import (
-    SpectacularAPIView,
-    SpectacularRedocView,
-    SpectacularSwaggerView,
-)
+from drf_spectacular.views import SpectacularRedocView, SpectacularSwaggerView
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 
+from apps.changes.views import LiveFeedView
+from utils.metrics import metrics_view
+from utils.profiling import ProfileDetailView, ProfileView
+from .batch import BatchView
+from .health import LivenessView, ReadinessView
+from .schema import CachedSchemaView
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def health_check(request):
@@ -35,7 +38,15 @@ def root_view(request):
         'version': '1.0.0',
         'endpoints': {
             'health': '/health',
+            'liveness': '/health/live',
+            'readiness': '/health/ready',
+            'metrics': '/metrics',
             'api': '/api',
+            'changes': '/api/changes/?since=',
+            'live': '/api/live/',
+            'jobs': '/api/jobs/',
+            'profiles': '/api/profiles/',
+            'batch': '/api/batch/',
             'admin': '/admin',
             'docs': '/api/docs',
             'schema': '/api/schema',
@@ -48,10 +59,13 @@ urlpatterns = [
     
     # Health check
     path('health', health_check, name='health'),
+    path('health/live', LivenessView.as_view(), name='health-live'),
+    path('health/ready', ReadinessView.as_view(), name='health-ready'),
+    path('metrics', metrics_view, name='metrics'),
     path('', root_view, name='root'),
     
     # API Documentation
-    path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
+    path('api/schema/', CachedSchemaView.as_view(), name='schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
     path('api/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
     
@@ -61,6 +75,12 @@ urlpatterns = [
     path('api/points/', include('apps.points.urls')),
     path('api/vouchers/', include('apps.vouchers.urls')),
     path('api/redeem/', include('apps.redeem.urls')),
+    path('api/changes/', include('apps.changes.urls')),
+    path('api/live/', LiveFeedView.as_view(), name='live'),
+    path('api/jobs/', include('apps.jobs.urls')),
+    path('api/profiles/', ProfileView.as_view(), name='profiles'),
+    path('api/profiles/<str:filename>/', ProfileDetailView.as_view(), name='profile-detail'),
+    path('api/batch/', BatchView.as_view(), name='batch'),
 ]
 
 # Static and media files (development)
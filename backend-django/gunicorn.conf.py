@@ -0,0 +1,53 @@
+"""
+Gunicorn configuration
+
+Loaded automatically from the working directory; command line flags in the
+Dockerfile still take precedence. SERVER_MODE selects sync WSGI workers
+(default) or uvicorn workers serving crm_project/asgi.py. The hooks keep the
+Prometheus multiprocess directory (see utils/metrics.py) consistent across
+worker restarts, queued audit records are written before a worker exits,
+SIGUSR2 to a worker samples its stacks (utils/profiling.py), and workers render
+the OpenAPI schema (crm_project/schema.py) before serving.
+"""
+import os
+import shutil
+
+
+if os.environ.get('SERVER_MODE') == 'asgi':
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    wsgi_app = 'crm_project.asgi:application'
+else:
+    worker_class = 'sync'
+    wsgi_app = 'crm_project.wsgi:application'
+
+
+def on_starting(server):
+    """Start every master with an empty metrics directory"""
+    path = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def post_worker_init(worker):
+    """
+    Render the OpenAPI schema before the first request; kill -USR2 <worker
+    pid> profiles that worker for PROFILER_SIGNAL_SECONDS
+    """
+    from crm_project import schema
+    from utils.profiling import install_signal_handler
+    schema.warm()
+    install_signal_handler()
+
+
+def worker_exit(server, worker):
+    """Write audit records still queued in the exiting worker"""
+    from apps.audit.writer import writer
+    writer.stop()
+
+
+def child_exit(server, worker):
+    """Drop live gauges of exited workers; their counters keep counting"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,66 @@
+"""
+ASGI deployment support
+
+Used by ``crm_project/asgi.py`` when running under uvicorn workers
+(``SERVER_MODE=asgi``). Async views run on the event loop; requests for
+sync views each take a thread, so their concurrency is bounded here rather
+than growing one thread per in-flight request.
+"""
+import asyncio
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.urls import Resolver404, get_resolver
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+
+class SyncViewLimiter:
+    """ASGI wrapper allowing at most ``limit`` concurrent sync-view requests"""
+
+    def __init__(self, app, limit):
+        self.app = app
+        self.semaphore = asyncio.Semaphore(limit)
+
+    @staticmethod
+    def is_async(path):
+        try:
+            match = get_resolver().resolve(path)
+        except Resolver404:
+            return False
+        return iscoroutinefunction(match.func)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or self.is_async(scope['path']):
+            return await self.app(scope, receive, send)
+        async with self.semaphore:
+            return await self.app(scope, receive, send)
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise usable in an async middleware chain
+
+    Stock WhiteNoise is sync-only, which would force every view below it
+    onto a thread. Static lookups are in-memory unless autorefresh is on.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,48 @@
+"""
+Async API views
+
+DRF dispatches synchronously, so under ASGI every DRF view occupies a
+thread for its whole duration. ``AsyncAPIView`` keeps DRF's request
+handling (authentication, permissions, throttling, exception handling and
+rendering) but awaits coroutine handlers that use the async ORM. Only the
+authentication/permission/throttle checks hop to a thread, once per request,
+and not at all for views without authentication or throttling.
+Under WSGI the same views run through ``async_to_sync``.
+"""
+import inspect
+
+from asgiref.sync import sync_to_async
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+    """``APIView`` whose handlers are coroutines"""
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            if self.authentication_classes or self.throttle_classes:
+                await sync_to_async(self.initial)(request, *args, **kwargs)
+            else:
+                # Nothing that could touch the database or cache
+                self.initial(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            if inspect.isawaitable(response):
+                response = await response
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
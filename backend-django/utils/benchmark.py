@@ -0,0 +1,215 @@
+"""
+In-process API benchmarking
+
+A ``Scenario`` is a weighted mix of ``Operation``s, each a named route and
+method with functions building its URL kwargs, query string and JSON body.
+``run_scenario`` drives a scenario from a pool of threads, each with its own
+Django test client, so requests pass through the full middleware stack
+without a server in between. Every request is timed and its query count
+taken from ``QueryBudgetMiddleware``.
+
+Results are plain dicts, ready for JSON: per scenario a ``total`` and per
+route ``requests``, ``errors``, ``throughput`` (req/s), ``p50``/``p95``/``p99``
+(ms) and ``queries`` (mean per request). ``compare`` checks them against a
+baseline run.
+"""
+import json
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+from unittest import mock
+
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+from rest_framework.throttling import SimpleRateThrottle
+
+
+# Regressions reported by ``compare``: relative p95 latency increase,
+# relative throughput drop, absolute increase in mean queries per request
+# and in error rate
+DEFAULT_THRESHOLDS = {
+    'p95': 0.25,
+    'throughput': 0.15,
+    'queries': 0.5,
+    'error_rate': 0.01,
+}
+
+# Latency changes smaller than this are noise, whatever the ratio
+MIN_LATENCY_DELTA_MS = 1.0
+
+
+class Operation:
+    """
+    One kind of request in a scenario
+
+    ``kwargs``, ``params`` and ``data`` are called with the scenario's
+    fixtures and a ``random.Random`` and return the route's URL kwargs, the
+    query string and the JSON body. They run before the request is timed,
+    so they may also create the rows the request needs.
+    """
+
+    def __init__(self, route, method='get', weight=1, kwargs=None, params=None, data=None, anonymous=False):
+        self.route = route
+        self.method = method
+        self.weight = weight
+        self.kwargs = kwargs
+        self.params = params
+        self.data = data
+        self.anonymous = anonymous
+
+    @property
+    def label(self):
+        return f'{self.method.upper()} {self.route}'
+
+    def request(self, client, fixtures, rng):
+        """Send one request; returns ``(status code, seconds, queries)``"""
+        url = reverse(self.route, kwargs=self.kwargs(fixtures, rng) if self.kwargs else None)
+        params = self.params(fixtures, rng) if self.params else {}
+        extra = {'HTTP_AUTHORIZATION': ''} if self.anonymous else {}
+        if self.method == 'get':
+            start = time.perf_counter()
+            response = client.get(url, params, **extra)
+        else:
+            body = json.dumps(self.data(fixtures, rng) if self.data else {})
+            start = time.perf_counter()
+            response = client.generic(self.method.upper(), url, body, content_type='application/json', **extra)
+        elapsed = time.perf_counter() - start
+
+        counter = getattr(response.wsgi_request, 'query_counter', None)
+        return response.status_code, elapsed, counter.count if counter else None
+
+
+class Scenario:
+    """
+    Weighted mix of operations; with ``sequential`` the operations are
+    cycled in order instead, so each runs equally often
+    """
+
+    def __init__(self, name, description, operations, sequential=False):
+        self.name = name
+        self.description = description
+        self.operations = operations
+        self.sequential = sequential
+
+    def picker(self, rng, offset=0):
+        """Function returning the next operation of one client"""
+        if self.sequential:
+            position = iter(range(offset, 1 << 62))
+            return lambda: self.operations[next(position) % len(self.operations)]
+        weights = [operation.weight for operation in self.operations]
+        return lambda: rng.choices(self.operations, weights)[0]
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def summarize(samples, elapsed):
+    """Figures for a list of ``(status, seconds, queries)`` samples"""
+    latencies = sorted(seconds * 1000 for _, seconds, _ in samples)
+    queries = [count for _, _, count in samples if count is not None]
+    errors = sum(1 for status, _, _ in samples if status >= 400)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+        'throughput': round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        'p50': round(percentile(latencies, 0.50), 2),
+        'p95': round(percentile(latencies, 0.95), 2),
+        'p99': round(percentile(latencies, 0.99), 2),
+        'queries': round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+
+def run_scenario(scenario, fixtures, token, threads=8, duration=10.0, max_requests=None, warmup=0.0, seed=0):
+    """
+    Drive ``scenario`` from ``threads`` clients for ``duration`` seconds (or
+    until ``max_requests``), after ``warmup`` seconds whose requests are not
+    counted. With one thread requests are sent from the calling thread.
+    """
+    samples = defaultdict(list)
+    lock = threading.Lock()
+    issued = [0]
+
+    def client_loop(index, deadline, record):
+        rng = random.Random(f'{seed}:{scenario.name}:{index}')
+        client = Client(raise_request_exception=False, HTTP_AUTHORIZATION=f'Bearer {token}')
+        next_operation = scenario.picker(rng, offset=index)
+        try:
+            while time.perf_counter() < deadline:
+                if record:
+                    with lock:
+                        if max_requests is not None and issued[0] >= max_requests:
+                            return
+                        issued[0] += 1
+                operation = next_operation()
+                result = operation.request(client, fixtures, rng)
+                if record:
+                    samples[operation.label].append(result)
+        finally:
+            if threading.current_thread() is not threading.main_thread():
+                connections.close_all()
+
+    def run(seconds, record):
+        deadline = time.perf_counter() + seconds
+        if threads == 1:
+            client_loop(0, deadline, record)
+            return
+        workers = [threading.Thread(target=client_loop, args=(i, deadline, record)) for i in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    # Measure the application, not the rate limiter
+    with mock.patch.object(SimpleRateThrottle, 'allow_request', lambda self, request, view: True):
+        if warmup:
+            run(warmup, record=False)
+        started = time.perf_counter()
+        run(duration, record=True)
+        elapsed = time.perf_counter() - started
+
+    return {
+        'description': scenario.description,
+        'total': summarize([sample for route in samples.values() for sample in route], elapsed),
+        'routes': {label: summarize(route, elapsed) for label, route in sorted(samples.items())},
+    }
+
+
+def compare(results, baseline, thresholds=None):
+    """
+    Regressions of ``results`` against ``baseline`` as readable strings;
+    scenarios and routes missing from either side are skipped
+    """
+    thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+    regressions = []
+
+    def check(where, current, previous):
+        if current['p95'] - previous['p95'] > max(MIN_LATENCY_DELTA_MS, previous['p95'] * thresholds['p95']):
+            regressions.append(f'{where}: p95 {previous["p95"]:.2f} -> {current["p95"]:.2f} ms')
+        if current['error_rate'] - previous['error_rate'] > thresholds['error_rate']:
+            regressions.append(f'{where}: error rate {previous["error_rate"]:.2%} -> {current["error_rate"]:.2%}')
+        if current['queries'] is not None and previous['queries'] is not None:
+            if current['queries'] - previous['queries'] > thresholds['queries']:
+                regressions.append(f'{where}: queries/request {previous["queries"]} -> {current["queries"]}')
+
+    for name, scenario in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if previous is None:
+            continue
+        total, previous_total = scenario['total'], previous['total']
+        if total['throughput'] < previous_total['throughput'] * (1 - thresholds['throughput']):
+            regressions.append(
+                f'{name}: throughput {previous_total["throughput"]} -> {total["throughput"]} req/s'
+            )
+        check(name, total, previous_total)
+        for label, route in scenario['routes'].items():
+            if label in previous['routes']:
+                check(f'{name} {label}', route, previous['routes'][label])
+    return regressions
@@ -1,2 +1,26 @@
-# cache.py
-# Content placeholder: CACHE_UTILS
+"""
+Cache utilities
+
+Cached payloads are keyed on a per-entity version number kept in the cache
+itself. Saving the entity bumps the version, so stale entries are never read
+again and simply expire.
+"""
+from django.core.cache import cache
+
+
+def version_key(namespace, identifier):
+    return f'version:{namespace}:{identifier}'
+
+
+def get_version(namespace, identifier):
+    """Current version of an entity (1 until it is first bumped)"""
+    return cache.get(version_key(namespace, identifier), 1)
+
+
+def bump_version(namespace, identifier):
+    """Invalidate everything cached under the entity's current version"""
+    key = version_key(namespace, identifier)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, timeout=None)
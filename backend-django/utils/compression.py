@@ -0,0 +1,167 @@
+"""
+Response compression
+
+``CompressionMiddleware`` compresses responses with Brotli or gzip,
+whichever the client prefers in ``Accept-Encoding`` (Brotli on ties, and
+only when the optional ``brotli`` package is installed). Skipped are:
+
+- bodies under ``COMPRESSION_MIN_BYTES``
+- responses that already have a ``Content-Encoding``: the precompressed
+  schema, and static files, which WhiteNoise serves precompressed
+- content types that are compressed already or must not be buffered:
+  archives, images and the ``text/event-stream`` live feed
+
+Streaming responses (bulk and export endpoints) are compressed chunk by
+chunk, each chunk flushed, so they keep streaming. Strong ETags are
+weakened, as the compressed body is a different byte sequence.
+"""
+import re
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip only
+    brotli = None
+
+
+# Content type prefixes never compressed
+SKIP_CONTENT_TYPES = (
+    'text/event-stream',
+    'image/',
+    'audio/',
+    'video/',
+    'application/gzip',
+    'application/x-gzip',
+    'application/zip',
+    'application/x-bzip2',
+    'application/zstd',
+)
+
+_CODING_RE = re.compile(r'^\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([\d.]+))?\s*$')
+
+
+def available_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate(accept_encoding):
+    """Preferred of ``available_encodings()`` for an ``Accept-Encoding`` header, or None"""
+    weights = {}
+    for coding in accept_encoding.split(','):
+        match = _CODING_RE.match(coding)
+        if match:
+            try:
+                weights[match.group(1).lower()] = float(match.group(2) or 1)
+            except ValueError:
+                continue
+    ranked = [
+        (weights.get(encoding, weights.get('*', 0)), -rank, encoding)
+        for rank, encoding in enumerate(available_encodings())
+    ]
+    weight, _, encoding = max(ranked)
+    return encoding if weight > 0 else None
+
+
+class Compressor:
+    """Incremental compressor for one response body"""
+
+    def __init__(self, encoding, level=None):
+        self.encoding = encoding
+        if encoding == 'br':
+            quality = settings.COMPRESSION_BROTLI_QUALITY if level is None else level
+            self.compressor = brotli.Compressor(quality=quality)
+        else:
+            level = settings.COMPRESSION_GZIP_LEVEL if level is None else level
+            self.compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data):
+        """Compressed ``data``, flushed so the client can decode it right away"""
+        if self.encoding == 'br':
+            return self.compressor.process(data) + self.compressor.flush()
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == 'br':
+            return self.compressor.finish()
+        return self.compressor.flush()
+
+    def compress(self, data):
+        """Whole body in one go"""
+        if self.encoding == 'br':
+            return self.compressor.process(data) + self.compressor.finish()
+        return self.compressor.compress(data) + self.compressor.flush()
+
+    def stream(self, chunks):
+        for data in chunks:
+            if data:
+                yield self.chunk(data)
+        yield self.finish()
+
+    async def astream(self, chunks):
+        async for data in chunks:
+            if data:
+                yield self.chunk(data)
+        yield self.finish()
+
+
+def compressible(response):
+    if response.status_code != 200 or response.has_header('Content-Encoding'):
+        return False
+    content_type = response.get('Content-Type', '').lower()
+    return not content_type.startswith(SKIP_CONTENT_TYPES)
+
+
+class CompressionMiddleware:
+    """Brotli/gzip response compression; see the module docstring"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_bytes = settings.COMPRESSION_MIN_BYTES
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process(request, await self.get_response(request))
+
+    def process(self, request, response):
+        if not compressible(response):
+            return response
+        if not response.streaming and len(response.content) < self.min_bytes:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate(request.headers.get('Accept-Encoding', ''))
+        if encoding is None:
+            return response
+
+        compressor = Compressor(encoding)
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = compressor.astream(response.streaming_content)
+            else:
+                response.streaming_content = compressor.stream(response.streaming_content)
+            del response['Content-Length']
+        else:
+            compressed = compressor.compress(response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = f'W/{etag}'
+        response['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,140 @@
+"""
+Conditional GET for model viewsets
+
+``ConditionalGetMixin`` validators are cheap and never need the body
+serialized:
+
+- detail: the row's ``etag_fields``, ``updated_at`` by default, which every
+  ``save()`` refreshes (the same saves that bump cache versions), plus the
+  ``updated_at`` of related rows the representation embeds. Conditional
+  requests read them with a primary key lookup before the action runs;
+  others take them from the row the action loaded.
+- list: the maximum of each over the filtered queryset and its row count,
+  in one aggregate the paginator reuses instead of counting again. Saves
+  and inserts raise the maximum and deletes change the count.
+
+Actions decorated with ``conditional_get`` answer ``If-None-Match`` and
+``If-Modified-Since`` with 304, and send ``ETag`` (and, for details,
+``Last-Modified``) otherwise. Lists get no ``Last-Modified``: a delete does
+not change their newest timestamp.
+
+The ETag also covers the query string and the negotiated format, which
+shape the body, and with ``etag_daily`` the date, for representations with
+date-relative fields. Writes bypassing ``save()`` must set ``updated_at``.
+
+Rows without an ``updated_at`` (the point ledger) list the columns they
+show as ``etag_fields`` instead, so the ETag changes with the row's
+content however it is written, and set ``last_modified = False``: nothing
+records when such a row last changed.
+"""
+import datetime
+import hashlib
+from functools import partial, wraps
+
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from utils.pagination import CountedPaginator
+
+
+CONDITIONAL_HEADERS = ('If-None-Match', 'If-Modified-Since')
+
+
+class ConditionalGetMixin:
+    """Validators for ``conditional_get`` actions"""
+    etag_fields = ('updated_at',)
+    etag_daily = False
+    last_modified = True
+
+    def list_validators(self):
+        """``(count, [latest value of each etag field])`` of the filtered queryset"""
+        queryset = self.filter_queryset(self.get_queryset())
+        totals = queryset.aggregate(
+            _count=Count('pk'), **{f'_latest_{i}': Max(field) for i, field in enumerate(self.etag_fields)}
+        )
+        return totals['_count'], [totals[f'_latest_{i}'] for i in range(len(self.etag_fields))]
+
+    def detail_validators(self):
+        """Etag field values of the requested row, or None when it does not exist"""
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        return self.get_queryset().filter(
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        ).values_list(*self.etag_fields).first()
+
+    def loaded_validators(self):
+        """Etag field values of the object the action fetched, or None if any was not loaded"""
+        values = []
+        for field in self.etag_fields:
+            *relations, name = field.split('__')
+            instance = getattr(self, 'conditional_object', None)
+            for relation in relations:
+                if instance is None or not instance._meta.get_field(relation).is_cached(instance):
+                    return None
+                instance = getattr(instance, relation)
+            if instance is None or name in instance.get_deferred_fields():
+                return None
+            values.append(getattr(instance, name))
+        return tuple(values)
+
+    def get_object(self):
+        self.conditional_object = super().get_object()
+        return self.conditional_object
+
+    def last_modified_of(self, values):
+        """``Last-Modified`` of a row with etag field ``values``, or None"""
+        if not self.last_modified:
+            return None
+        return max(filter(None, values), default=None)
+
+    def make_etag(self, values):
+        request = self.request
+        parts = [request.get_full_path(), request.accepted_renderer.format]
+        parts += [value.timestamp() if isinstance(value, datetime.datetime) else value for value in values]
+        if self.etag_daily:
+            parts.append(timezone.localdate())
+        return '"%s"' % hashlib.sha1(repr(parts).encode()).hexdigest()[:32]
+
+
+def set_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(int(last_modified.timestamp()))
+    return response
+
+
+def conditional_get(action):
+    """Answer conditional requests to ``action`` before it runs; see ``ConditionalGetMixin``"""
+
+    @wraps(action)
+    def wrapper(self, request, *args, **kwargs):
+        last_modified = None
+        if self.action == 'list':
+            count, latest = self.list_validators()
+            etag = self.make_etag([count, *latest])
+            if self.paginator is not None:
+                self.paginator.django_paginator_class = partial(CountedPaginator, count=count)
+        elif not any(header in request.headers for header in CONDITIONAL_HEADERS):
+            # Nothing to compare: read the validators off the row the action loads
+            response = action(self, request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            values = self.loaded_validators() or self.detail_validators()
+            return set_validators(response, self.make_etag(values), self.last_modified_of(values))
+        else:
+            values = self.detail_validators()
+            if values is None:
+                return action(self, request, *args, **kwargs)
+            etag = self.make_etag(values)
+            last_modified = self.last_modified_of(values)
+
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(request._request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = action(self, request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        return set_validators(response, etag, last_modified)
+
+    return wrapper
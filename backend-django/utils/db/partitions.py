@@ -0,0 +1,365 @@
+"""
+Monthly range partitioning of the transaction ledgers (PostgreSQL only)
+
+``point_transactions`` and ``redeem_transactions`` only grow, and almost
+every read is bounded by their date column, so each table is declaratively
+partitioned by month on it. Range filters on the partition key
+(``PointTransactionFilter.date_from``/``date_to`` and the redeem equivalents)
+let the planner prune partitions outside the requested window.
+
+Partitions are named ``<table>_pYYYY_MM`` and cover
+``[first of month, first of next month)`` in UTC; ``<table>_default``
+catches rows outside them until their month's partition is created. The
+primary key becomes ``(id, <date column>)``; ids still come from one
+sequence per table, so they stay unique.
+
+Converting an existing table is an operator step (``partition_transactions
+--convert``, see ``convert_table``) that copies rows in batches while the
+table stays in use. Upcoming partitions are created daily by the
+``maintenance.ensure_partitions`` task.
+"""
+import datetime
+import re
+
+from django.db import connections, transaction
+
+
+# table -> partition key column
+PARTITIONED_TABLES = {
+    'point_transactions': 'transaction_date',
+    'redeem_transactions': 'redeem_date',
+}
+
+PARTITION_NAME_RE = re.compile(r'_p(\d{4})_(\d{2})$')
+
+# "CREATE [UNIQUE] INDEX <name> ON <table> " of a pg_indexes definition
+INDEX_TARGET_RE = re.compile(r'^(CREATE (?:UNIQUE )?INDEX) \S+ ON (?:ONLY )?\S+ ')
+
+
+def month_start(value):
+    return datetime.date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    return f'{table}_p{month.year:04d}_{month.month:02d}'
+
+
+def is_partitioned(cursor, table):
+    cursor.execute(
+        'SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', [table]
+    )
+    return cursor.fetchone() is not None
+
+
+def table_exists(cursor, table):
+    cursor.execute('SELECT to_regclass(%s) IS NOT NULL', [table])
+    return cursor.fetchone()[0]
+
+
+def list_partitions(cursor, table):
+    """``{month: partition name}`` for the monthly partitions of ``table``"""
+    cursor.execute(
+        """
+        SELECT child.relname FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = to_regclass(%s)
+        """,
+        [table],
+    )
+    partitions = {}
+    for (name,) in cursor.fetchall():
+        match = PARTITION_NAME_RE.search(name)
+        if match:
+            partitions[datetime.date(int(match[1]), int(match[2]), 1)] = name
+    return partitions
+
+
+def default_partition_name(table):
+    return f'{table}_default'
+
+
+def create_partition(cursor, table, month, parent=None):
+    """
+    Create the partition of ``table`` (or of ``parent``) for ``month``
+    unless it exists; returns whether it was created
+
+    Rows the default partition caught for ``month`` move into the new
+    partition, so run it inside a transaction.
+    """
+    parent = parent or table
+    name = partition_name(table, month)
+    if table_exists(cursor, name):
+        return False
+    start, end = f'{month.isoformat()} 00:00:00+00', f'{add_months(month, 1).isoformat()} 00:00:00+00'
+    bounds = f"FOR VALUES FROM ('{start}') TO ('{end}')"
+    default = default_partition_name(table)
+    cursor.execute(
+        'SELECT 1 FROM pg_inherits WHERE inhparent = to_regclass(%s) AND inhrelid = to_regclass(%s)', [parent, default]
+    )
+    if cursor.fetchone() is None:
+        cursor.execute(f'CREATE TABLE "{name}" PARTITION OF "{parent}" {bounds}')
+        return True
+
+    # A new partition may not overlap rows in the default one
+    column = PARTITIONED_TABLES[table]
+    cursor.execute(f'CREATE TABLE "{name}" (LIKE "{parent}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+    cursor.execute(
+        f'WITH moved AS (DELETE FROM "{default}" WHERE "{column}" >= %s AND "{column}" < %s RETURNING *) '
+        f'INSERT INTO "{name}" SELECT * FROM moved',
+        [start, end],
+    )
+    cursor.execute(f'ALTER TABLE "{parent}" ATTACH PARTITION "{name}" {bounds}')
+    return True
+
+
+def create_default_partition(cursor, table, parent=None):
+    """Create the partition catching rows outside every monthly partition of ``table``"""
+    cursor.execute(f'CREATE TABLE IF NOT EXISTS "{default_partition_name(table)}" PARTITION OF "{parent or table}" DEFAULT')
+
+
+def ensure_partitions(table, months_ahead, using='default', today=None, since=None):
+    """
+    Create partitions of ``table`` from the current month (or the month of
+    ``since``) to ``months_ahead`` months ahead, and its default partition;
+    returns the names created
+    """
+    current = month_start(today or datetime.datetime.now(datetime.timezone.utc))
+    month = min(month_start(since), current) if since else current
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        create_default_partition(cursor, table)
+        created = []
+        while month <= add_months(current, months_ahead):
+            if create_partition(cursor, table, month):
+                created.append(partition_name(table, month))
+            month = add_months(month, 1)
+    return created
+
+
+def shadow_name(table):
+    return f'{table}_partitioned'
+
+
+def legacy_name(table):
+    return f'{table}_unpartitioned'
+
+
+def table_definition(cursor, table):
+    """``(primary key name, [(index name, definition)], [(foreign key name, definition)])`` of ``table``"""
+    cursor.execute(
+        "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'p'", [table]
+    )
+    (primary_key,) = cursor.fetchone()
+    cursor.execute(
+        'SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s AND indexname <> %s',
+        [table, primary_key],
+    )
+    indexes = cursor.fetchall()
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+        [table],
+    )
+    return primary_key, indexes, cursor.fetchall()
+
+
+def prepare_conversion(table, months_ahead, using='default', today=None):
+    """
+    First step of converting ``table`` into a table partitioned by month
+
+    Creates an empty partitioned copy, ``<table>_partitioned``, with its
+    monthly and default partitions, indexes and foreign keys, and a trigger
+    mirroring every later write to ``table`` into it. Only brief locks are
+    taken, so the application keeps writing. Returns False if ``table`` is
+    already partitioned; an existing copy is reused.
+    """
+    shadow = shadow_name(table)
+    column = PARTITIONED_TABLES[table]
+    current = month_start(today or datetime.datetime.now(datetime.timezone.utc))
+
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        if is_partitioned(cursor, table):
+            return False
+        if table_exists(cursor, shadow):
+            return True
+        primary_key, indexes, foreign_keys = table_definition(cursor, table)
+        cursor.execute(f'SELECT MIN("{column}"), MAX("{column}") FROM "{table}"')
+        oldest, newest = cursor.fetchone()
+
+        cursor.execute(
+            f'CREATE TABLE "{shadow}" (LIKE "{table}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            f'PARTITION BY RANGE ("{column}")'
+        )
+        # Index and constraint names are unique per schema; the copy's are
+        # suffixed until the swap
+        cursor.execute(f'ALTER TABLE "{shadow}" ADD CONSTRAINT "{primary_key}_partitioned" PRIMARY KEY (id, "{column}")')
+        for name, definition in indexes:
+            cursor.execute(INDEX_TARGET_RE.sub(rf'\1 "{name}_partitioned" ON "{shadow}" ', definition, count=1))
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE "{shadow}" ADD CONSTRAINT "{name}_partitioned" {definition}')
+
+        month = month_start(oldest) if oldest else current
+        last = max(add_months(current, months_ahead), month_start(newest) if newest else current)
+        while month <= last:
+            create_partition(cursor, table, month, parent=shadow)
+            month = add_months(month, 1)
+        create_default_partition(cursor, table, parent=shadow)
+
+        cursor.execute(
+            f"""
+            CREATE FUNCTION "{table}_mirror"() RETURNS trigger LANGUAGE plpgsql AS $$
+            BEGIN
+                IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                    DELETE FROM "{shadow}" WHERE id = OLD.id AND "{column}" = OLD."{column}";
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    INSERT INTO "{shadow}" VALUES (NEW.*);
+                END IF;
+                RETURN NULL;
+            END
+            $$
+            """
+        )
+        cursor.execute(
+            f'CREATE TRIGGER "{table}_mirror" AFTER INSERT OR UPDATE OR DELETE ON "{table}" '
+            f'FOR EACH ROW EXECUTE FUNCTION "{table}_mirror"()'
+        )
+    return True
+
+
+def id_range(table, using='default'):
+    """``(lowest id, highest id)`` of ``table``, ``(None, None)`` when empty"""
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'SELECT MIN(id), MAX(id) FROM "{table}"')
+        return cursor.fetchone()
+
+
+def copy_batch(table, first, last, using='default'):
+    """
+    Copy rows of ``table`` with ids from ``first`` to ``last`` into its
+    partitioned copy, in a transaction of their own; returns how many
+
+    The rows are share-locked, so a concurrent update or delete either
+    lands before the copy (and the copy sees it) or after (and the mirror
+    trigger replays it). Rows already mirrored are skipped.
+    """
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO "{shadow_name(table)}" SELECT * FROM "{table}" WHERE id BETWEEN %s AND %s FOR SHARE '
+            f'ON CONFLICT DO NOTHING',
+            [first, last],
+        )
+        return cursor.rowcount
+
+
+def swap_tables(table, using='default'):
+    """
+    Last step of the conversion: put the partitioned copy in place of
+    ``table``, which is kept as ``<table>_unpartitioned``
+
+    The exclusive lock is held only for renames; the copy is already
+    complete. Ids continue from a sequence owned by the new table's column,
+    as identity columns are not supported on partitioned tables before
+    PostgreSQL 17.
+    """
+    shadow, legacy = shadow_name(table), legacy_name(table)
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        # Within an outer transaction, deferred foreign key checks of the
+        # copied rows would still be pending, and ALTER TABLE refuses that
+        connections[using].check_constraints()
+        cursor.execute(f'LOCK TABLE "{table}" IN ACCESS EXCLUSIVE MODE')
+        primary_key, indexes, foreign_keys = table_definition(cursor, table)
+        cursor.execute(f'DROP TRIGGER "{table}_mirror" ON "{table}"')
+        cursor.execute(f'DROP FUNCTION "{table}_mirror"()')
+
+        cursor.execute(f'ALTER TABLE "{table}" RENAME TO "{legacy}"')
+        for name in [primary_key, *(name for name, _ in indexes)]:
+            cursor.execute(f'ALTER INDEX "{name}" RENAME TO "{name}_unpartitioned"')
+            cursor.execute(f'ALTER INDEX "{name}_partitioned" RENAME TO "{name}"')
+        for name, _ in foreign_keys:
+            cursor.execute(f'ALTER TABLE "{legacy}" RENAME CONSTRAINT "{name}" TO "{name}_unpartitioned"')
+            cursor.execute(f'ALTER TABLE "{shadow}" RENAME CONSTRAINT "{name}_partitioned" TO "{name}"')
+        cursor.execute(f'ALTER TABLE "{shadow}" RENAME TO "{table}"')
+
+        cursor.execute(f'SELECT COALESCE(MAX(id), 0) FROM "{table}"')
+        (max_id,) = cursor.fetchone()
+        cursor.execute(f'CREATE SEQUENCE "{table}_id_part_seq" OWNED BY "{table}".id')
+        cursor.execute('SELECT setval(%s, %s, %s)', [f'{table}_id_part_seq', max(max_id, 1), max_id > 0])
+        cursor.execute(f'ALTER TABLE "{table}" ALTER COLUMN id SET DEFAULT nextval(\'"{table}_id_part_seq"\')')
+
+
+def convert_table(table, months_ahead, batch_size=10000, using='default', progress=None):
+    """
+    Convert ``table`` into a table partitioned by month while it stays in
+    use: prepare the partitioned copy, copy existing rows ``batch_size``
+    ids at a time, then swap. ``progress(copied, last id)`` is called after
+    each batch. Safe to rerun after an interruption. Returns False if
+    ``table`` was already partitioned.
+    """
+    if not prepare_conversion(table, months_ahead, using=using):
+        return False
+    first, last = id_range(table, using=using)
+    copied = 0
+    if first is not None:
+        for start in range(first, last + 1, batch_size):
+            copied += copy_batch(table, start, min(start + batch_size - 1, last), using=using)
+            if progress:
+                progress(copied, last)
+    swap_tables(table, using=using)
+    return True
+
+
+def archivable_partitions(table, retention_months, using='default', today=None):
+    """Partitions of ``table`` entirely older than ``retention_months`` months, oldest first"""
+    cutoff = add_months(month_start(today or datetime.datetime.now(datetime.timezone.utc)), -retention_months)
+    with connections[using].cursor() as cursor:
+        partitions = list_partitions(cursor, table)
+    return [name for month, name in sorted(partitions.items()) if month < cutoff]
+
+
+def lock_table(table, mode, using='default'):
+    """Lock ``table`` in ``mode`` until the transaction ends"""
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'LOCK TABLE "{table}" IN {mode} MODE')
+
+
+def detach_partition(table, partition, using='default'):
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'ALTER TABLE "{table}" DETACH PARTITION "{partition}"')
+
+
+def dump_table(table, stream, using='default'):
+    """Write ``table`` to ``stream`` as CSV with a header row"""
+    with connections[using].cursor() as cursor:
+        with cursor.copy(f'COPY "{table}" TO STDOUT WITH (FORMAT csv, HEADER)') as copy:
+            for data in copy:
+                stream.write(data)
+
+
+def drop_table(table, using='default'):
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DROP TABLE "{table}"')
+
+
+def partition_ledgers(months_ahead, using='default'):
+    """
+    Create the upcoming partitions of each partitioned table in
+    ``PARTITIONED_TABLES``. Returns ``{table: partitions created}``, or
+    ``None`` for a table not yet converted (see ``convert_table``); a no-op
+    off PostgreSQL.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return {}
+
+    results = {}
+    for table in PARTITIONED_TABLES:
+        with connection.cursor() as cursor:
+            if not table_exists(cursor, table):
+                continue
+            partitioned = is_partitioned(cursor, table)
+        results[table] = ensure_partitions(table, months_ahead, using=using) if partitioned else None
+    return results
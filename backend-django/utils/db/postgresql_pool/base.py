@@ -0,0 +1,71 @@
+"""
+PostgreSQL backend drawing connections from a psycopg 3 pool
+
+Enabled by ``ENGINE = 'utils.db.postgresql_pool'`` with pool arguments in
+``OPTIONS['pool']`` (``min_size``, ``max_size``, ``timeout``). Django opens
+and closes connections as usual; here opening borrows one from the
+per-process pool for the alias and closing returns it, so ``CONN_MAX_AGE``
+must be 0. Pool occupancy is exported through ``utils.metrics``.
+"""
+import threading
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel, is_psycopg3
+
+from utils.metrics import record_pool
+
+if not is_psycopg3:
+    raise ImproperlyConfigured('The pooled PostgreSQL backend requires psycopg 3')
+
+from psycopg_pool import ConnectionPool  # noqa: E402
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    @property
+    def pool(self):
+        pool = _pools.get(self.alias)
+        if pool is None:
+            with _pools_lock:
+                pool = _pools.get(self.alias)
+                if pool is None:
+                    if self.settings_dict['CONN_MAX_AGE']:
+                        raise ImproperlyConfigured('Pooled connections require CONN_MAX_AGE = 0')
+                    pool = ConnectionPool(
+                        kwargs=self.get_connection_params(),
+                        name=self.alias,
+                        open=False,
+                        check=ConnectionPool.check_connection,
+                        **self.settings_dict['OPTIONS'].get('pool', {}),
+                    )
+                    pool.open()
+                    _pools[self.alias] = pool
+        return pool
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pool', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        options = self.settings_dict['OPTIONS']
+        self.isolation_level = IsolationLevel(options.get('isolation_level', IsolationLevel.READ_COMMITTED))
+
+        connection = self.pool.getconn()
+        if 'isolation_level' in options:
+            connection.isolation_level = self.isolation_level
+        record_pool(self.alias, self.pool)
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.putconn(self.connection)
+            # Returned to the pool, so it must not be used even inside an atomic block
+            self.connection = None
+            record_pool(self.alias, self.pool)
@@ -0,0 +1,123 @@
+"""
+Read-replica routing
+
+Views opt in with ``ReplicaReadMixin``: safe requests for their
+``replica_actions`` read from a randomly chosen alias in
+``DATABASE_REPLICAS``. Everything else, including every write and any read
+inside a transaction on the primary, goes to ``default``.
+
+Read-your-writes: a successful unsafe request marks its user sticky for
+``DB_REPLICA_STICKY_SECONDS``, and reads for a sticky user stay on the
+primary until replicas have caught up.
+"""
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+from utils.metrics import DB_READ_ROUTING
+
+
+# Alias reads of the current request are routed to (None: primary)
+_read_alias = ContextVar('read_alias', default=None)
+
+
+def sticky_key(user_id):
+    return f'db-sticky:{user_id}'
+
+
+def mark_sticky(user_id):
+    """Keep ``user_id``'s reads on the primary for the stickiness window"""
+    cache.set(sticky_key(user_id), 1, settings.DB_REPLICA_STICKY_SECONDS)
+
+
+def is_sticky(user_id):
+    return cache.get(sticky_key(user_id)) is not None
+
+
+class ReplicaRouter:
+    """Sends reads to the replica chosen for the request, writes to the primary"""
+
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        # Explicit, otherwise instances read from a replica are saved back to it
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Scopes replica routing to one request and records writes for stickiness
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _read_alias.set(None)
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_alias.reset(token)
+        self.record_write(request, response)
+        return response
+
+    async def __acall__(self, request):
+        token = _read_alias.set(None)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _read_alias.reset(token)
+        self.record_write(request, response)
+        return response
+
+    @staticmethod
+    def record_write(request, response):
+        if not settings.DATABASE_REPLICAS or request.method in SAFE_METHODS or response.status_code >= 400:
+            return
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            mark_sticky(user.pk)
+
+
+class ReplicaReadMixin:
+    """
+    Route safe reads of ``replica_actions`` to a replica
+
+    ``replica_actions`` holds viewset action names, or lower-case HTTP
+    methods for plain API views.
+    """
+
+    replica_actions = ('list', 'retrieve')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if settings.DATABASE_REPLICAS and self.reads_from_replica(request):
+            if request.user.is_authenticated and is_sticky(request.user.pk):
+                DB_READ_ROUTING.labels('sticky').inc()
+            else:
+                _read_alias.set(random.choice(settings.DATABASE_REPLICAS))
+                DB_READ_ROUTING.labels('replica').inc()
+
+    def reads_from_replica(self, request):
+        action = getattr(self, 'action', None) or request.method.lower()
+        return request.method in SAFE_METHODS and action in self.replica_actions
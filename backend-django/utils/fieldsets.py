@@ -0,0 +1,131 @@
+"""
+Sparse fieldsets (``?fields=``) and embedded expansion (``?expand=``)
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+
+def parse_fieldset(value):
+    """Split a comma-separated query parameter into a sorted tuple of names"""
+    return tuple(sorted({name.strip() for name in value.split(',') if name.strip()}))
+
+
+def narrow_queryset(queryset, serializer, fields, relations, extra=()):
+    """
+    Restrict ``queryset`` to the columns and joins that ``fields`` of
+    ``serializer`` read, plus the expanded ``relations`` and ``extra``
+    lookups (such as ``member__updated_at``)
+    """
+    model = queryset.model
+    # Expanded relations load whole rows; naming one of their columns would narrow them
+    extra = [lookup for lookup in extra if lookup.split('__')[0] not in relations]
+    only = {model._meta.pk.name, *relations, *extra}
+    joins = set(relations) | {lookup.rsplit('__', 1)[0] for lookup in extra if '__' in lookup}
+    full_row = fields is None
+
+    for name in serializer.fields if fields is None else fields:
+        parts = serializer.fields[name].source.split('.')
+        try:
+            model._meta.get_field(parts[0])
+        except FieldDoesNotExist:
+            # Model property: the columns it reads are unknown, keep the whole row
+            full_row = True
+            continue
+
+        if len(parts) > 1:
+            joins.add(parts[0])
+        only.add('__'.join(parts))
+
+    queryset = queryset.select_related(None)
+    if joins:
+        queryset = queryset.select_related(*sorted(joins))
+    if not full_row:
+        queryset = queryset.only(*sorted(only))
+    return queryset
+
+
+class SparseFieldsetMixin:
+    """
+    ``?fields=`` and ``?expand=`` support for model viewsets
+
+    List actions render through ``list_projection_class``; when ``fields``
+    asks for anything outside it, ``projection_class`` (mirroring the detail
+    serializer) is narrowed instead. Other read actions drop unrequested
+    serializer fields, ``.only()`` the matching columns and join related
+    tables only when a related field, an expansion or one of the viewset's
+    ``etag_fields`` needs them.
+    """
+    list_projection_class = None
+    projection_class = None
+
+    def sparse_fieldsets_enabled(self):
+        request = getattr(self, 'request', None)
+        return (
+            request is not None
+            and request.method in SAFE_METHODS
+            and not getattr(self, 'swagger_fake_view', False)
+        )
+
+    def get_fieldset(self):
+        """Return validated ``(fields, expand)`` from the query string"""
+        params = self.request.query_params
+        fields = parse_fieldset(params['fields']) if 'fields' in params else None
+        expand = parse_fieldset(params.get('expand', ''))
+
+        if fields is not None:
+            allowed = self.projection_class.build().field_names
+            if self.action == 'list' and set(fields) <= set(self.list_projection_class.build().field_names):
+                allowed = self.list_projection_class.build().field_names
+            unknown = [name for name in fields if name not in allowed]
+            if unknown:
+                raise ValidationError({'fields': f"Unknown field(s): {', '.join(unknown)}"})
+
+        unknown = [name for name in expand if name not in self.projection_class.expandable_fields]
+        if unknown:
+            raise ValidationError({'expand': f"Cannot expand: {', '.join(unknown)}"})
+
+        return fields, expand
+
+    def get_list_projection(self):
+        """Projection used to render the list action"""
+        if not self.sparse_fieldsets_enabled():
+            return self.list_projection_class.build()
+
+        fields, expand = self.get_fieldset()
+        projection_class = self.list_projection_class
+        if fields is not None and not set(fields) <= set(projection_class.build().field_names):
+            projection_class = self.projection_class
+        return projection_class.build(fields, expand)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list' or not self.sparse_fieldsets_enabled():
+            return queryset
+
+        fields, expand = self.get_fieldset()
+        if fields is None and not expand:
+            return queryset
+
+        relations = [self.projection_class.expandable_fields[name][0] for name in expand]
+        # Conditional GET reads its validators off the loaded row
+        extra = getattr(self, 'etag_fields', ())
+        return narrow_queryset(queryset, self.get_serializer_class()(), fields, relations, extra)
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if self.action == 'list' or not self.sparse_fieldsets_enabled():
+            return serializer
+
+        fields, expand = self.get_fieldset()
+        target = getattr(serializer, 'child', serializer)
+        if fields is not None:
+            for name in list(target.fields):
+                if name not in fields:
+                    target.fields.pop(name)
+
+        for name in expand:
+            relation, projection_class = self.projection_class.expandable_fields[name]
+            kwargs = {} if relation == name else {'source': relation}
+            target.fields[name] = projection_class.serializer_class(read_only=True, **kwargs)
+        return serializer
@@ -0,0 +1,100 @@
+"""
+Non-blocking logging
+
+Loggers hand records to ``QueueingHandler``, which only puts them on a
+bounded in-process queue. A ``QueueListener`` thread per process formats
+them and passes them to the handlers of the ``sink`` logger (JSON to stdout
+and, with ``LOG_FILE``, to a file all processes append to), so neither
+formatting nor disk stalls happen on request threads. When the queue is
+full records are dropped and counted in ``crm_log_records_dropped_total``.
+"""
+import logging
+import os
+import queue
+import random
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+from pythonjsonlogger import jsonlogger
+
+
+class QueueingHandler(QueueHandler):
+    """
+    Enqueue records for the listener thread, which hands them to the
+    handlers of the ``sink`` logger
+    """
+
+    def __init__(self, sink, queue_size=10000):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.sink = sink
+        self.listener = None
+        self.pid = None
+        self.start_lock = threading.Lock()
+
+    def start(self):
+        with self.start_lock:
+            # Forked workers inherit the queue but not the listener thread
+            if self.pid == os.getpid():
+                return
+            self.queue = queue.Queue(maxsize=self.queue.maxsize)
+            self.listener = QueueListener(
+                self.queue, *logging.getLogger(self.sink).handlers, respect_handler_level=True
+            )
+            self.listener.start()
+            self.pid = os.getpid()
+
+    def prepare(self, record):
+        # Only what cannot wait: the message is rendered now because its
+        # arguments may change, and the traceback because it will be gone.
+        # Formatting is left to the listener's handlers.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            from utils.metrics import LOG_RECORDS_DROPPED
+
+            LOG_RECORDS_DROPPED.labels(record.levelname).inc()
+
+    def emit(self, record):
+        if self.pid != os.getpid():
+            self.start()
+        super().emit(record)
+
+    def close(self):
+        # Called by logging.shutdown() at exit: write out what is queued
+        with self.start_lock:
+            if self.pid == os.getpid():
+                self.listener.stop()
+                self.pid = None
+        super().close()
+
+
+class JsonFormatter(jsonlogger.JsonFormatter):
+    """
+    JSON lines with a record's ``extra`` fields, except ``request``: its repr
+    includes the query string, which may hold an access token
+    (``/api/live/?token=``)
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('reserved_attrs', (*jsonlogger.RESERVED_ATTRS, 'request'))
+        super().__init__(*args, **kwargs)
+
+
+class SampleFilter(logging.Filter):
+    """Pass ``rate`` of records below ``always_level``, and every record at or above it"""
+
+    def __init__(self, rate, always_level=logging.WARNING):
+        super().__init__()
+        self.rate = rate
+        self.always_level = always_level if isinstance(always_level, int) else logging.getLevelName(always_level)
+
+    def filter(self, record):
+        return record.levelno >= self.always_level or random.random() < self.rate
@@ -0,0 +1,227 @@
+"""
+Prometheus metrics
+
+Metrics are recorded in-process with ``prometheus_client``. When
+``PROMETHEUS_MULTIPROC_DIR`` is set (the production image sets it) every
+gunicorn worker writes its values to mmapped files in that directory and
+``/metrics`` aggregates them, so a scrape sees the totals of all workers
+regardless of which one serves it. The variable must be set before this
+module is imported; ``gunicorn.conf.py`` clears the directory on start and
+marks exited workers as dead.
+
+``/metrics`` reveals traffic, error and throttle counts per route, so it
+answers only scrapers connecting from ``METRICS_ALLOWED_NETWORKS`` or
+sending ``Authorization: Bearer <METRICS_TOKEN>``.
+"""
+import hmac
+import ipaddress
+import logging
+import os
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+
+if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+    # Management commands run outside gunicorn, which creates it otherwise
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+
+REQUEST_LATENCY = Histogram(
+    'crm_http_request_duration_seconds',
+    'Request latency by route and method',
+    ['route', 'method'],
+)
+REQUESTS = Counter(
+    'crm_http_requests_total',
+    'Requests by route, method and status code',
+    ['route', 'method', 'status'],
+)
+DB_QUERIES = Histogram(
+    'crm_db_queries_per_request',
+    'Database queries per request',
+    ['route'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, float('inf')),
+)
+DB_DURATION = Histogram(
+    'crm_db_duration_seconds',
+    'Database time per request',
+    ['route'],
+    buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, float('inf')),
+)
+DB_READ_ROUTING = Counter(
+    'crm_db_read_routing_total',
+    'Replica-eligible requests by where their reads went (replica, or primary while sticky)',
+    ['target'],
+)
+DB_POOL_SIZE = Gauge(
+    'crm_db_pool_size',
+    'Open connections in the pool',
+    ['alias'],
+    multiprocess_mode='livesum',
+)
+DB_POOL_AVAILABLE = Gauge(
+    'crm_db_pool_available',
+    'Idle connections in the pool',
+    ['alias'],
+    multiprocess_mode='livesum',
+)
+DB_POOL_WAITING = Gauge(
+    'crm_db_pool_waiting',
+    'Requests waiting for a pooled connection',
+    ['alias'],
+    multiprocess_mode='livesum',
+)
+CACHE_REQUESTS = Counter(
+    'crm_cache_requests_total',
+    'Cache lookups by cache and result (hit or miss)',
+    ['cache', 'result'],
+)
+THROTTLED = Counter(
+    'crm_throttled_requests_total',
+    'Requests rejected by throttling',
+    ['route'],
+)
+POINT_POSTINGS = Counter(
+    'crm_point_postings_total',
+    'Point transactions posted to member ledgers',
+    ['transaction_type'],
+)
+POINTS_POSTED = Counter(
+    'crm_points_posted_total',
+    'Absolute points moved by posted point transactions',
+    ['transaction_type'],
+)
+REDEMPTIONS = Counter(
+    'crm_redemptions_total',
+    'Voucher redemptions created',
+    ['status'],
+)
+AUDIT_RECORDS = Counter(
+    'crm_audit_records_total',
+    'Audit records by outcome (queued, inline when the queue was full, written, failed)',
+    ['outcome'],
+)
+LOG_RECORDS_DROPPED = Counter(
+    'crm_log_records_dropped_total',
+    'Log records dropped because the logging queue was full (utils.logqueue)',
+    ['level'],
+)
+
+UNMATCHED_ROUTE = '<unmatched>'
+
+# Sampled by the SampleFilter configured in LOGGING
+access_logger = logging.getLogger('crm.access')
+
+
+def route_label(request):
+    """Low-cardinality route name: the URL name, else the route pattern"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNMATCHED_ROUTE
+    return match.view_name or match.route
+
+
+def record_pool(alias, pool):
+    """Export occupancy of a psycopg ``ConnectionPool``"""
+    stats = pool.get_stats()
+    DB_POOL_SIZE.labels(alias).set(stats.get('pool_size', 0))
+    DB_POOL_AVAILABLE.labels(alias).set(stats.get('pool_available', 0))
+    DB_POOL_WAITING.labels(alias).set(stats.get('requests_waiting', 0))
+
+
+def record_cache(cache_name, hit):
+    CACHE_REQUESTS.labels(cache_name, 'hit' if hit else 'miss').inc()
+
+
+class MetricsMiddleware:
+    """
+    Request latency, status and per-request database figures, and the
+    access log: server errors are logged at ERROR, requests slower than
+    ``ACCESS_LOG_SLOW_SECONDS`` at WARNING, the rest at INFO
+
+    Must sit directly above ``QueryBudgetMiddleware``, whose query counter it
+    reads from the request.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        return self.record(request, response, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        return self.record(request, response, time.perf_counter() - start)
+
+    def record(self, request, response, duration):
+        route = route_label(request)
+        REQUEST_LATENCY.labels(route, request.method).observe(duration)
+        REQUESTS.labels(route, request.method, response.status_code).inc()
+
+        counter = getattr(request, 'query_counter', None)
+        if counter is not None:
+            DB_QUERIES.labels(route).observe(counter.count)
+            DB_DURATION.labels(route).observe(counter.duration)
+
+        if response.status_code >= 500:
+            level = logging.ERROR
+        elif duration >= settings.ACCESS_LOG_SLOW_SECONDS:
+            level = logging.WARNING
+        else:
+            level = logging.INFO
+        access_logger.log(
+            level, '%s %s %s %.1fms', request.method, request.path, response.status_code, duration * 1000,
+            extra={'route': route, 'status_code': response.status_code, 'duration_ms': round(duration * 1000, 1)},
+        )
+        return response
+
+
+def scrape_allowed(request):
+    """Whether ``request`` comes from an allowed network or carries the metrics token"""
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        address = None
+    if address is not None and any(
+        address in ipaddress.ip_network(network, strict=False) for network in settings.METRICS_ALLOWED_NETWORKS
+    ):
+        return True
+    scheme, _, token = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    return bool(settings.METRICS_TOKEN) and scheme.lower() == 'bearer' and hmac.compare_digest(
+        token.encode(), settings.METRICS_TOKEN.encode()
+    )
+
+
+def metrics_view(request):
+    """Prometheus text exposition of all metrics"""
+    if not scrape_allowed(request):
+        return HttpResponseForbidden()
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -1,2 +1,12 @@
-# permissions.py
-# Content placeholder: PERMISSIONS
+"""
+Custom DRF permissions
+"""
+from rest_framework.permissions import BasePermission
+
+
+class IsAdmin(BasePermission):
+    """Users with the admin role, and superusers"""
+
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(user and user.is_authenticated and (user.is_superuser or user.is_admin))
@@ -0,0 +1,257 @@
+"""
+On-demand profiling of running workers
+
+Two tools, both off until asked for:
+
+- A sampling profiler: a thread that reads every other thread's stack with
+  ``sys._current_frames()`` each ``PROFILER_INTERVAL`` seconds for a fixed
+  time, then writes the stacks to ``PROFILE_DIR`` in collapsed-stack format
+  (``root;caller;callee count``, the input of flamegraph.pl and speedscope).
+  The root frame of each stack is the view the thread was serving, so the
+  flame graph splits by view; other threads are rooted at their thread
+  name. Start it with ``POST /api/profiles/`` (admins; runs on the worker
+  that serves the request) or ``kill -USR2 <worker pid>`` (see
+  gunicorn.conf.py), and read the results from ``GET /api/profiles/``.
+- ``?__profile=1`` on any request with the JWT of a Django staff user
+  (``is_staff``) runs the request under cProfile and returns the stats as
+  text instead of the response. Other requests run unprofiled.
+
+``ProfilingMiddleware`` records which view each thread is serving and
+handles ``?__profile``. Under ASGI only the sampler is available and
+requests are not attributed to views.
+"""
+import cProfile
+import io
+import os
+import pstats
+import re
+import signal
+import socket
+import sys
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils import timezone
+from rest_framework import serializers, status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from utils.metrics import route_label
+from utils.permissions import IsAdmin
+
+
+PROFILE_PARAM = '__profile'
+PROFILE_NAME_RE = re.compile(r'[\w.-]+\.folded')
+
+# Thread ident -> view being served, read by the sampler
+_active_views = {}
+
+_lock = threading.Lock()
+_running = None
+
+
+@lru_cache(maxsize=None)
+def short_path(filename):
+    """``filename`` relative to the longest ``sys.path`` entry containing it"""
+    roots = [path for path in sys.path if path and filename.startswith(path.rstrip(os.sep) + os.sep)]
+    return os.path.relpath(filename, max(roots, key=len)) if roots else filename
+
+
+def collapse(frame):
+    """Frames of a stack, outermost first"""
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(f'{code.co_name} ({short_path(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+
+class SamplingProfiler:
+    """Samples the stacks of all other threads of this process for ``seconds``"""
+
+    def __init__(self, seconds, interval=None):
+        self.seconds = seconds
+        self.interval = interval or settings.PROFILER_INTERVAL
+        self.started_at = timezone.now()
+        self.name = f'{socket.gethostname()}-{os.getpid()}-{self.started_at:%Y%m%dT%H%M%S}.folded'
+        self.path = os.path.join(settings.PROFILE_DIR, self.name)
+        self.stacks = Counter()
+        self.samples = 0
+        self.thread = threading.Thread(target=self.run, name='sampling-profiler', daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def run(self):
+        global _running
+        own = threading.get_ident()
+        deadline = time.monotonic() + self.seconds
+        try:
+            while time.monotonic() < deadline:
+                self.sample(own)
+                time.sleep(self.interval)
+            self.write()
+        finally:
+            with _lock:
+                _running = None
+
+    def sample(self, own):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident != own:
+                root = _active_views.get(ident) or names.get(ident, f'thread-{ident}')
+                self.stacks[';'.join([root] + collapse(frame))] += 1
+        self.samples += 1
+
+    def write(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Renamed into place, so listings never show a partial profile
+        partial = f'{self.path}.partial'
+        with open(partial, 'w') as stream:
+            for stack, count in self.stacks.most_common():
+                stream.write(f'{stack} {count}\n')
+        os.replace(partial, self.path)
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'pid': os.getpid(),
+            'started_at': self.started_at,
+            'seconds': self.seconds,
+            'interval': self.interval,
+        }
+
+
+def start_profile(seconds):
+    """Start sampling this process; returns ``(profiler, started)``, the running one if busy"""
+    global _running
+    with _lock:
+        if _running is not None:
+            return _running, False
+        _running = SamplingProfiler(min(seconds, settings.PROFILER_MAX_SECONDS)).start()
+        return _running, True
+
+
+def install_signal_handler(signum=signal.SIGUSR2):
+    """Sample for ``PROFILER_SIGNAL_SECONDS`` whenever this process receives ``signum``"""
+    signal.signal(signum, lambda *args: start_profile(settings.PROFILER_SIGNAL_SECONDS))
+
+
+def profile_request(get_response, request):
+    """Response of ``request`` and the cProfile stats of producing it, as text"""
+    profiler = cProfile.Profile()
+    response = profiler.runcall(get_response, request)
+    stream = io.StringIO()
+    stream.write(f'{request.method} {request.get_full_path()} -> {response.status_code} ({route_label(request)})\n')
+    pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(settings.REQUEST_PROFILE_LINES)
+    return response, stream.getvalue()
+
+
+def is_staff_request(request):
+    """
+    Whether ``request`` carries the JWT of an active staff user; checked
+    ahead of the view so nobody else can have a request profiled
+    """
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return result is not None and result[0].is_staff
+
+
+class ProfilingMiddleware:
+    """
+    Records the view each thread is serving for the sampler and answers
+    ``?__profile=1`` from staff users with cProfile stats
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.get_response(request)
+        ident = threading.get_ident()
+        try:
+            if PROFILE_PARAM not in request.GET or not is_staff_request(request):
+                return self.get_response(request)
+            response, stats = profile_request(self.get_response, request)
+            return HttpResponse(stats, content_type='text/plain; charset=utf-8')
+        finally:
+            _active_views.pop(ident, None)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not iscoroutinefunction(self):
+            _active_views[threading.get_ident()] = route_label(request)
+
+
+def finished_profiles():
+    """Profiles written to ``PROFILE_DIR``, newest first"""
+    try:
+        entries = [entry for entry in os.scandir(settings.PROFILE_DIR) if PROFILE_NAME_RE.fullmatch(entry.name)]
+    except FileNotFoundError:
+        return []
+    entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    return [{'name': entry.name, 'size': entry.stat().st_size} for entry in entries]
+
+
+class ProfileStartSerializer(serializers.Serializer):
+    seconds = serializers.IntegerField(min_value=1, default=30)
+
+
+class ProfileView(APIView):
+    """
+    Sampling profiles of the workers
+
+    GET lists finished profiles; POST starts sampling the worker serving
+    the request (202), or returns the run already in progress there (200).
+    """
+    permission_classes = [IsAdmin]
+    serializer_class = ProfileStartSerializer
+
+    def get(self, request):
+        return Response({'success': True, 'data': finished_profiles()})
+
+    def post(self, request):
+        serializer = ProfileStartSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        profiler, started = start_profile(serializer.validated_data['seconds'])
+        return Response({
+            'success': True,
+            'message': 'Profiling started' if started else 'Profiling already in progress',
+            'data': profiler.as_dict(),
+        }, status=status.HTTP_202_ACCEPTED if started else status.HTTP_200_OK)
+
+
+class ProfileDetailView(APIView):
+    """
+    Collapsed stacks of a finished profile; ``?view=<route name>`` keeps
+    only the stacks of that view
+    """
+    permission_classes = [IsAdmin]
+
+    def get(self, request, filename):
+        if not PROFILE_NAME_RE.fullmatch(filename):
+            raise Http404
+        path = os.path.join(settings.PROFILE_DIR, filename)
+        if not os.path.exists(path):
+            raise Http404
+        view = request.query_params.get('view')
+        with open(path) as stream:
+            lines = [line for line in stream if not view or line.startswith(f'{view};')]
+        return HttpResponse(''.join(lines), content_type='text/plain; charset=utf-8')
@@ -0,0 +1,116 @@
+"""
+Read-only list projections
+
+Render list rows straight from ``values_list()`` tuples instead of building
+model instances and running them through a ``ModelSerializer``. Output is
+byte-identical to the serializer the projection mirrors.
+"""
+from functools import lru_cache
+
+from rest_framework import serializers
+
+
+# Fields whose ``to_representation`` returns database values unchanged
+PASSTHROUGH_FIELDS = (
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.BooleanField,
+    serializers.ChoiceField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+
+class ListProjection:
+    """
+    Serializer-free projection of a serializer
+
+    Columns are resolved once from ``serializer_class``: dotted sources such
+    as ``member.name`` become ``member__name`` lookups joined in the same
+    query. Fields that are not database columns (model properties) are
+    listed in ``computed_fields`` with the columns they are derived from and
+    produced by ``get_computed`` for the whole page at once.
+
+    ``fields`` narrows the projection to a subset of the serializer fields;
+    ``expand`` embeds related objects declared in ``expandable_fields``.
+    Only the columns (and joins) those fields need are fetched.
+    """
+    serializer_class = None
+    # {field_name: [columns the value is derived from]}
+    computed_fields = {}
+    # {field_name: (relation, projection class)}
+    expandable_fields = {}
+
+    def __init__(self, fields=None, expand=(), prefix='', lookups=None):
+        self.prefix = prefix
+        self.lookups = [] if lookups is None else lookups
+        self.field_names = []
+        self.plan = []
+        self.nested = {}
+
+        for name, field in self.serializer_class().fields.items():
+            if (fields is not None and name not in fields) or name in expand:
+                continue
+
+            self.field_names.append(name)
+            if name in self.computed_fields:
+                for column in self.computed_fields[name]:
+                    self._add_lookup(column)
+                self.plan.append((name, None, None))
+                continue
+
+            lookup = field.source.replace('.', '__')
+            formatter = None if isinstance(field, PASSTHROUGH_FIELDS) else field.to_representation
+            self.plan.append((name, self._add_lookup(lookup), formatter))
+
+        for name in expand:
+            relation, projection_class = self.expandable_fields[name]
+            self.nested[name] = projection_class(prefix=f'{prefix}{relation}__', lookups=self.lookups)
+            self.field_names.append(name)
+            self.plan.append((name, None, None))
+
+    @classmethod
+    @lru_cache(maxsize=128)
+    def build(cls, fields=None, expand=()):
+        """Return a shared projection for ``fields``/``expand`` (hashable tuples)"""
+        return cls(fields=fields, expand=expand)
+
+    def _add_lookup(self, lookup):
+        lookup = self.prefix + lookup
+        if lookup not in self.lookups:
+            self.lookups.append(lookup)
+        return self.lookups.index(lookup)
+
+    def index(self, *lookups):
+        """Positions of ``lookups`` within each fetched row"""
+        return [self.lookups.index(self.prefix + lookup) for lookup in lookups]
+
+    def project(self, queryset):
+        """Narrow ``queryset`` to the columns this projection needs"""
+        return queryset.values_list(*self.lookups)
+
+    def get_computed(self, rows):
+        """Return ``{field_name: [value per row]}`` for requested computed fields"""
+        return {}
+
+    def render(self, rows):
+        """Render fetched rows into plain dicts in serializer field order"""
+        rows = list(rows)
+        computed = self.get_computed(rows)
+        for name, projection in self.nested.items():
+            computed[name] = projection.render(rows)
+
+        data = []
+        for position, row in enumerate(rows):
+            item = {}
+            for name, index, formatter in self.plan:
+                if index is None:
+                    item[name] = computed[name][position]
+                    continue
+
+                value = row[index]
+                if formatter is not None and value is not None:
+                    value = formatter(value)
+                item[name] = value
+            data.append(item)
+
+        return data
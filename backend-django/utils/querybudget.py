@@ -0,0 +1,142 @@
+"""
+Query budget instrumentation
+
+Counts queries and database time per request through
+``connection.execute_wrapper``, exposes them as response headers, logs
+requests that exceed their budget with normalized SQL fingerprints, and
+provides the matching assertion for tests.
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger('crm.query_budget')
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_RE = re.compile(r'%s|\?')
+_IN_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """Normalize ``sql`` so queries differing only in values compare equal"""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _PLACEHOLDER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('(...)', sql)
+    return _WHITESPACE_RE.sub(' ', sql).strip()
+
+
+class QueryCounter:
+    """``execute_wrapper`` recording every statement and its duration"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+            self.statements.append(sql)
+
+    @property
+    def duration_ms(self):
+        return self.duration * 1000
+
+    def fingerprints(self, limit=5):
+        """Most repeated statement shapes as ``[(count, fingerprint)]``"""
+        counts = Counter(fingerprint(sql) for sql in self.statements)
+        return [(count, shape) for shape, count in counts.most_common(limit)]
+
+    def report(self, limit=5):
+        return '\n'.join(f'  {count}x {shape}' for count, shape in self.fingerprints(limit))
+
+
+@contextmanager
+def count_queries():
+    """Count queries on every configured database inside the block"""
+    counter = QueryCounter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+        yield counter
+
+
+class QueryBudgetMiddleware:
+    """
+    Per-request query count and database time
+
+    With ``QUERY_BUDGET_HEADERS`` enabled the figures are returned in
+    ``X-DB-Queries`` and ``Server-Timing``. Requests over
+    ``QUERY_BUDGET_MAX_QUERIES`` or ``QUERY_BUDGET_MAX_DB_MS`` (per
+    operation, for batch requests) are logged with their most repeated
+    statement fingerprints. The counter is left on ``request.query_counter``
+    for ``MetricsMiddleware``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.headers = settings.QUERY_BUDGET_HEADERS
+        self.max_queries = settings.QUERY_BUDGET_MAX_QUERIES
+        self.max_db_ms = settings.QUERY_BUDGET_MAX_DB_MS
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with count_queries() as counter:
+            response = self.get_response(request)
+        return self.process(request, response, counter)
+
+    async def __acall__(self, request):
+        # Async ORM calls share this context's connections, so they are counted
+        with count_queries() as counter:
+            response = await self.get_response(request)
+        return self.process(request, response, counter)
+
+    def process(self, request, response, counter):
+        request.query_counter = counter
+
+        if self.headers:
+            response['X-DB-Queries'] = str(counter.count)
+            response['Server-Timing'] = f'db;dur={counter.duration_ms:.2f};desc="{counter.count} queries"'
+
+        operations = getattr(request, 'batch_operations', 1)
+        if counter.count > self.max_queries * operations or counter.duration_ms > self.max_db_ms * operations:
+            logger.warning(
+                'Query budget exceeded: %s %s ran %d queries in %.1f ms\n%s',
+                request.method, request.path, counter.count, counter.duration_ms, counter.report(),
+            )
+
+        return response
+
+
+class QueryBudgetAssertions:
+    """TestCase mixin asserting an upper bound on queries"""
+
+    @contextmanager
+    def assertMaxQueries(self, limit, label=''):
+        with count_queries() as counter:
+            yield counter
+
+        if counter.count > limit:
+            self.fail(
+                f'{label or "Block"} ran {counter.count} queries, budget is {limit}\n{counter.report()}'
+            )
@@ -0,0 +1,68 @@
+"""
+Admin extension tests
+"""
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db.models import Max, Min
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import formats
+
+from apps.members.models import Member
+from utils.admin import DateDrilldownListFilter
+
+User = get_user_model()
+
+# Admin pages link static assets, whose manifest only exists after collectstatic
+UNHASHED_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+@override_settings(STORAGES=UNHASHED_STORAGES)
+class DateDrilldownTests(TestCase):
+    """Year, month and day drilldown on the member changelist"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin-pass-123', full_name='Admin'
+        )
+        # Join dates 40 days apart span more than a year
+        today = date.today()
+        for i in range(12):
+            Member.objects.create(
+                name=f'Member {i}', email=f'member{i}@example.com', phone='08123456789',
+                join_date=today - timedelta(days=40 * i),
+            )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def drilldown(self, query_string=''):
+        """Changelist at ``query_string`` and the join date drilldown choices it offers"""
+        changelist = self.client.get(reverse('admin:members_member_changelist') + query_string).context['cl']
+        spec = next(spec for spec in changelist.filter_specs if isinstance(spec, DateDrilldownListFilter))
+        # After DateFieldListFilter's own five links
+        return changelist, list(spec.choices(changelist))[5:]
+
+    def test_dates_drill_down(self):
+        first, last = (Member.objects.aggregate(value=func('join_date'))['value'] for func in (Min, Max))
+        changelist, years = self.drilldown()
+        self.assertEqual(
+            [choice['display'] for choice in years], [str(year) for year in range(last.year, first.year - 1, -1)]
+        )
+
+        changelist, months = self.drilldown(years[-1]['query_string'])
+        self.assertTrue(months[0]['selected'])
+        self.assertEqual({member.join_date.year for member in changelist.result_list}, {first.year})
+        last_month = 12 if first.year < last.year else last.month
+        self.assertEqual(len(months) - 1, last_month - first.month + 1)
+
+        changelist, days = self.drilldown(months[1]['query_string'])
+        self.assertEqual([choice['selected'] for choice in days[:2]], [False, True])
+        self.assertEqual({(member.join_date.year, member.join_date.month) for member in changelist.result_list},
+                         {(first.year, first.month)})
+        self.assertEqual(days[2]['display'], formats.date_format(first, 'MONTH_DAY_FORMAT'))
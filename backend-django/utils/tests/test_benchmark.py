@@ -0,0 +1,23 @@
+"""
+Benchmark comparison tests
+"""
+from django.test import SimpleTestCase
+
+from utils.benchmark import compare
+
+
+class CompareTests(SimpleTestCase):
+    """Regression gating against a baseline"""
+
+    def test_compare_flags_regressions(self):
+        figures = {'requests': 100, 'errors': 0, 'error_rate': 0.0, 'throughput': 200.0,
+                   'p50': 4.0, 'p95': 10.0, 'p99': 20.0, 'queries': 3.0}
+        baseline = {'scenarios': {'dashboard': {'total': figures, 'routes': {'GET member-list': figures}}}}
+        slower = {**figures, 'throughput': 150.0, 'p95': 14.0, 'queries': 4.0}
+        results = {'scenarios': {'dashboard': {'total': figures, 'routes': {'GET member-list': slower}}}}
+
+        self.assertEqual(compare(baseline, baseline), [])
+        regressions = compare(results, baseline)
+        self.assertEqual(len(regressions), 2)
+        self.assertIn('GET member-list: p95 10.00 -> 14.00 ms', regressions[0])
+        self.assertEqual(compare(results, baseline, {'p95': 0.5, 'queries': 2}), [])
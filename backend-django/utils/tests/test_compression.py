@@ -0,0 +1,97 @@
+"""
+Response compression tests
+"""
+import gzip
+from datetime import date
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.members.models import Member
+from utils.compression import CompressionMiddleware, brotli, negotiate
+
+User = get_user_model()
+
+
+class CompressionTests(TestCase):
+    """Brotli/gzip response compression"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='staff', email='staff@example.com', password='staff-pass-123', full_name='Staff'
+        )
+        for i in range(20):
+            Member.objects.create(
+                name=f'Member {i}', email=f'member{i}@example.com', phone='08123456789', join_date=date.today()
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def middleware(self, response):
+        return CompressionMiddleware(lambda request: response)
+
+    def test_negotiation(self):
+        self.assertEqual(negotiate('gzip, deflate'), 'gzip')
+        self.assertEqual(negotiate('gzip;q=0.5, br;q=0.8'), 'br' if brotli else 'gzip')
+        self.assertEqual(negotiate('gzip, br'), 'br' if brotli else 'gzip')
+        self.assertEqual(negotiate('*;q=0.1, br;q=0'), 'gzip')
+        self.assertIsNone(negotiate('identity'))
+        self.assertIsNone(negotiate('gzip;q=0'))
+
+    def test_json_is_gzipped(self):
+        url = reverse('member-list')
+        plain = self.client.get(url)
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', plain['Vary'])
+
+        compressed = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+        self.assertLess(int(compressed['Content-Length']), len(plain.content))
+
+    @skipUnless(brotli, 'brotli is not installed')
+    def test_json_is_brotli_compressed(self):
+        url = reverse('member-list')
+        compressed = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        self.assertEqual(compressed['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(compressed.content), self.client.get(url).content)
+
+    def test_etag_is_weakened_and_still_revalidates(self):
+        url = reverse('member-list')
+        etag = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_small_and_precompressed_bodies_are_left_alone(self):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        small = self.middleware(HttpResponse(b'{}', content_type='application/json'))(request)
+        self.assertFalse(small.has_header('Content-Encoding'))
+
+        for content_type in ('application/zip', 'image/png'):
+            response = self.middleware(HttpResponse(b'x' * 4096, content_type=content_type))(request)
+            self.assertFalse(response.has_header('Content-Encoding'))
+
+        encoded = HttpResponse(gzip.compress(b'x' * 4096), content_type='application/json')
+        encoded['Content-Encoding'] = 'gzip'
+        self.assertEqual(self.middleware(encoded)(request).content, encoded.content)
+
+    def test_streams_are_compressed_chunk_by_chunk(self):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        rows = [f'{i},member{i}@example.com\n'.encode() for i in range(1000)]
+        response = self.middleware(StreamingHttpResponse(iter(rows), content_type='text/csv'))(request)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(response.has_header('Content-Length'))
+        chunks = list(response.streaming_content)
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(gzip.decompress(b''.join(chunks)), b''.join(rows))
+
+        events = StreamingHttpResponse(iter(rows), content_type='text/event-stream')
+        self.assertFalse(self.middleware(events)(request).has_header('Content-Encoding'))
@@ -0,0 +1,121 @@
+"""
+Conditional GET tests
+"""
+from datetime import date, timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.members.models import Member
+from apps.points.models import PointTransaction
+from apps.redeem.models import RedeemTransaction
+from apps.vouchers.models import Voucher
+from utils.querybudget import QueryBudgetAssertions
+
+User = get_user_model()
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ConditionalGetTests(QueryBudgetAssertions, TestCase):
+    """ETag and Last-Modified validators on members, vouchers, points and redemptions"""
+
+    @classmethod
+    def setUpTestData(cls):
+        today = date.today()
+        cls.user = User.objects.create_user(
+            username='staff', email='staff@example.com', password='staff-pass-123', full_name='Staff'
+        )
+        cls.voucher = Voucher.objects.create(
+            code='VOUCHER', name='Voucher', points_cost=100, stock=50,
+            start_date=today - timedelta(days=1), end_date=today + timedelta(days=30),
+        )
+        for i in range(3):
+            member = Member.objects.create(
+                name=f'Member {i}', email=f'member{i}@example.com', phone='08123456789', join_date=today
+            )
+            PointTransaction.objects.create(member=member, transaction_type='earn', points=500)
+        cls.redeem = RedeemTransaction.objects.create(
+            member=Member.objects.get(pk=member.pk), voucher=cls.voucher, status='Completed'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.member = Member.objects.first()
+
+    def assertNotModified(self, url, etag, queries=1):
+        with self.assertMaxQueries(queries):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_detail_revalidates_until_saved(self):
+        url = reverse('member-detail', kwargs={'pk': self.member.pk})
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+        self.assertNotModified(url, etag)
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+        balance = self.member.total_points
+        PointTransaction.objects.create(member=self.member, transaction_type='earn', points=10)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['total_points'], balance + 10)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_revalidates_until_rows_change(self):
+        url = reverse('member-list')
+        etag = self.client.get(url)['ETag']
+        self.assertFalse(self.client.get(url).has_header('Last-Modified'))
+        self.assertNotModified(url, etag)
+        self.assertNotEqual(self.client.get(url, {'tier_level': 'Silver'})['ETag'], etag)
+
+        Member.objects.filter(pk=self.member.pk).delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_embedded_rows_are_validators(self):
+        url = reverse('redeem-detail', kwargs={'pk': self.redeem.pk})
+        etag = self.client.get(url)['ETag']
+        self.assertNotModified(url, etag)
+
+        member = self.redeem.member
+        member.name = 'Renamed'
+        member.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['member_name'], 'Renamed')
+
+    def test_point_etags_follow_row_content(self):
+        point = PointTransaction.objects.filter(member=self.member).first()
+        url = reverse('point-detail', kwargs={'pk': point.pk})
+        response = self.client.get(url)
+        etag = response['ETag']
+        # Nothing records when a ledger row changed
+        self.assertFalse(response.has_header('Last-Modified'))
+        self.assertNotModified(url, etag)
+
+        # Written without save(), as a member merge moves rows
+        PointTransaction.objects.filter(pk=point.pk).update(description='Corrected')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['description'], 'Corrected')
+
+    def test_sparse_fieldsets_have_their_own_etag(self):
+        url = reverse('redeem-detail', kwargs={'pk': self.redeem.pk})
+        etag = self.client.get(url, {'fields': 'status'})['ETag']
+        self.assertNotEqual(etag, self.client.get(url)['ETag'])
+        self.assertNotModified(f'{url}?fields=status', etag)
+
+    def test_voucher_etags_change_daily(self):
+        url = reverse('voucher-detail', kwargs={'pk': self.voucher.pk})
+        etag = self.client.get(url)['ETag']
+        with mock.patch('django.utils.timezone.localdate', return_value=date.today() + timedelta(days=1)):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
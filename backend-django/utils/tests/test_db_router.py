@@ -0,0 +1,85 @@
+"""
+Read replica routing tests
+"""
+from datetime import date
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, router, transaction
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.audit.writer import writer as audit_writer
+from apps.members.models import Member
+from utils.db.router import _read_alias
+
+User = get_user_model()
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@skipUnless(settings.DATABASE_REPLICAS, 'Set DB_REPLICA_HOSTS (e.g. localhost) to test replica routing')
+@override_settings(CACHES=LOCMEM_CACHE, DATABASE_REPLICAS=settings.DATABASE_REPLICAS[:1])
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Routing against a primary and a replica holding different rows
+
+    Tests run outside a transaction, since reads inside one on the primary
+    are never routed.
+    """
+
+    databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS[:1]}
+
+    def setUp(self):
+        cache.clear()
+        self.replica = settings.DATABASE_REPLICAS[0]
+        Member.objects.create(name='On Primary', email='primary@example.com', phone='0811', join_date=date.today())
+        Member(name='On Replica', email='replica@example.com', phone='0812', join_date=date.today()).save(
+            using=self.replica
+        )
+        self.user = User.objects.create_user(
+            username='reader', email='reader@example.com', password='reader-pass-123', full_name='Reader'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # Committed writes are audited from the writer thread; flush before tables are emptied
+        self.addCleanup(audit_writer.stop)
+
+    def member_names(self, client=None):
+        response = (client or self.client).get(reverse('member-list'))
+        return [member['name'] for member in response.json()['results']]
+
+    def test_list_reads_from_replica(self):
+        self.assertEqual(self.member_names(), ['On Replica'])
+
+    def test_statistics_read_from_replica(self):
+        Member.objects.create(name='Second', email='second@example.com', phone='0813', join_date=date.today())
+        response = self.client.get(reverse('member-statistics'))
+        self.assertEqual(response.json()['data']['total_members'], 1)
+
+    def test_writes_go_to_primary_and_make_the_user_sticky(self):
+        response = self.client.post(reverse('member-list'), {
+            'name': 'Written', 'email': 'written@example.com', 'phone': '0814', 'join_date': str(date.today()),
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Member.objects.using(DEFAULT_DB_ALIAS).filter(name='Written').exists())
+
+        self.assertEqual(sorted(self.member_names()), ['On Primary', 'Written'])
+
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user(
+            username='other', email='other@example.com', password='other-pass-123', full_name='Other'
+        ))
+        self.assertEqual(self.member_names(other), ['On Replica'])
+
+    def test_reads_inside_a_transaction_use_the_primary(self):
+        token = _read_alias.set(self.replica)
+        try:
+            self.assertEqual(router.db_for_read(Member), self.replica)
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(Member), DEFAULT_DB_ALIAS)
+        finally:
+            _read_alias.reset(token)
@@ -0,0 +1,74 @@
+"""
+Queue-based logging tests
+"""
+import logging
+import os
+import threading
+from unittest import mock
+
+from django.test import TestCase
+from prometheus_client import REGISTRY
+
+from utils.logqueue import QueueingHandler, SampleFilter
+
+
+class ThreadRecordingHandler(logging.Handler):
+    """Keeps handled records with the thread that handled them"""
+
+    def __init__(self):
+        super().__init__()
+        self.handled = []
+
+    def emit(self, record):
+        self.handled.append((record, threading.get_ident()))
+
+
+class LoggingPipelineTests(TestCase):
+    """Queue-based logging"""
+
+    def setUp(self):
+        self.sink = logging.getLogger('crm.test_log_sink')
+        self.output = ThreadRecordingHandler()
+        self.sink.addHandler(self.output)
+        self.addCleanup(self.sink.removeHandler, self.output)
+        self.logger = logging.getLogger('crm.test_logqueue')
+        self.logger.propagate = False
+        self.addCleanup(setattr, self.logger, 'propagate', True)
+
+    def test_records_are_handled_on_the_listener_thread(self):
+        handler = QueueingHandler('crm.test_log_sink')
+        self.logger.addHandler(handler)
+        try:
+            self.logger.info('posted %s points', 100)
+            try:
+                raise ValueError('boom')
+            except ValueError:
+                self.logger.exception('failed')
+        finally:
+            self.logger.removeHandler(handler)
+            handler.close()
+
+        (posted, posted_thread), (failed, _) = self.output.handled
+        self.assertEqual(posted.getMessage(), 'posted 100 points')
+        self.assertNotEqual(posted_thread, threading.get_ident())
+        self.assertIn('ValueError: boom', failed.exc_text)
+
+    def test_full_queue_drops_and_counts(self):
+        before = REGISTRY.get_sample_value('crm_log_records_dropped_total', {'level': 'INFO'}) or 0
+        handler = QueueingHandler('crm.test_log_sink', queue_size=1)
+        with mock.patch.object(handler, 'start'):
+            # A listener that has fallen behind
+            handler.pid = os.getpid()
+            for _ in range(3):
+                handler.handle(self.logger.makeRecord(self.logger.name, logging.INFO, __file__, 0, 'x', (), None))
+        handler.pid = None
+
+        self.assertEqual(handler.queue.qsize(), 1)
+        self.assertEqual(REGISTRY.get_sample_value('crm_log_records_dropped_total', {'level': 'INFO'}), before + 2)
+
+    def test_access_log_sampling_keeps_warnings(self):
+        sample = SampleFilter(rate=0)
+        record = self.logger.makeRecord(self.logger.name, logging.INFO, __file__, 0, 'GET / 200', (), None)
+        self.assertFalse(sample.filter(record))
+        record.levelno = logging.WARNING
+        self.assertTrue(sample.filter(record))
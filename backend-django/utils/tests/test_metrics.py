@@ -0,0 +1,26 @@
+"""
+Prometheus metrics tests
+"""
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+
+class MetricsTests(TestCase):
+    """Prometheus exposition"""
+
+    def test_requests_are_recorded(self):
+        self.client.get(reverse('health'))
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('crm_http_request_duration_seconds_count{method="GET",route="health"}', body)
+        self.assertIn('crm_db_queries_per_request_bucket{le="0.0",route="health"}', body)
+
+    @override_settings(METRICS_ALLOWED_NETWORKS=['10.0.0.0/8'], METRICS_TOKEN='scrape-secret')
+    def test_scrapes_are_restricted(self):
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url, REMOTE_ADDR='10.1.2.3').status_code, 200)
+        self.assertEqual(self.client.get(url, REMOTE_ADDR='203.0.113.9').status_code, 403)
+        # Forwarded addresses are not trusted
+        self.assertEqual(self.client.get(url, REMOTE_ADDR='203.0.113.9', HTTP_X_REAL_IP='10.1.2.3').status_code, 403)
+        for token, status_code in (('wrong', 403), ('scrape-secret', 200)):
+            response = self.client.get(url, REMOTE_ADDR='203.0.113.9', HTTP_AUTHORIZATION=f'Bearer {token}')
+            self.assertEqual(response.status_code, status_code)
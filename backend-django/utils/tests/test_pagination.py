@@ -0,0 +1,22 @@
+"""
+Pagination tests
+"""
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from apps.members.models import Member
+from utils.pagination import EstimatedCountPaginator
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    """Planner estimates stand in for unfiltered counts of large tables"""
+
+    def test_unfiltered_counts_are_estimated(self):
+        queryset = Member.objects.all()
+        with mock.patch('utils.pagination.estimated_rows', return_value=2_000_000), \
+                override_settings(ESTIMATED_COUNT_MIN_ROWS=1_000_000):
+            self.assertEqual(EstimatedCountPaginator(queryset, 100).count, 2_000_000)
+            self.assertEqual(EstimatedCountPaginator(queryset.filter(status='Active'), 100).count, 0)
+        with mock.patch('utils.pagination.estimated_rows', return_value=500):
+            self.assertEqual(EstimatedCountPaginator(queryset, 100).count, 0)
@@ -0,0 +1,101 @@
+"""
+Profiling tests
+"""
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from utils import profiling
+
+User = get_user_model()
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def join_profilers():
+    """Wait for sampling profilers started by a test to write their profiles"""
+    for thread in threading.enumerate():
+        if thread.name == 'sampling-profiler':
+            thread.join()
+
+
+def finished_profile_names():
+    return [profile['name'] for profile in profiling.finished_profiles()]
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ProfilingTests(TestCase):
+    """Sampling profiler and per-request cProfile mode"""
+
+    def setUp(self):
+        self.client = APIClient()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.enterContext(override_settings(PROFILE_DIR=directory.name))
+
+    def test_samples_are_collapsed_per_view(self):
+        serving = threading.Event()
+
+        def busy_view():
+            profiling._active_views[threading.get_ident()] = 'member-list'
+            serving.set()
+            deadline = time.monotonic() + 0.3
+            while time.monotonic() < deadline:
+                sum(range(1000))
+            profiling._active_views.pop(threading.get_ident())
+
+        worker = threading.Thread(target=busy_view)
+        worker.start()
+        serving.wait()
+        profiler = profiling.SamplingProfiler(0.2, interval=0.005).start()
+        profiler.thread.join()
+        worker.join()
+
+        with open(profiler.path) as stream:
+            lines = stream.read().splitlines()
+        view_lines = [line for line in lines if line.startswith('member-list;')]
+        self.assertTrue(view_lines)
+        self.assertIn('busy_view (utils/tests/test_profiling.py:', view_lines[0])
+        self.assertTrue(all(line.rsplit(' ', 1)[1].isdigit() for line in lines))
+        self.assertEqual(finished_profile_names(), [profiler.name])
+
+    def test_one_run_per_process(self):
+        first, started = profiling.start_profile(1)
+        second, started_again = profiling.start_profile(1)
+        join_profilers()
+        self.assertTrue(started)
+        self.assertFalse(started_again)
+        self.assertIs(first, second)
+
+    def test_profiles_require_admin(self):
+        self.client.force_authenticate(User.objects.create_user(
+            username='staff', email='staff@example.com', password='x', full_name='Staff'
+        ))
+        self.assertEqual(self.client.get(reverse('profiles')).status_code, 403)
+
+    def test_request_profile_is_for_staff_only(self):
+        user = User.objects.create_user(username='staff', email='staff@example.com', password='x', full_name='Staff')
+        url = reverse('member-list')
+        with mock.patch('utils.profiling.profile_request') as profile_request:
+            # Neither anonymous nor forged nor non-staff requests are profiled
+            self.assertEqual(self.client.get(url, {'__profile': 1}).status_code, 401)
+            self.client.credentials(HTTP_AUTHORIZATION='Bearer forged')
+            self.assertEqual(self.client.get(url, {'__profile': 1}).status_code, 401)
+            self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+            response = self.client.get(url, {'__profile': 1})
+            self.assertEqual(response['Content-Type'], 'application/json')
+        profile_request.assert_not_called()
+
+        User.objects.filter(pk=user.pk).update(is_staff=True)
+        response = self.client.get(url, {'__profile': 1})
+        self.assertEqual(response['Content-Type'], 'text/plain; charset=utf-8')
+        body = response.content.decode()
+        self.assertTrue(body.startswith('GET /api/members/?__profile=1 -> 200 (member-list)'))
+        self.assertIn('function calls', body)
@@ -0,0 +1,23 @@
+"""
+Rate limits
+
+DRF's anonymous and per-user throttles, except that the operations of a
+batch request (crm_project/batch.py) are not throttled again: the batch
+request itself was.
+"""
+from rest_framework import throttling
+
+
+class BatchAwareThrottleMixin:
+    def allow_request(self, request, view):
+        if getattr(request, 'batched', False):
+            return True
+        return super().allow_request(request, view)
+
+
+class AnonRateThrottle(BatchAwareThrottleMixin, throttling.AnonRateThrottle):
+    pass
+
+
+class UserRateThrottle(BatchAwareThrottleMixin, throttling.UserRateThrottle):
+    pass
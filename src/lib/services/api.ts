@@ -145,6 +145,11 @@ class ApiService {
 	async getMemberStats() {
 		return this.request('/members/statistics/');
 	}
+
+	// Exact match on the phone number, in any format
+	async lookupMemberByPhone(phone: string) {
+		return this.request(`/members/lookup/?phone=${encodeURIComponent(phone)}`);
+	}
 	
 	async getTotalPoints() {
 		return this.getMemberStats();
@@ -230,6 +235,24 @@ class ApiService {
 	async getRedeemStats() {
 		return this.request('/redeem/statistics/');
 	}
+
+	// Batch API: several requests in one round trip; paths are relative to the API root.
+	// '{{<id>.body.data.id}}' in a path or body refers to an earlier operation's result.
+	async batch(
+		operations: { id?: string; method: string; path: string; body?: any }[],
+		atomic = false
+	) {
+		return this.request('/batch/', {
+			method: 'POST',
+			body: JSON.stringify({
+				atomic,
+				operations: operations.map((operation) => ({
+					...operation,
+					path: `${new URL(this.baseUrl, window.location.origin).pathname.replace(/\/$/, '')}${operation.path}`
+				}))
+			})
+		});
+	}
 }
 
 export const api = new ApiService(API_BASE_URL);